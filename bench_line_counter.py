@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the counting pipeline
+
+Generates a reproducible synthetic repository, then times each stage of an
+analysis separately - walk, filter, binary sniff, count, aggregate and
+export - for every count method, and writes the timings as JSON so runs can
+be compared across commits:
+
+    python bench_line_counter.py --files 20000 -o bench.json
+    python bench_line_counter.py --files 20000 --compare bench.json --max-slowdown 1.25
+
+With --compare the exit status is 1 when any stage got slower than
+--max-slowdown times the baseline, so the script can gate a build.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from line_counter_core import (
+    COUNT_METHODS, DEFAULT_EXCLUDE_FOLDERS, DEFAULT_EXCLUDE_PATTERNS, CountingEngine, FileFilter, group_by_extension,
+    is_binary_file, scan_files, split_list, summarize
+)
+from line_counter_export import sort_files, write_csv, write_json
+
+STAGES = ("walk", "filter", "binary_sniff", "count", "aggregate", "export")
+
+# Line templates per extension; anything else gets generic text
+LINE_TEMPLATES = {
+    '.py': ["def handler_{n}(value):", "    # adjust the value", "    return value * {n}", ""],
+    '.js': ["function handler{n}(value) {{", "  // adjust the value", "  return value * {n};", "}}", ""],
+    '.c': ["int handler_{n}(int value) {{", "    /* adjust the value */", "    return value * {n};", "}}", ""],
+    '.html': ["<div class=\"row-{n}\">", "  <!-- row -->", "  <span>{n}</span>", "</div>"],
+}
+
+
+def parse_mix(value):
+    """'.py:5,.js:3' -> ([.py, .js], [5, 3])"""
+    extensions, weights = [], []
+    for item in split_list(value):
+        ext, _, weight = item.partition(":")
+        extensions.append(ext)
+        weights.append(float(weight or 1))
+    return extensions, weights
+
+
+def text_block(blocks, ext, size):
+    """At least size bytes of source-like text for ext, built once per extension"""
+    block = blocks.get(ext)
+    if block is None:
+        template = LINE_TEMPLATES.get(ext, ["plain text line {n}", ""])
+        block = blocks[ext] = "".join(template[n % len(template)].format(n=n) + "\n"
+                                      for n in range(20000)).encode("utf-8")
+    return block * (size // len(block) + 1)
+
+
+def generate_tree(root, files=10000, depth=4, mean_size_kb=8.0, size_sigma=1.0, binary_ratio=0.05,
+                  extensions=".py:5,.js:3,.c:2,.html:1,.txt:1", excluded_ratio=0.1, seed=42):
+    """Write a synthetic repository under root; the same arguments always give the same tree.
+
+    File sizes follow a log-normal distribution around mean_size_kb, a
+    binary_ratio share of files are binary blobs, and excluded_ratio of the
+    files land in folders the default exclude list prunes (node_modules,
+    __pycache__, ...). Returns a dict describing the tree.
+    """
+    rng = random.Random(seed)
+    exts, weights = parse_mix(extensions)
+    excluded_names = split_list(DEFAULT_EXCLUDE_FOLDERS)
+    folders = [""]
+    blocks = {}
+    total_bytes = 0
+
+    for i in range(files):
+        # Grow the folder tree as files are added, up to the requested depth
+        if rng.random() < 0.1 or len(folders) == 1:
+            parent = rng.choice(folders)
+            if (parent.count(os.sep) + 1 if parent else 0) < depth:
+                folders.append(os.path.join(parent, f"pkg{len(folders)}"))
+        folder = rng.choice(folders)
+        if rng.random() < excluded_ratio:
+            folder = os.path.join(folder, rng.choice(excluded_names))
+
+        size = max(0, int(rng.lognormvariate(0, size_sigma) * mean_size_kb * 1024))
+        if rng.random() < binary_ratio:
+            name = f"blob{i}.bin"
+            data = (b"\x00" + rng.randbytes(4095)) * (size // 4096 + 1)
+        else:
+            ext = rng.choices(exts, weights)[0]
+            name = f"file{i}{ext}"
+            data = text_block(blocks, ext, size)
+        data = data[:size]
+
+        path = os.path.join(root, folder, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        total_bytes += len(data)
+
+    return {'files': files, 'folders': len(folders), 'bytes': total_bytes, 'depth': depth,
+            'mean_size_kb': mean_size_kb, 'size_sigma': size_sigma, 'binary_ratio': binary_ratio,
+            'extensions': extensions, 'excluded_ratio': excluded_ratio, 'seed': seed}
+
+
+def best_time(func, repeat):
+    """(best wall time, result of the last call)"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def stage_result(seconds, files, size):
+    return {
+        'seconds': round(seconds, 6),
+        'files': files,
+        'bytes': size,
+        'files_per_sec': round(files / seconds, 1) if seconds > 0 else None,
+        'mb_per_sec': round(size / seconds / (1024 * 1024), 2) if seconds > 0 and size else None,
+    }
+
+
+def benchmark(root, include=".*", exclude_patterns=DEFAULT_EXCLUDE_PATTERNS,
+              exclude_folders=DEFAULT_EXCLUDE_FOLDERS, methods=COUNT_METHODS, workers=None, repeat=3):
+    """Time every stage on the tree at root; returns {method: {stage: result}}"""
+    file_filter = FileFilter(split_list(include), split_list(exclude_patterns), split_list(exclude_folders))
+    everything = FileFilter([".*"], [], [])
+
+    # Walk: enumerate and stat every file, no filtering
+    walk_time, all_entries = best_time(lambda: list(scan_files(root, everything)), repeat)
+
+    # Filter: the include/exclude decisions for every walked file and folder
+    def apply_filter():
+        allowed_dirs = {}
+        kept = []
+        for entry in all_entries:
+            parent, name = os.path.split(entry.rel_path)
+            allowed = allowed_dirs.get(parent)
+            if allowed is None:
+                allowed = allowed_dirs[parent] = all(file_filter.include_folder(part)
+                                                     for part in parent.split(os.sep) if part)
+            if allowed and file_filter.include_file(name):
+                kept.append(entry)
+        return kept
+    filter_time, entries = best_time(apply_filter, repeat)
+    entries_bytes = sum(entry.size for entry in entries)
+
+    # Binary sniff: read and classify the start of every file
+    sniff_time, _ = best_time(lambda: [is_binary_file(entry.path) for entry in entries], repeat)
+
+    results = {}
+    for method in methods:
+        engine = CountingEngine(method, workers=workers)
+        count_time, (file_results, extension_stats) = best_time(
+            lambda: engine.count_entries(root, entries), repeat)
+
+        def aggregate():
+            summarize(file_results)
+            group_by_extension(file_results)
+            return sort_files(file_results)
+        aggregate_time, sorted_files = best_time(aggregate, repeat)
+
+        def export():
+            # Format everything but do not measure the disk
+            with open(os.devnull, "w", encoding="utf-8", newline="") as sink:
+                write_csv(sink, file_results, extension_stats, sorted_files)
+                write_json(sink, file_results, extension_stats, root, method, sorted_files)
+        export_time, _ = best_time(export, repeat)
+
+        total_files = len(file_results)
+        results[method] = {
+            'walk': stage_result(walk_time, len(all_entries), sum(entry.size for entry in all_entries)),
+            'filter': stage_result(filter_time, len(all_entries), 0),
+            'binary_sniff': stage_result(sniff_time, len(entries), 0),
+            'count': stage_result(count_time, total_files, entries_bytes),
+            'aggregate': stage_result(aggregate_time, total_files, 0),
+            'export': stage_result(export_time, total_files, 0),
+        }
+    return results
+
+
+def git_commit():
+    """HEAD of the repository this script lives in, if git is available"""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, max_slowdown):
+    """Print per-stage ratios against a baseline report; returns the list of regressions"""
+    regressions = []
+    for method, stages in results.items():
+        for stage in STAGES:
+            result = stages[stage]
+            old = baseline.get('results', {}).get(method, {}).get(stage)
+            if not old or not old['seconds']:
+                continue
+            ratio = result['seconds'] / old['seconds']
+            flag = ""
+            if ratio > max_slowdown:
+                regressions.append((method, stage, ratio))
+                flag = "  <-- REGRESSION"
+            print(f"{method:>10} {stage:>13}: {old['seconds'] * 1000:9.1f} ms -> "
+                  f"{result['seconds'] * 1000:9.1f} ms  ({ratio:.2f}x){flag}")
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark walk/filter/sniff/count/aggregate/export stages")
+    parser.add_argument("--files", type=int, default=10000, help="number of files to generate")
+    parser.add_argument("--depth", type=int, default=4, help="maximum folder depth")
+    parser.add_argument("--mean-size", type=float, default=8.0, metavar="KB", help="median file size in KB")
+    parser.add_argument("--size-sigma", type=float, default=1.0, help="log-normal spread of file sizes")
+    parser.add_argument("--binary-ratio", type=float, default=0.05, help="share of binary files")
+    parser.add_argument("--extensions", default=".py:5,.js:3,.c:2,.html:1,.txt:1",
+                        help="extension mix as ext:weight pairs")
+    parser.add_argument("--excluded-ratio", type=float, default=0.1,
+                        help="share of files placed in excluded folders (node_modules, ...)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for the generated tree")
+    parser.add_argument("--tree", default=None,
+                        help="generate into (or reuse, if it exists) this folder instead of a temporary one")
+    parser.add_argument("--methods", default=",".join(COUNT_METHODS), help="comma-separated count methods")
+    parser.add_argument("--workers", type=int, default=None, help="counting workers (default: CPU count)")
+    parser.add_argument("--repeat", type=int, default=3, help="timing repetitions (best is reported)")
+    parser.add_argument("-o", "--output", default="-", help="JSON report file, or - for standard output")
+    parser.add_argument("--compare", default=None, metavar="BASELINE", help="report to compare against")
+    parser.add_argument("--max-slowdown", type=float, default=1.25,
+                        help="with --compare, fail when a stage is this many times slower (default: 1.25)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    tree_args = dict(files=args.files, depth=args.depth, mean_size_kb=args.mean_size, size_sigma=args.size_sigma,
+                     binary_ratio=args.binary_ratio, extensions=args.extensions,
+                     excluded_ratio=args.excluded_ratio, seed=args.seed)
+
+    root = args.tree or tempfile.mkdtemp(prefix="line_counter_bench_")
+    try:
+        if args.tree and os.path.isdir(args.tree) and os.listdir(args.tree):
+            tree = dict(tree_args, reused=True)
+        else:
+            print(f"Generating {args.files:,} files in {root}...", file=sys.stderr)
+            tree = generate_tree(root, **tree_args)
+        print("Running benchmark...", file=sys.stderr)
+        results = benchmark(root, methods=split_list(args.methods), workers=args.workers, repeat=args.repeat)
+    finally:
+        if not args.tree:
+            shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'workers': args.workers,
+        'repeat': args.repeat,
+        'tree': tree,
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_slowdown)
+        if regressions:
+            print(f"{len(regressions)} stage(s) slower than {args.max_slowdown}x the baseline", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+"""
+Persistent per-file result cache for the Line Counter tool.
+
+Results are stored in a small SQLite database in the user's cache folder,
+keyed by absolute path and count method. An entry is only reused when the
+file's st_size and st_mtime_ns still match, so unchanged files are never
+reopened on a re-run.
+
+Content digests of dedup runs are kept in their own table under the same
+(size, mtime_ns) rule, so unchanged files need not be reread to be hashed.
+
+On request, the database also keeps the last few complete results per
+folder and count method as snapshots (a compressed ResultStore each), which
+a later run can be compared against. Snapshots share a total size budget;
+the oldest are dropped first.
+"""
+
+import os
+import sqlite3
+import time
+
+from line_counter_results import ResultStore
+
+# Least recently used entries beyond this are evicted after each run
+DEFAULT_MAX_ENTRIES = 500_000
+
+# Snapshots kept per folder and count method; older ones are dropped
+SNAPSHOTS_KEPT = 8
+
+# Total size of all snapshots; the oldest beyond it are evicted after each save
+DEFAULT_MAX_SNAPSHOT_BYTES = 64 * 1024 * 1024
+
+# Highest code point, used to turn a path prefix into an indexed range query
+_PREFIX_END = "\U0010ffff"
+
+
+def default_cache_path():
+    """Location of the cache database in the per-user cache folder"""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "LineCounter", "cache.sqlite")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "line_counter", "cache.sqlite")
+
+
+def cache_key(path):
+    """Normalized absolute path used as the cache key"""
+    return os.path.normcase(os.path.abspath(path))
+
+
+class ResultCache:
+    """SQLite-backed cache of (lines, size, extension, binary) per file.
+
+    Any database error disables the cache for the rest of the run instead of
+    failing the analysis - a cache miss only costs a recount.
+    """
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES, max_snapshot_bytes=DEFAULT_MAX_SNAPSHOT_BYTES):
+        self.path = path or default_cache_path()
+        self.max_entries = max_entries
+        self.max_snapshot_bytes = max_snapshot_bytes
+        self.conn = None
+
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self.conn = sqlite3.connect(self.path)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT NOT NULL,
+                    method TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    lines INTEGER NOT NULL,
+                    is_binary INTEGER NOT NULL,
+                    extension TEXT NOT NULL,
+                    last_used INTEGER NOT NULL,
+                    PRIMARY KEY (method, path)
+                ) WITHOUT ROWID
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS files_last_used ON files (last_used)")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS digests (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    digest BLOB NOT NULL,
+                    last_used INTEGER NOT NULL
+                ) WITHOUT ROWID
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS digests_last_used ON digests (last_used)")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    folder TEXT NOT NULL,
+                    method TEXT NOT NULL,
+                    taken_at INTEGER NOT NULL,
+                    files INTEGER NOT NULL,
+                    data BLOB NOT NULL,
+                    PRIMARY KEY (folder, method, taken_at)
+                )
+            """)
+            self.conn.commit()
+        except (sqlite3.Error, OSError) as e:
+            print(f"Result cache disabled ({self.path}): {e}")
+            self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def enabled(self):
+        return self.conn is not None
+
+    def lookup(self, folder_path, method):
+        """Return {key: (size, mtime_ns, lines)} for every cached file under folder_path"""
+        if not self.enabled:
+            return {}
+
+        prefix = cache_key(folder_path).rstrip(os.sep) + os.sep
+        try:
+            rows = self.conn.execute(
+                "SELECT path, size, mtime_ns, lines, is_binary FROM files"
+                " WHERE method = ? AND path >= ? AND path < ?",
+                (method, prefix, prefix + _PREFIX_END)
+            )
+            return {
+                path: (size, mtime_ns, "binary" if is_binary else lines)
+                for path, size, mtime_ns, lines, is_binary in rows
+            }
+        except sqlite3.Error as e:
+            print(f"Result cache lookup failed: {e}")
+            self.close()
+            return {}
+
+    def update(self, method, entries, hit_keys=()):
+        """Store fresh results and refresh the LRU stamp of reused ones.
+
+        entries is an iterable of (key, size, mtime_ns, lines, extension).
+        """
+        if not self.enabled:
+            return
+
+        now = time.time_ns()
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        (key, method, size, mtime_ns,
+                         0 if lines == "binary" else lines, 1 if lines == "binary" else 0,
+                         extension, now)
+                        for key, size, mtime_ns, lines, extension in entries
+                    )
+                )
+                self.conn.executemany(
+                    "UPDATE files SET last_used = ? WHERE method = ? AND path = ?",
+                    ((now, method, key) for key in hit_keys)
+                )
+            self.evict()
+        except sqlite3.Error as e:
+            print(f"Result cache update failed: {e}")
+            self.close()
+
+    def lookup_digests(self, folder_path):
+        """Return {key: (size, mtime_ns, digest)} for every file under folder_path with a cached digest"""
+        if not self.enabled:
+            return {}
+
+        prefix = cache_key(folder_path).rstrip(os.sep) + os.sep
+        try:
+            rows = self.conn.execute(
+                "SELECT path, size, mtime_ns, digest FROM digests WHERE path >= ? AND path < ?",
+                (prefix, prefix + _PREFIX_END)
+            )
+            return {path: (size, mtime_ns, digest) for path, size, mtime_ns, digest in rows}
+        except sqlite3.Error as e:
+            print(f"Result cache lookup failed: {e}")
+            self.close()
+            return {}
+
+    def update_digests(self, entries, hit_keys=()):
+        """Store content digests, (key, size, mtime_ns, digest) entries, and refresh the reused ones"""
+        if not self.enabled:
+            return
+
+        now = time.time_ns()
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?)",
+                    ((key, size, mtime_ns, digest, now) for key, size, mtime_ns, digest in entries)
+                )
+                self.conn.executemany("UPDATE digests SET last_used = ? WHERE path = ?",
+                                      ((now, key) for key in hit_keys))
+            self.evict()
+        except sqlite3.Error as e:
+            print(f"Result cache update failed: {e}")
+            self.close()
+
+    def evict(self):
+        """Drop the least recently used entries beyond max_entries and the oldest snapshots beyond max_snapshot_bytes"""
+        if not self.enabled:
+            return
+
+        if self.max_entries:
+            (count,) = self.conn.execute("SELECT COUNT(*) FROM files").fetchone()
+            excess = count - self.max_entries
+            if excess > 0:
+                with self.conn:
+                    self.conn.execute(
+                        "DELETE FROM files WHERE (method, path) IN"
+                        " (SELECT method, path FROM files ORDER BY last_used LIMIT ?)",
+                        (excess,)
+                    )
+
+            (count,) = self.conn.execute("SELECT COUNT(*) FROM digests").fetchone()
+            excess = count - self.max_entries
+            if excess > 0:
+                with self.conn:
+                    self.conn.execute(
+                        "DELETE FROM digests WHERE path IN (SELECT path FROM digests ORDER BY last_used LIMIT ?)",
+                        (excess,)
+                    )
+
+        if self.max_snapshot_bytes:
+            # The newest snapshot is always kept, even when it alone is over the budget
+            rows = self.conn.execute(
+                "SELECT folder, method, taken_at, length(data) FROM snapshots ORDER BY taken_at DESC"
+            ).fetchall()
+            total, dropped = 0, []
+            for i, (folder, method, taken_at, size) in enumerate(rows):
+                total += size
+                if i and total > self.max_snapshot_bytes:
+                    dropped.append((folder, method, taken_at))
+            if dropped:
+                with self.conn:
+                    self.conn.executemany(
+                        "DELETE FROM snapshots WHERE folder = ? AND method = ? AND taken_at = ?", dropped
+                    )
+
+    def save_snapshot(self, folder_path, method, file_results):
+        """Keep file_results (a ResultStore) as the newest snapshot of folder_path; returns its taken_at"""
+        if not self.enabled:
+            return None
+        folder = cache_key(folder_path)
+        taken_at = time.time_ns()
+        try:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)",
+                    (folder, method, taken_at, len(file_results), file_results.to_bytes())
+                )
+                self.conn.execute(
+                    "DELETE FROM snapshots WHERE folder = ? AND method = ? AND taken_at NOT IN"
+                    " (SELECT taken_at FROM snapshots WHERE folder = ? AND method = ?"
+                    " ORDER BY taken_at DESC LIMIT ?)",
+                    (folder, method, folder, method, SNAPSHOTS_KEPT)
+                )
+            self.evict()
+            return taken_at
+        except sqlite3.Error as e:
+            print(f"Saving the snapshot failed: {e}")
+            return None
+
+    def list_snapshots(self, folder_path, method):
+        """[(taken_at, files)] of the snapshots of folder_path, newest first"""
+        if not self.enabled:
+            return []
+        try:
+            return self.conn.execute(
+                "SELECT taken_at, files FROM snapshots WHERE folder = ? AND method = ? ORDER BY taken_at DESC",
+                (cache_key(folder_path), method)
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Listing snapshots failed: {e}")
+            return []
+
+    def load_snapshot(self, folder_path, method, taken_at=None):
+        """The ResultStore of a snapshot (the newest by default), or None if there is none"""
+        if not self.enabled:
+            return None
+        query = "SELECT data FROM snapshots WHERE folder = ? AND method = ?"
+        params = [cache_key(folder_path), method]
+        if taken_at is not None:
+            query += " AND taken_at = ?"
+            params.append(taken_at)
+        try:
+            row = self.conn.execute(query + " ORDER BY taken_at DESC LIMIT 1", params).fetchone()
+        except sqlite3.Error as e:
+            print(f"Loading the snapshot failed: {e}")
+            return None
+        return ResultStore.from_bytes(row[0]) if row else None
+
+    def clear(self):
+        """Remove every cached entry, digest and snapshot (the run history)"""
+        if not self.enabled:
+            return
+        try:
+            with self.conn:
+                self.conn.execute("DELETE FROM files")
+                self.conn.execute("DELETE FROM digests")
+                self.conn.execute("DELETE FROM snapshots")
+            self.conn.execute("VACUUM")
+        except sqlite3.Error as e:
+            print(f"Result cache clear failed: {e}")
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except sqlite3.Error:
+                pass
+            self.conn = None
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Headless command line for the Line Counter tool.
+
+Runs the same walk/filter/count core as the GUI and writes the same CSV or
+JSON the GUI exports, without importing tkinter:
+
+    python -m line_counter_cli path/to/project --format json -o results.json
+
+Several folders (or --manifest, a file listing one folder per line) are
+analyzed as one batch: per-root and combined totals, with the root of
+every file in the export.
+
+With --diff-against the export compares the results with a baseline - a
+previous JSON export, or "cache" for the last snapshot in the result
+cache (saved by an earlier run with --keep-history) - and lists the
+added, removed and changed files with per-extension deltas.
+
+With --dedup files with identical content are found (only files sharing
+their size with another one are hashed, during the read that counts
+them); the export then adds unique file / line totals that count each
+content once, and lists the groups of copies.
+
+With --watch the folder is watched after the first count: changed files
+are recounted as they change and the totals printed, until Ctrl+C writes
+the export of the results as they are then.
+
+Quote the special include patterns so the shell does not expand them,
+e.g. --include ".**".
+"""
+
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+from line_counter_core import (
+    COUNT_METHODS, MMAP_THRESHOLD, DEFAULT_INCLUDE_EXTENSIONS, DEFAULT_EXCLUDE_PATTERNS, DEFAULT_EXCLUDE_FOLDERS,
+    CancelToken, ProgressTracker, RunStats, analyze_folder, analyze_roots, format_progress, format_stats,
+    metric_totals, read_manifest, split_list, summarize, unique_totals
+)
+from line_counter_cache import ResultCache
+from line_counter_diff import check_count_method, diff_results, format_diff_summary, load_json_export
+from line_counter_export import root_totals, sort_files, write_csv, write_diff_csv, write_diff_json, write_json
+from line_counter_git import GitError, analyze_repository, find_repository, scan_git_files
+from line_counter_watch import FolderWatcher, LiveResults
+
+
+def build_parser():
+    """Create the argument parser"""
+    parser = argparse.ArgumentParser(
+        prog="line_counter_cli",
+        description="Count lines of code in a folder and export the results as CSV or JSON."
+    )
+    parser.add_argument("folders", nargs="*", metavar="folder",
+                        help="folder to analyze; several folders are analyzed as one batch")
+    parser.add_argument("--manifest", default=None,
+                        help="file listing folders to analyze as a batch, one per line (# starts a comment)")
+    parser.add_argument("--include", default=DEFAULT_INCLUDE_EXTENSIONS,
+                        help="comma-separated extensions to include (.** = all except excluded, .* = everything)")
+    parser.add_argument("--exclude-patterns", default=DEFAULT_EXCLUDE_PATTERNS,
+                        help="comma-separated file patterns to exclude, e.g. *.pyc,*.exe")
+    parser.add_argument("--exclude-folders", default=DEFAULT_EXCLUDE_FOLDERS,
+                        help="comma-separated folder names to exclude")
+    parser.add_argument("--method", choices=COUNT_METHODS, default="all",
+                        help="how to count lines (default: all)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of parallel workers (default: CPU count)")
+    parser.add_argument("--follow-symlinks", action="store_true",
+                        help="descend into symlinked folders (each real folder is visited once)")
+    parser.add_argument("--gitignore", action="store_true",
+                        help="skip files and folders ignored by .gitignore files and .git/info/exclude")
+    parser.add_argument("--git", action="store_true",
+                        help="count only the files tracked in the folder's git repository (read from the index)")
+    parser.add_argument("--commit", default=None, metavar="REV",
+                        help="count the files as of a git commit, branch or tag without checking it out")
+    parser.add_argument("--dedup", action="store_true",
+                        help="find files with identical content and report unique file and line totals "
+                             "that count each content once")
+    parser.add_argument("--watch", action="store_true",
+                        help="after counting, keep recounting changed files and printing the totals "
+                             "until Ctrl+C, then export")
+    parser.add_argument("--diff-against", default=None, metavar="SNAPSHOT",
+                        help="export the changes since a previous JSON export, or since the last cached snapshot "
+                             "of the folder with 'cache' (needs --cache)")
+    parser.add_argument("--keep-history", action="store_true",
+                        help="save this run as a snapshot in the result cache for a later --diff-against cache "
+                             "(needs --cache)")
+    parser.add_argument("--cache", action="store_true",
+                        help="reuse per-file results from the persistent cache for unchanged files")
+    parser.add_argument("--cache-file", default=None,
+                        help="cache database to use (default: per-user cache folder)")
+    parser.add_argument("--rescan", action="store_true",
+                        help="recount every file even if it is cached (the cache is still refreshed)")
+    parser.add_argument("--mmap-threshold", type=float, default=MMAP_THRESHOLD / (1024 * 1024), metavar="MB",
+                        help="memory-map files of at least this many MB, 0 disables (default: %(default)g)")
+    parser.add_argument("--progress", action="store_true",
+                        help="show files/bytes counted, throughput and ETA on standard error")
+    parser.add_argument("--stats", action="store_true",
+                        help="time each stage, print the run statistics to standard error "
+                             "and include them in the JSON export")
+    parser.add_argument("--format", choices=("csv", "json"), default="csv",
+                        help="export format (default: csv)")
+    parser.add_argument("-o", "--output", default="-",
+                        help="file to write, or - for standard output (default)")
+    return parser
+
+
+def print_progress(snapshot):
+    """Redraw a single progress line on standard error"""
+    end = "" if snapshot.stage in ("scanning", "counting") else "\n"
+    print(f"\r{format_progress(snapshot)}\033[K", end=end, file=sys.stderr, flush=True)
+
+
+def format_totals(file_results):
+    """The one-line summary of a result set"""
+    total_files, total_lines, total_size = summarize(file_results)
+    return f"Total: {total_files} files, {total_lines:,} lines of code, {total_size / (1024 * 1024):.2f} MB"
+
+
+def watch(watcher, file_results):
+    """Apply the watcher's changes to file_results until Ctrl+C; returns the final extension_stats"""
+    changes_queue = queue.Queue()
+    watcher.on_change = changes_queue.put
+    watcher.start()
+    live = LiveResults(file_results)
+    extension_stats = file_results.extension_stats()
+    print("Watching for changes, Ctrl+C to stop and export...", file=sys.stderr)
+    try:
+        while True:
+            try:
+                changes = changes_queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if changes.error is not None:
+                print(f"Watch stopped: {changes.error} - exporting...", file=sys.stderr)
+                break
+            extension_stats = live.apply(changes)
+            print(f"[{time.strftime('%H:%M:%S')}] {len(changes.updated)} updated, {len(changes.removed)} removed - "
+                  f"{format_totals(file_results)}", file=sys.stderr)
+    except KeyboardInterrupt:
+        print("\nStopped watching - exporting...", file=sys.stderr)
+    finally:
+        watcher.stop()
+    return extension_stats
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    roots = list(args.folders)
+    if args.manifest:
+        try:
+            roots += read_manifest(args.manifest)
+        except OSError as e:
+            parser.error(f"cannot read manifest: {e}")
+    if not roots:
+        parser.error("no folder given")
+    batch = len(roots) > 1 or args.manifest is not None
+    if batch and args.commit:
+        parser.error("--commit takes a single folder")
+    use_cache = args.cache or args.cache_file is not None
+    if args.diff_against == "cache" and (batch or args.commit or not use_cache):
+        parser.error("--diff-against cache takes a single folder's working tree and --cache")
+    if args.keep_history and (batch or args.commit or not use_cache):
+        parser.error("--keep-history takes a single folder's working tree and --cache")
+    if args.watch and (batch or args.git or args.commit or args.follow_symlinks or args.dedup):
+        parser.error("--watch takes a single folder's working tree, without --git, --commit, --follow-symlinks "
+                     "or --dedup")
+    for folder in roots:
+        if not os.path.isdir(folder):
+            parser.error(f"folder does not exist: {folder}")
+        if args.git or args.commit:
+            try:
+                find_repository(folder)
+            except GitError as e:
+                parser.error(str(e))
+
+    # The baseline is read before the run, which may save a new snapshot
+    baseline = None
+    if args.diff_against == "cache":
+        with ResultCache(args.cache_file) as cache:
+            snapshots = cache.list_snapshots(roots[0], args.method)
+            if snapshots:
+                baseline = cache.load_snapshot(roots[0], args.method, snapshots[0][0])
+        if baseline is None:
+            parser.error(f"no cached snapshot of {roots[0]} for --method {args.method}")
+        taken_at = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snapshots[0][0] / 1e9))
+        baseline_label = f"cached snapshot of {taken_at}"
+    elif args.diff_against:
+        try:
+            baseline, summary = load_json_export(args.diff_against)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot read {args.diff_against}: {e}")
+        try:
+            check_count_method(summary, args.method)
+        except ValueError as e:
+            parser.error(f"cannot compare with {args.diff_against}: {e}")
+        # Batch results are matched on (root, path), single folders on the path
+        if (baseline.roots is not None) != batch:
+            parser.error(f"cannot compare with {args.diff_against}: "
+                         + ("it is not a batch export" if batch else "it is a batch export of several folders"))
+        baseline_label = args.diff_against
+
+    token = CancelToken()
+    stats = RunStats() if args.stats else None
+    finished = threading.Event()
+    analysis = {}
+    watcher = None
+    if args.watch:
+        watcher = FolderWatcher(roots[0], split_list(args.include), split_list(args.exclude_patterns),
+                                split_list(args.exclude_folders), args.method, workers=args.workers,
+                                mmap_threshold=int(args.mmap_threshold * 1024 * 1024), gitignore=args.gitignore)
+
+    def run():
+        # The cache connection belongs to the thread that uses it
+        cache = ResultCache(args.cache_file) if use_cache else None
+        filters = (split_list(args.include), split_list(args.exclude_patterns), split_list(args.exclude_folders))
+        options = dict(
+            workers=args.workers,
+            cache=cache,
+            force_rescan=args.rescan,
+            mmap_threshold=int(args.mmap_threshold * 1024 * 1024),
+            progress=ProgressTracker(print_progress, interval=0.5) if args.progress else None,
+            token=token,
+            stats=stats,
+            dedup=args.dedup
+        )
+        try:
+            if watcher is not None:
+                options = {key: options[key] for key in ('cache', 'force_rescan', 'progress', 'token', 'stats')}
+                analysis['results'] = watcher.analyze(**options)
+            elif batch:
+                analysis['results'] = analyze_roots(roots, *filters, args.method,
+                                                    follow_symlinks=args.follow_symlinks,
+                                                    scanner=scan_git_files if args.git else None,
+                                                    gitignore=args.gitignore, **options)
+            elif args.git or args.commit:
+                analysis['results'] = analyze_repository(roots[0], *filters, args.method, commit=args.commit,
+                                                         **options)
+            else:
+                analysis['results'] = analyze_folder(roots[0], *filters, args.method,
+                                                     follow_symlinks=args.follow_symlinks, gitignore=args.gitignore,
+                                                     **options)
+            if args.keep_history and cache is not None and not token.cancelled:
+                cache.save_snapshot(roots[0], args.method, analysis['results'][0])
+        except Exception as e:
+            analysis['error'] = e
+        finally:
+            if cache is not None:
+                cache.close()
+            finished.set()
+
+    # Count on a helper thread so Ctrl+C can cancel the run and still export
+    # the files counted so far
+    threading.Thread(target=run, daemon=True).start()
+    try:
+        while not finished.wait(0.2):
+            pass
+    except KeyboardInterrupt:
+        print("\nCancelling - exporting partial results...", file=sys.stderr)
+        token.cancel()
+        finished.wait()
+
+    if isinstance(analysis.get('error'), GitError):
+        parser.error(str(analysis['error']))
+    if 'error' in analysis:
+        raise analysis['error']
+    if batch:
+        file_results, extension_stats, root_stats = analysis['results']
+        analyzed = list(root_stats)
+    else:
+        file_results, extension_stats = analysis['results']
+        root_stats = None
+        analyzed = roots[0]
+        if watcher is not None and not token.cancelled:
+            extension_stats = watch(watcher, file_results)
+
+    diff = None
+    if baseline is not None:
+        start = time.perf_counter()
+        diff = diff_results(baseline, file_results, baseline_label, ", ".join(roots))
+        if stats is not None:
+            stats.add("diff", time.perf_counter() - start, len(file_results))
+
+    def write(f):
+        # Rows are streamed to the output, never built up as one string
+        if diff is not None:
+            if args.format == "csv":
+                write_diff_csv(f, diff, sorted_files)
+            else:
+                write_diff_json(f, diff, sorted_files)
+        elif args.format == "csv":
+            write_csv(f, file_results, extension_stats, sorted_files, root_stats)
+        else:
+            write_json(f, file_results, extension_stats, analyzed, args.method, sorted_files, stats, root_stats)
+
+    start = time.perf_counter()
+    sorted_files = diff.sorted_files() if diff is not None else sort_files(file_results)
+    if stats is not None:
+        stats.add("sort", time.perf_counter() - start, len(file_results))
+
+    start = time.perf_counter()
+    if args.output == "-":
+        write(sys.stdout)
+    else:
+        # Use different newline settings for CSV vs JSON
+        newline_setting = '' if args.format == "csv" else None
+        with open(args.output, 'w', encoding='utf-8', newline=newline_setting) as f:
+            write(f)
+
+    if stats is not None:
+        # The export cannot contain its own timing, so it only shows up here
+        stats.add("export", time.perf_counter() - start, len(file_results))
+        print(format_stats(stats), file=sys.stderr)
+
+    if root_stats is not None:
+        for root, root_extension_stats in root_stats.items():
+            files, lines, size = root_totals(root_extension_stats)
+            print(f"{root}: {files} files, {lines:,} lines, {size / (1024 * 1024):.2f} MB", file=sys.stderr)
+    print(format_totals(file_results), file=sys.stderr)
+    metrics = metric_totals(extension_stats)
+    if metrics:
+        print(f"       {metrics['code']:,} code, {metrics['comment']:,} comment, {metrics['blank']:,} blank lines",
+              file=sys.stderr)
+    unique = unique_totals(extension_stats)
+    if unique:
+        print(f"Unique: {unique['files']} files, {unique['lines']:,} lines of code "
+              f"({len(file_results.duplicate_groups())} groups of identical files)", file=sys.stderr)
+    if diff is not None:
+        print(f"Since {diff.old_label}: {format_diff_summary(diff)}", file=sys.stderr)
+    return 130 if token.cancelled else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
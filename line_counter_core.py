@@ -0,0 +1,1324 @@
+"""
+Counting core for the Line Counter tool.
+
+Walking, filtering and counting live here, free of tkinter, so the same code
+runs in the GUI, in worker processes and in the headless command line.
+"""
+
+import os
+import re
+import codecs
+import time
+import mmap
+import stat
+import signal
+import fnmatch
+import hashlib
+import heapq
+import threading
+import multiprocessing
+from pathlib import Path
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+from line_counter_cache import cache_key
+from line_counter_ignore import IGNORE_FILE, IgnoreMatcher
+from line_counter_languages import CLASSIFIER_VERSION, count_nonempty, get_language
+from line_counter_results import METRIC_KEYS, LineMetrics, ResultStore
+
+# Known text file extensions - these should never be considered binary
+TEXT_EXTENSIONS = frozenset({
+    '.txt', '.md', '.rst', '.log', '.ini', '.cfg', '.conf', '.config',
+    '.py', '.pyw', '.js', '.jsx', '.ts', '.tsx', '.html', '.htm', '.xhtml',
+    '.css', '.scss', '.sass', '.less', '.json', '.xml', '.yaml', '.yml',
+    '.java', '.c', '.cpp', '.cc', '.cxx', '.h', '.hpp', '.cs', '.php',
+    '.rb', '.go', '.rs', '.swift', '.kt', '.scala', '.r', '.m', '.mm',
+    '.sh', '.bash', '.zsh', '.fish', '.bat', '.cmd', '.ps1', '.sql',
+    '.pl', '.pm', '.lua', '.tcl', '.vb', '.vbs', '.asm', '.s',
+    '.dockerfile', '.makefile', '.cmake', '.gradle', '.maven',
+    '.gitignore', '.gitattributes', '.htaccess', '.env',
+    '.vue', '.svelte', '.elm', '.dart', '.groovy', '.clj', '.cljs',
+    '.lisp', '.scm', '.rkt', '.hs', '.fs', '.fsx', '.ml', '.mli',
+    '.tex', '.bib', '.sty', '.cls', '.dtx', '.ins'
+})
+
+# Defaults shared by the GUI and the command line
+DEFAULT_INCLUDE_EXTENSIONS = ".py,.js,.html,.css,.java,.cpp,.c,.h,.cs,.php,.rb,.go,.rs,.ts,.jsx,.tsx,.vue,.swift,.kt,.scala,.r,.m,.mm,.sh,.bat,.ps1,.sql"
+DEFAULT_EXCLUDE_PATTERNS = "*.pyc,*.exe,*.dll,*.so,*.o,*.obj, *.md, *.txt"
+DEFAULT_EXCLUDE_FOLDERS = ".git,.svn,__pycache__,node_modules,.vscode"
+
+COUNT_METHODS = ("all", "non_empty", "code_only", "metrics")
+
+# Below this many files a pool costs more to start than it saves
+MIN_PARALLEL_FILES = 256
+
+# Only this much of a file is sniffed when deciding whether it is binary
+BINARY_SNIFF_SIZE = 8192
+
+# Files are streamed in pieces of this size, so memory does not grow with file size
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Regular files at least this big are memory-mapped instead of read (0 disables)
+MMAP_THRESHOLD = 16 * 1024 * 1024
+
+
+def default_worker_count():
+    """Number of workers used when the user does not pick one"""
+    return os.cpu_count() or 1
+
+
+def split_list(value):
+    """Split a comma-separated option string into its stripped, non-empty items"""
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def file_suffix(name):
+    """Same as Path(name).suffix, without building a Path"""
+    i = name.rfind('.')
+    if 0 < i < len(name) - 1:
+        return name[i:]
+    return ''
+
+
+def _compile_patterns(patterns):
+    """Compile fnmatch patterns into (literal_names, combined_regex or None).
+
+    Names are compared after os.path.normcase, exactly like fnmatch.fnmatch.
+    Patterns without wildcards go into a set; the rest become one regex.
+    """
+    literals = set()
+    wildcards = []
+    for pattern in patterns:
+        pattern = os.path.normcase(pattern)
+        if any(ch in pattern for ch in '*?['):
+            wildcards.append(f"(?:{fnmatch.translate(pattern)})")
+        else:
+            literals.add(pattern)
+    regex = re.compile('|'.join(wildcards)) if wildcards else None
+    return frozenset(literals), regex
+
+
+class FileFilter:
+    """Include/exclude rules compiled once per run.
+
+    Exclude patterns and exclude folders are each one literal set plus one
+    combined regex, and the include list is a frozenset, so every check is a
+    couple of hash lookups and at most one regex match.
+
+    Special include patterns:
+      .**  include all extensions, but still apply the exclude patterns
+      .*   include everything, ignoring the exclude patterns
+    """
+
+    def __init__(self, include_exts, exclude_patterns, exclude_folders):
+        include_exts = list(include_exts)
+
+        # Check for special extension patterns
+        self.include_all_except_excluded = ".**" in include_exts
+        self.include_everything = ".*" in include_exts
+
+        # Remove special patterns from the list for normal processing
+        self.include_exts = frozenset(ext for ext in include_exts if ext not in (".**", ".*"))
+
+        self._pattern_literals, self._pattern_regex = _compile_patterns(exclude_patterns)
+        self._folder_literals, self._folder_regex = _compile_patterns(exclude_folders)
+
+    def include_folder(self, name):
+        """True unless the folder name matches an exclude-folder pattern"""
+        name = os.path.normcase(name)
+        if name in self._folder_literals:
+            return False
+        return self._folder_regex is None or self._folder_regex.match(name) is None
+
+    def include_file(self, name):
+        """True if a file with this name should be counted"""
+        if self.include_everything:
+            # .* pattern: include everything
+            return True
+
+        # Check if file should be excluded by pattern
+        normalized = os.path.normcase(name)
+        if normalized in self._pattern_literals:
+            return False
+        if self._pattern_regex is not None and self._pattern_regex.match(normalized):
+            return False
+
+        if self.include_all_except_excluded or not self.include_exts:
+            # .** pattern (exclude patterns already applied), or no extensions
+            # specified: include everything (backward compatibility)
+            return True
+
+        # Normal extension filtering: include only specified extensions
+        return file_suffix(name).lower() in self.include_exts
+
+
+# A point-in-time view of a running analysis, as handed to progress callbacks
+ProgressSnapshot = namedtuple('ProgressSnapshot', [
+    'stage', 'files_found', 'bytes_found', 'files_done', 'bytes_done',
+    'elapsed', 'files_per_sec', 'bytes_per_sec', 'eta'
+])
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside a count when the run's CancelToken is cancelled"""
+
+
+class CancelToken:
+    """Shared cancel and pause/resume state for one analysis run.
+
+    The walker, the engine and every worker call checkpoint() between units of
+    work (folders, batches, read chunks): it blocks while the run is paused and
+    returns True once it has been cancelled. The flags are multiprocessing
+    events so worker processes see them too; where those are unavailable the
+    token falls back to threading events and the engine uses threads.
+    """
+
+    def __init__(self):
+        try:
+            self._cancelled = multiprocessing.Event()
+            self._running = multiprocessing.Event()
+            self.shareable = True
+        except (OSError, ImportError):
+            self._cancelled = threading.Event()
+            self._running = threading.Event()
+            self.shareable = False
+        self._running.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+        # Wake anything blocked on pause so it can stop
+        self._running.set()
+
+    def pause(self):
+        if not self.cancelled:
+            self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def checkpoint(self):
+        """Wait while paused; return True if the run has been cancelled"""
+        if not self._running.is_set():
+            self._running.wait()
+        return self._cancelled.is_set()
+
+
+class ProgressTracker:
+    """Running totals for one analysis.
+
+    The walker reports discovered files and the engine reports counted ones;
+    the callback gets a ProgressSnapshot at most once per `interval` seconds
+    (plus once when each stage starts and when the run finishes), so a GUI
+    event loop is never flooded. All updates come from the thread driving
+    the analysis.
+    """
+
+    def __init__(self, callback=None, interval=0.2):
+        self.callback = callback
+        self.interval = interval
+        self.stage = "scanning"
+        self.files_found = 0
+        self.bytes_found = 0
+        self.files_done = 0
+        self.bytes_done = 0
+        self.started = time.monotonic()
+        self.counting_started = None
+        self._last_emit = 0.0
+
+    def found(self, files, size):
+        """Files were discovered by the walk"""
+        self.files_found += files
+        self.bytes_found += size
+        self._maybe_emit()
+
+    def start_counting(self):
+        self.stage = "counting"
+        self.counting_started = time.monotonic()
+        self._emit()
+
+    def done(self, files, size):
+        """Files were counted (or taken from the cache)"""
+        self.files_done += files
+        self.bytes_done += size
+        self._maybe_emit()
+
+    def finish(self, stage="done"):
+        self.stage = stage
+        self._emit()
+
+    def snapshot(self):
+        now = time.monotonic()
+        files_per_sec = bytes_per_sec = 0.0
+        eta = None
+        if self.counting_started is not None:
+            counting_time = now - self.counting_started
+            if counting_time > 0:
+                files_per_sec = self.files_done / counting_time
+                bytes_per_sec = self.bytes_done / counting_time
+            # Bytes are the better predictor, but empty files still take time
+            if bytes_per_sec > 0 and self.bytes_found > self.bytes_done:
+                eta = (self.bytes_found - self.bytes_done) / bytes_per_sec
+            elif files_per_sec > 0:
+                eta = (self.files_found - self.files_done) / files_per_sec
+        return ProgressSnapshot(self.stage, self.files_found, self.bytes_found, self.files_done, self.bytes_done,
+                                now - self.started, files_per_sec, bytes_per_sec, eta)
+
+    def _maybe_emit(self):
+        if self.callback is not None and time.monotonic() - self._last_emit >= self.interval:
+            self._emit()
+
+    def _emit(self):
+        if self.callback is not None:
+            self._last_emit = time.monotonic()
+            self.callback(self.snapshot())
+
+
+def format_progress(snapshot):
+    """One-line human readable description of a ProgressSnapshot"""
+    mb_found = snapshot.bytes_found / (1024 * 1024)
+    if snapshot.stage == "scanning":
+        return f"Scanning: {snapshot.files_found:,} files found ({mb_found:.1f} MB)"
+
+    mb_done = snapshot.bytes_done / (1024 * 1024)
+    text = (f"Counted {snapshot.files_done:,} / {snapshot.files_found:,} files, "
+            f"{mb_done:.1f} / {mb_found:.1f} MB | "
+            f"{snapshot.files_per_sec:,.0f} files/s, {snapshot.bytes_per_sec / (1024 * 1024):.1f} MB/s")
+    if snapshot.stage == "counting" and snapshot.eta is not None:
+        minutes, seconds = divmod(int(snapshot.eta + 0.5), 60)
+        text += f" | ETA {minutes}:{seconds:02d}"
+    elif snapshot.stage != "counting":
+        text += f" | {snapshot.elapsed:.1f} s total"
+    if snapshot.stage == "cancelled":
+        text = "Cancelled - " + text
+    return text
+
+
+class RunStats:
+    """Opt-in per-stage instrumentation for one analysis.
+
+    Each stage accumulates [seconds, calls, bytes]; the slowest files are
+    kept in a small heap. Code paths only time themselves when handed a
+    RunStats, so a run without one pays a single `is None` check per file.
+    Worker processes fill their own RunStats, which are merged on return.
+    """
+
+    def __init__(self, slowest=10):
+        self.stages = {}
+        self.files = []
+        self.slowest = slowest
+
+    def add(self, stage, seconds, calls=1, size=0):
+        totals = self.stages.get(stage)
+        if totals is None:
+            totals = self.stages[stage] = [0.0, 0, 0]
+        totals[0] += seconds
+        totals[1] += calls
+        totals[2] += size
+
+    def add_file(self, path, seconds, size):
+        item = (seconds, path, size)
+        if len(self.files) < self.slowest:
+            heapq.heappush(self.files, item)
+        elif item > self.files[0]:
+            heapq.heapreplace(self.files, item)
+
+    def merge(self, other):
+        for stage, (seconds, calls, size) in other.stages.items():
+            self.add(stage, seconds, calls, size)
+        for seconds, path, size in other.files:
+            self.add_file(path, seconds, size)
+
+    def slowest_files(self):
+        return sorted(self.files, reverse=True)
+
+    def as_dict(self):
+        """JSON-friendly form, as included in the export's analysis_summary"""
+        return {
+            'stages': {
+                stage: {'seconds': round(seconds, 6), 'calls': calls, 'bytes': size}
+                for stage, (seconds, calls, size) in self.stages.items()
+            },
+            'slowest_files': [
+                {'path': path, 'seconds': round(seconds, 6), 'bytes': size}
+                for seconds, path, size in self.slowest_files()
+            ]
+        }
+
+
+def format_stats(stats):
+    """Multi-line text table of a RunStats"""
+    lines = [f"{'Stage':<16}{'Time (s)':>12}{'Calls':>12}{'MB':>12}"]
+    for stage, (seconds, calls, size) in stats.stages.items():
+        lines.append(f"{stage:<16}{seconds:>12.3f}{calls:>12,}{size / (1024 * 1024):>12.1f}")
+    if stats.files:
+        lines.append("")
+        lines.append(f"Slowest {len(stats.files)} files:")
+        for seconds, path, size in stats.slowest_files():
+            lines.append(f"{seconds * 1000:>10.1f} ms  {size / 1024:>10.1f} KB  {path}")
+    return "\n".join(lines)
+
+
+# A file found by the walker: its path, its path relative to the analyzed
+# folder, its lower-cased extension and the stat data the walk already has
+FileEntry = namedtuple('FileEntry', ['path', 'rel_path', 'extension', 'size', 'mtime_ns'])
+
+
+def scan_files(folder_path, file_filter, follow_symlinks=False, token=None, gitignore=False):
+    """Walk folder_path with os.scandir and yield a FileEntry per included file.
+
+    Excluded folders are pruned before they are opened, excluded files are
+    never stat'ed, and sizes/mtimes come from DirEntry.stat() (free on
+    Windows, one call per file elsewhere). Entries come out in sorted
+    depth-first order - the order os.walk would give with sorted names.
+
+    Unreadable folders and files are reported and skipped without stopping
+    the walk. Symlinked folders are only entered with follow_symlinks, and
+    then each real folder is visited once, so symlink loops terminate.
+
+    With gitignore, .gitignore files (and .git/info/exclude) are honored:
+    each folder gets an IgnoreMatcher, and ignored folders are pruned like
+    excluded ones. gitignore may also be the IgnoreMatcher of folder_path
+    (before its own .gitignore), for a walk of a folder inside a tree whose
+    rules are already known.
+
+    With a CancelToken the walk pauses and stops between folders.
+    """
+    folder_path = os.fspath(folder_path)
+    visited = set()
+    # (directory path, relative prefix, ignore matcher) triples, popped depth-first
+    if gitignore and not isinstance(gitignore, IgnoreMatcher):
+        gitignore = IgnoreMatcher.for_folder(folder_path)
+    stack = [(folder_path, '', gitignore or None)]
+
+    while stack:
+        if token is not None and token.checkpoint():
+            return
+        dir_path, rel_prefix, ignore = stack.pop()
+
+        if follow_symlinks:
+            try:
+                st = os.stat(dir_path)
+            except OSError as e:
+                print(f"Error reading {dir_path}: {e}")
+                continue
+            if (st.st_dev, st.st_ino) in visited:
+                continue
+            visited.add((st.st_dev, st.st_ino))
+
+        try:
+            with os.scandir(dir_path) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            print(f"Error reading {dir_path}: {e}")
+            continue
+
+        if ignore is not None and any(entry.name == IGNORE_FILE for entry in entries):
+            ignore = ignore.with_file(os.path.join(dir_path, IGNORE_FILE))
+
+        subdirs = []
+        for entry in entries:
+            name = entry.name
+            try:
+                if entry.is_dir():
+                    if (file_filter.include_folder(name) and (follow_symlinks or not entry.is_symlink())
+                            and (ignore is None or not ignore.ignored(name, True))):
+                        child_ignore = ignore.child(name) if ignore is not None else None
+                        subdirs.append((entry.path, rel_prefix + name + os.sep, child_ignore))
+                    continue
+
+                if not file_filter.include_file(name) or not entry.is_file():
+                    continue
+                if ignore is not None and ignore.ignored(name, False):
+                    continue
+
+                st = entry.stat()
+            except OSError as e:
+                print(f"Error reading {entry.path}: {e}")
+                continue
+
+            yield FileEntry(entry.path, rel_prefix + name, file_suffix(name).lower(), st.st_size, st.st_mtime_ns)
+
+        # Push in reverse so the first folder (by name) is walked next
+        stack.extend(reversed(subdirs))
+
+
+def analyze_folder(folder_path, include_exts, exclude_patterns, exclude_folders, method="all", workers=None,
+                   cache=None, force_rescan=False, mmap_threshold=MMAP_THRESHOLD, follow_symlinks=False,
+                   progress=None, token=None, stats=None, scanner=None, gitignore=False, dedup=False):
+    """Walk, filter and count a folder; returns (file_results, extension_stats)
+
+    progress is an optional ProgressTracker that is kept up to date. With a
+    CancelToken the run can be paused, resumed and cancelled; a cancelled run
+    returns the files counted so far. With a RunStats, per-stage timings are
+    recorded into it. gitignore skips files and folders ignored by git's
+    ignore files. scanner replaces the walk: a callable taking
+    (folder_path, file_filter, token) that yields FileEntry items, such as
+    line_counter_git.scan_git_files. dedup finds files with identical
+    content (see CountingEngine).
+    """
+    progress = progress or ProgressTracker()
+    file_filter = FileFilter(include_exts, exclude_patterns, exclude_folders)
+
+    entries = []
+    walk_start = time.perf_counter()
+    if scanner is None:
+        found = scan_files(folder_path, file_filter, follow_symlinks=follow_symlinks, token=token, gitignore=gitignore)
+    else:
+        found = scanner(folder_path, file_filter, token)
+    for entry in found:
+        entries.append(entry)
+        progress.found(1, entry.size)
+    if stats is not None:
+        stats.add("walk", time.perf_counter() - walk_start, len(entries), sum(entry.size for entry in entries))
+
+    engine = CountingEngine(method, workers=workers, cache=cache, force_rescan=force_rescan,
+                            mmap_threshold=mmap_threshold, progress=progress, token=token, stats=stats, dedup=dedup)
+    results = engine.count_entries(folder_path, entries)
+    progress.finish("cancelled" if token is not None and token.cancelled else "done")
+    return results
+
+
+def read_manifest(manifest_path):
+    """Folders listed in a manifest file: one per line, # comments, relative to the manifest's folder"""
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, encoding='utf-8') as f:
+        lines = [line.strip() for line in f]
+    return [os.path.join(base, os.path.expanduser(line)) for line in lines if line and not line.startswith('#')]
+
+
+def analyze_roots(roots, include_exts, exclude_patterns, exclude_folders, method="all", workers=None,
+                  cache=None, force_rescan=False, mmap_threshold=MMAP_THRESHOLD, follow_symlinks=False,
+                  progress=None, token=None, stats=None, scanner=None, gitignore=False, dedup=False):
+    """Analyze several folders as one batch; returns (file_results, extension_stats, root_stats)
+
+    The roots are walked concurrently and their files are counted by one
+    engine, so a single worker pool serves the whole batch. file_results
+    rows carry their root, extension_stats is the combined rollup and
+    root_stats maps each root to its own extension_stats. A root listed
+    twice is analyzed once. Other arguments are as for analyze_folder.
+    """
+    progress = progress or ProgressTracker()
+    file_filter = FileFilter(include_exts, exclude_patterns, exclude_folders)
+
+    unique = {}
+    for root in roots:
+        unique.setdefault(os.path.normcase(os.path.abspath(root)), os.fspath(root))
+    roots = list(unique.values())
+
+    def walk(root):
+        if scanner is not None:
+            return list(scanner(root, file_filter, token))
+        return list(scan_files(root, file_filter, follow_symlinks=follow_symlinks, token=token, gitignore=gitignore))
+
+    # Walks are mostly waiting on the file system, so they overlap well on threads
+    root_entries = [None] * len(roots)
+    walk_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(len(roots), workers or default_worker_count()))) as pool:
+        futures = {pool.submit(walk, root): i for i, root in enumerate(roots)}
+        for future in as_completed(futures):
+            entries = root_entries[futures[future]] = future.result()
+            progress.found(len(entries), sum(entry.size for entry in entries))
+    if stats is not None:
+        stats.add("walk", time.perf_counter() - walk_start, sum(map(len, root_entries)),
+                  sum(entry.size for entries in root_entries for entry in entries))
+
+    engine = CountingEngine(method, workers=workers, cache=cache, force_rescan=force_rescan,
+                            mmap_threshold=mmap_threshold, progress=progress, token=token, stats=stats, dedup=dedup)
+    results = engine.count_roots(roots, root_entries)
+    progress.finish("cancelled" if token is not None and token.cancelled else "done")
+    return results
+
+
+def group_by_extension(file_results):
+    """Bucket file results by extension in one pass: {extension: [file_info, ...]}"""
+    if isinstance(file_results, ResultStore):
+        return file_results.group_by_extension()
+    buckets = {}
+    for file_info in file_results:
+        bucket = buckets.get(file_info['extension'])
+        if bucket is None:
+            buckets[file_info['extension']] = bucket = []
+        bucket.append(file_info)
+    return buckets
+
+
+def metric_totals(extension_stats):
+    """{'code', 'comment', 'blank'} totals of a "metrics" run, or None for single-method results"""
+    if not any('code' in stats for stats in extension_stats.values()):
+        return None
+    return {key: sum(stats[key] for stats in extension_stats.values()) for key in METRIC_KEYS}
+
+
+def unique_totals(extension_stats):
+    """{'files', 'lines'} counting each content once, or None for results of a run without dedup"""
+    if not any('unique_lines' in stats for stats in extension_stats.values()):
+        return None
+    return {key: sum(stats[f'unique_{key}'] for stats in extension_stats.values()) for key in ('files', 'lines')}
+
+
+def summarize(file_results):
+    """Return (total_files, total_lines, total_size) for a result list, excluding binary files from the line count"""
+    if isinstance(file_results, ResultStore):
+        return file_results.totals()
+    total_lines = sum(result['lines'] for result in file_results if result['lines'] != "binary" and isinstance(result['lines'], int))
+    total_size = sum(result['size'] for result in file_results)
+    return len(file_results), total_lines, total_size
+
+
+# Expanded definition of text characters including more Unicode ranges:
+# ASCII printable (32-126) + common control chars (9=tab, 10=LF, 13=CR) + extended ASCII (128-255).
+# Everything else is deleted before measuring the text ratio.
+_NON_TEXT_BYTES = bytes(b for b in range(256) if not ((32 <= b <= 126) or b in (9, 10, 13) or b >= 128))
+
+
+def _is_plain_ascii(data):
+    """True if bytes.strip() treats data exactly like str.strip() would.
+
+    That holds for ASCII without the \\x1c-\\x1f separators, which only
+    str.strip() removes. Each `in` test is a single memchr scan.
+    """
+    return (data.isascii() and b'\x1c' not in data and b'\x1d' not in data
+            and b'\x1e' not in data and b'\x1f' not in data)
+
+
+def is_binary_chunk(chunk):
+    """Check if the first bytes of a file look binary"""
+    # Empty files are not binary
+    if len(chunk) == 0:
+        return False
+
+    # Check for null bytes which strongly indicate binary files
+    if b'\x00' in chunk:
+        return True
+
+    # Count text-like bytes in C: deleting every non-text byte leaves only the text ones
+    text_chars = len(chunk.translate(None, _NON_TEXT_BYTES))
+
+    # Much more lenient threshold - only consider binary if less than 50% are text-like
+    return text_chars / len(chunk) < 0.50
+
+
+def is_binary_file(file_path):
+    """Check if a file is binary by examining the first 8192 bytes"""
+    try:
+        # If it's a known text extension, don't consider it binary
+        if Path(file_path).suffix.lower() in TEXT_EXTENSIONS:
+            return False
+
+        # For files without extension or unknown extensions, check content
+        with open(file_path, 'rb') as f:
+            return is_binary_chunk(f.read(BINARY_SNIFF_SIZE))
+    except OSError:
+        # If we can't read the file, assume it's binary to be safe
+        return True
+
+
+def count_file_lines(file_path, method, mmap_threshold=MMAP_THRESHOLD, token=None, stats=None, hasher=None):
+    """Count lines in a file based on the selected method.
+
+    The file is opened once and streamed in READ_CHUNK_SIZE pieces: the binary
+    check looks at the start of the first chunk and lines are counted on the
+    raw bytes, so memory use does not grow with the file size. Regular files
+    of at least mmap_threshold bytes are memory-mapped instead.
+
+    With a CancelToken, AnalysisCancelled is raised between chunks once the
+    run is cancelled (the file is closed first). With a RunStats the binary
+    sniff is timed. A ContentHash, if given, is fed the same chunks as the
+    counter (binary files are not hashed).
+    """
+    file_ext = Path(file_path).suffix.lower()
+    known_text = file_ext in TEXT_EXTENSIONS
+
+    try:
+        with open(file_path, 'rb') as f:
+            if mmap_threshold:
+                lines = _count_mapped(f, method, file_ext, known_text, mmap_threshold, token, stats, hasher)
+                if lines is not None:
+                    return lines
+
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not known_text and _sniff_binary(chunk, stats):
+                return "binary"
+
+            counter = LineCounter(method, file_ext)
+            while chunk:
+                counter.feed(chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
+                if token is not None and token.checkpoint():
+                    raise AnalysisCancelled()
+                chunk = f.read(READ_CHUNK_SIZE)
+            return counter.finish()
+    except OSError:
+        # Unreadable: unknown types are treated as binary, like is_binary_file does
+        if not known_text:
+            return "binary"
+        return LineMetrics(0, 0, 0, 0) if method == "metrics" else 0
+
+
+def _count_mapped(f, method, file_ext, known_text, mmap_threshold, token=None, stats=None, hasher=None):
+    """Count a large regular file through mmap; None means use the read() path.
+
+    Lines are counted on READ_CHUNK_SIZE windows of the mapping, which skips
+    the read() syscalls and buffer churn, and MADV_SEQUENTIAL lets the kernel
+    drop pages behind the scan. Empty files, pipes/devices and platforms where
+    mapping fails fall back to plain reads.
+    """
+    st = os.fstat(f.fileno())
+    if not stat.S_ISREG(st.st_mode) or st.st_size < max(mmap_threshold, 1):
+        return None
+
+    try:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    with mapped:
+        if hasattr(mapped, 'madvise'):
+            try:
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            except (OSError, AttributeError):
+                pass
+
+        size = len(mapped)
+        if not known_text and _sniff_binary(mapped, stats):
+            return "binary"
+
+        counter = LineCounter(method, file_ext)
+        for start in range(0, size, READ_CHUNK_SIZE):
+            chunk = mapped[start:start + READ_CHUNK_SIZE]
+            counter.feed(chunk)
+            if hasher is not None:
+                hasher.update(chunk)
+            if token is not None and token.checkpoint():
+                raise AnalysisCancelled()
+        return counter.finish()
+
+
+def _sniff_binary(data, stats):
+    """is_binary_chunk on the first BINARY_SNIFF_SIZE bytes, timed into stats if given"""
+    if stats is None:
+        return is_binary_chunk(data[:BINARY_SNIFF_SIZE])
+    start = time.perf_counter()
+    binary = is_binary_chunk(data[:BINARY_SNIFF_SIZE])
+    stats.add("binary_sniff", time.perf_counter() - start, 1, min(len(data), BINARY_SNIFF_SIZE))
+    return binary
+
+
+class ContentHash:
+    """Streaming content fingerprint, fed the chunks count_file_lines reads.
+
+    BLAKE2b cut to 128 bits: fast in C, and equal digests of two files of
+    the same size mean equal content. size counts the bytes fed, so a file
+    that changed or could not be read completely is recognized.
+    """
+
+    def __init__(self):
+        self.hash = hashlib.blake2b(digest_size=16)
+        self.size = 0
+
+    def update(self, chunk):
+        self.hash.update(chunk)
+        self.size += len(chunk)
+
+    def digest(self):
+        return self.hash.digest()
+
+
+# Bytes that only occur in multi-byte UTF-8 characters, or in invalid sequences
+_NON_ASCII = bytes(range(128, 256))
+
+# A \r and a \n with only non-ASCII bytes between them: a single line end if those bytes decode to nothing
+_CR_NON_ASCII_LF = re.compile(rb'\r([\x80-\xff]+)\n')
+
+_Utf8Decoder = codecs.getincrementaldecoder('utf-8')
+
+
+def count_lines_in_bytes(data, method, file_extension=""):
+    """Count lines in an in-memory buffer (see LineCounter)"""
+    counter = LineCounter(method, file_extension)
+    counter.feed(data)
+    return counter.finish()
+
+
+class LineCounter:
+    """Incremental line counter fed with consecutive chunks of a file.
+
+    Gives the same answer as reading the whole file in text mode (UTF-8,
+    errors ignored, universal newlines) but works on bytes: "all" only counts
+    line terminators, and "non_empty" / "code_only" carry the unfinished last
+    line of each chunk over to the next one. Complete lines are classified on
+    bytes when they are pure ASCII and decoded once otherwise, so strip()
+    still sees Unicode whitespace. "code_only" resolves the file's Language
+    once and keeps an open block comment across chunks.
+    """
+
+    # Longer partial lines are cut down to the few characters that decide them
+    MAX_CARRY = READ_CHUNK_SIZE
+
+    def __init__(self, method, file_extension=""):
+        self.method = method if method in ("non_empty", "code_only", "metrics") else "all"
+        # Resolved once per file; None counts every non-blank line
+        self.language = get_language(file_extension) if self.method in ("code_only", "metrics") else None
+        self.state = None        # block comment left open by the previous chunk ("code_only" / "metrics")
+        self.count = 0
+        self.total = 0           # line terminators ("metrics")
+        self.nonempty = 0        # non-blank complete lines ("metrics")
+        self.carry = b''         # unfinished last line (every method but "all")
+        # The line after the last line end ("all" / "metrics"): whether its bytes so far decode to
+        # text, whether that line end was a \r, and the decoder of its non-ASCII bytes while they do not
+        self.line_open = False
+        self.after_cr = False
+        self.decoder = _Utf8Decoder('ignore')
+
+    def feed(self, chunk):
+        if not chunk:
+            return
+
+        if self.method in ("all", "metrics"):
+            count = self._count_line_ends(chunk)
+            if self.method == "all":
+                self.count += count
+                return
+            self.total += count
+
+        data = self.carry + chunk if self.carry else chunk
+        if b'\r' in data:
+            # A \r\n split across chunks only adds an empty line, which these methods never count
+            data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+
+        cut = data.rfind(b'\n')
+        if cut < 0:
+            self.carry = data
+        else:
+            self.count += self._count_complete(data[:cut])
+            self.carry = data[cut + 1:]
+
+        if len(self.carry) > self.MAX_CARRY:
+            self._compact_carry()
+
+    def finish(self):
+        """Return the final count, including a last line without a trailing newline"""
+        if self.method == "all":
+            return self.count + self.line_open
+        if self.carry:
+            self.count += self._count_complete(self.carry)
+            self.carry = b''
+        if self.method == "metrics":
+            total = self.total + self.line_open
+            return LineMetrics(total, self.count, self.nonempty - self.count, total - self.nonempty)
+        return self.count
+
+    def _count_line_ends(self, chunk):
+        """Count the line ends in a chunk the way a text-mode read that drops invalid UTF-8 does.
+
+        Universal newlines: \\r\\n and lone \\r end a line too. Dropped bytes
+        only matter between a \\r and a \\n, where they leave a single \\r\\n,
+        and after the last line end, where they leave no last line; only
+        non-ASCII bytes can be dropped, so ASCII chunks skip the decoding.
+        """
+        count = chunk.count(b'\n')
+        has_cr = b'\r' in chunk
+        if has_cr:
+            count += chunk.count(b'\r') - chunk.count(b'\r\n')
+        ascii_only = chunk.isascii()
+        if not ascii_only and has_cr:
+            count -= sum(1 for match in _CR_NON_ASCII_LF.finditer(chunk)
+                         if not match.group(1).decode('utf-8', errors='ignore'))
+
+        # The start of the chunk continues the last line of the previous one
+        head = 0 if ascii_only else len(chunk) - len(chunk.lstrip(_NON_ASCII))
+        if not self.line_open:
+            if head:
+                self.line_open = bool(self.decoder.decode(chunk[:head]))
+            if self.after_cr and not self.line_open and chunk[head:head + 1] == b'\n':
+                count -= 1  # \r\n split across chunks, possibly around bytes that decode to nothing
+
+        end = max(chunk.rfind(b'\n'), chunk.rfind(b'\r')) if has_cr else chunk.rfind(b'\n')
+        if end < 0:
+            self.line_open = self.line_open or head < len(chunk)
+        else:
+            tail = chunk[end + 1:]
+            self.after_cr = chunk[end] == 13
+            self.decoder.reset()
+            # An ASCII byte is never dropped, so only an all non-ASCII tail needs decoding
+            self.line_open = bool(tail.lstrip(_NON_ASCII)) or bool(self.decoder.decode(tail))
+        return count
+
+    def _count_complete(self, data):
+        """Count the lines in a run of complete, \\n-separated lines"""
+        ascii_only = _is_plain_ascii(data)
+        if not ascii_only:
+            # Non-ASCII content: decode once so strip() sees Unicode whitespace
+            data = data.decode('utf-8', errors='ignore')
+
+        if self.method == "metrics":
+            # Blank lines come out of the same buffer; comments are non-blank lines that are not code
+            nonempty = count_nonempty(data)
+            self.nonempty += nonempty
+            if self.language is None:
+                return nonempty
+        elif self.language is None:
+            return count_nonempty(data)
+
+        # Whole-buffer scan; the open block comment, if any, carries over to the next chunk
+        classifier = self.language.bytes if ascii_only else self.language.text
+        count, self.state = classifier.count_code(data, self.state)
+        return count
+
+    def _compact_carry(self):
+        """Shrink a very long unfinished line to the start that decides how it counts"""
+        if self.language is not None and self._compact_scanned():
+            return
+        # Keep the last few bytes raw so a multi-byte character cut by the chunk boundary survives
+        head, tail = self.carry[:-3], self.carry[-3:]
+        stripped = head.lstrip()
+        if _is_plain_ascii(stripped[:16]):
+            head = stripped[:8]
+        else:
+            head = head.decode('utf-8', errors='ignore').lstrip()[:8].encode('utf-8')
+        self.carry = head + tail
+
+    def _compact_scanned(self):
+        """Scan most of the carried line now and replace it by a short equivalent start.
+
+        The cut is placed between two ASCII bytes that are not part of any
+        comment token, so no token or multi-byte character is split.
+        """
+        carry = self.carry
+        safe = self.language.bytes.safe
+        low = max(len(carry) - 67, 0)
+        cut = len(carry) - 3
+        while cut > low and not (carry[cut - 1] in safe and carry[cut] in safe):
+            cut -= 1
+        if cut <= low:
+            return False
+
+        head = carry[:cut]
+        if _is_plain_ascii(head):
+            code, state, rest_comment = self.language.bytes.scan_line(head, self.state)
+        else:
+            head = head.decode('utf-8', errors='ignore')
+            code, state, rest_comment = self.language.text.scan_line(head, self.state)
+        self.carry = self.language.resume(code, state, rest_comment, bool(head.strip())) + carry[cut:]
+        self.state = None
+        return True
+
+
+def is_comment_line(line, file_extension):
+    """True if a line, read on its own, is a comment (no block state from earlier lines)"""
+    language = get_language(file_extension)
+    if language is None or not line.strip():
+        return False
+    return not language.text.scan_line(line)[0]
+
+
+def _stat_batch(paths):
+    """Return (size, mtime_ns) for every path in the batch (None if it vanished)"""
+    stats = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            stats.append((st.st_size, st.st_mtime_ns))
+        except OSError as e:
+            print(f"Error reading {path}: {e}")
+            stats.append(None)
+    return stats
+
+
+# CancelToken handed to each worker process by _init_worker
+_worker_token = None
+
+
+def _init_worker(token):
+    global _worker_token
+    _worker_token = token
+    # Ctrl+C is handled by the parent, which cancels through the token
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _count_batch(paths, method, mmap_threshold=MMAP_THRESHOLD, token=None, sizes=None, fingerprint=None):
+    """Count a batch of files; runs inside a worker process.
+
+    Once the run is cancelled the rest of the batch is left as None. When the
+    file sizes are given the batch is instrumented and (counts, RunStats) is
+    returned instead of counts. fingerprint lists, per path, the size the walk
+    saw for files to hash (None for the others); the result then comes back
+    as (result, digests), with a digest only for text files read in full.
+    """
+    token = token or _worker_token
+    stats = RunStats() if sizes is not None else None
+    counts = []
+    digests = [None] * len(paths)
+    for i, path in enumerate(paths):
+        if token is not None and token.checkpoint():
+            break
+        if stats is not None:
+            start = time.perf_counter()
+            sniffed = stats.stages.get("binary_sniff", (0.0,))[0]
+        hasher = ContentHash() if fingerprint is not None and fingerprint[i] is not None else None
+        try:
+            counts.append(count_file_lines(path, method, mmap_threshold, token, stats, hasher))
+        except AnalysisCancelled:
+            break
+        except Exception as e:
+            print(f"Error reading {path}: {e}")
+            counts.append(None)
+        if hasher is not None and counts[i] not in (None, "binary") and hasher.size == fingerprint[i]:
+            digests[i] = hasher.digest()
+        if stats is not None:
+            elapsed = time.perf_counter() - start
+            size = sizes[i]
+            # Reading and counting, without the sniff that is recorded on its own
+            stats.add("read_count", elapsed - (stats.stages.get("binary_sniff", (0.0,))[0] - sniffed), 1, size)
+            stats.add_file(path, elapsed, size)
+    counts += [None] * (len(paths) - len(counts))
+    result = counts if stats is None else (counts, stats)
+    return result if fingerprint is None else (result, digests)
+
+
+def _cache_method(method):
+    """Cache key for a count method; code_only entries from an older classifier are never reused"""
+    return f"{method}/{CLASSIFIER_VERSION}" if method == "code_only" else method
+
+
+# A "metrics" result is cached as the three single-method entries it is made of
+_METRICS_CACHE_METHODS = (_cache_method("all"), _cache_method("non_empty"), _cache_method("code_only"))
+
+
+class CountingEngine:
+    """Counts a list of files using a pool of workers.
+
+    count_entries takes FileEntry items whose stat data is already known
+    (from scan_files); count stats plain paths on a thread pool first (stat
+    calls release the GIL). The read/classify/count work is spread over a
+    process pool in fixed-size batches. Results always come back in the order the paths were given, so
+    the output does not depend on which worker finished first.
+
+    With a ResultCache, files whose size and mtime match the cached entry are
+    not reopened at all; force_rescan ignores the cache (but refreshes it).
+
+    Files of at least mmap_threshold bytes are memory-mapped (0 disables).
+    Progress is reported to the given ProgressTracker as batches complete.
+
+    With a CancelToken, workers pause and stop at their next checkpoint;
+    batches not yet started are dropped and only the counted files are
+    returned. With a RunStats, cache, counting and aggregation are timed and
+    the workers' per-file timings are merged into it.
+
+    With dedup, files with identical content are found and the results are
+    marked with ResultStore.mark_duplicates. Files are first bucketed by
+    size: only a file that shares its size with another one can be a copy,
+    so only those are hashed, by a ContentHash fed during the counting read.
+    Empty and binary files are never hashed. Digests are cached alongside
+    the counts.
+    """
+
+    def __init__(self, method="all", workers=None, use_processes=True, batch_size=64,
+                 cache=None, force_rescan=False, mmap_threshold=MMAP_THRESHOLD, progress=None, token=None,
+                 stats=None, dedup=False):
+        self.method = method
+        self.cache_method = _cache_method(method)
+        self.token = token
+        self.stats = stats
+        self.progress = progress or ProgressTracker()
+        self.mmap_threshold = mmap_threshold
+        self.workers = max(1, workers or default_worker_count())
+        self.use_processes = use_processes
+        self.batch_size = max(1, batch_size)
+        self.cache = cache
+        self.force_rescan = force_rescan
+        self.dedup = dedup
+
+    def count(self, folder_path, file_paths):
+        """Stat and count the given files and return (file_results, extension_stats)"""
+        folder_path = Path(folder_path)
+        file_paths = [Path(p) for p in file_paths]
+
+        stat_batches = self._batches(file_paths)
+        if self._run_inline(file_paths):
+            stats = [stat for batch in stat_batches for stat in _stat_batch(batch)]
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers) as io_pool:
+                stats = [stat for batch_stats in io_pool.map(_stat_batch, stat_batches) for stat in batch_stats]
+
+        entries = [
+            FileEntry(str(path), str(path.relative_to(folder_path)), path.suffix.lower(), *stat)
+            for path, stat in zip(file_paths, stats) if stat is not None
+        ]
+        self.progress.found(len(entries), sum(entry.size for entry in entries))
+        return self.count_entries(folder_path, entries)
+
+    def count_entries(self, folder_path, entries):
+        """Count already stat'ed FileEntry items and return (file_results, extension_stats)"""
+        counts, digests = self._count_all([folder_path], entries)
+        start = time.perf_counter()
+        results = self._collect(entries, counts, digests)
+        self._record("aggregate", start, len(entries))
+        return results
+
+    def count_roots(self, roots, root_entries):
+        """Count the FileEntry lists of several roots as one job.
+
+        Batches from all roots share the pool, so workers never sit idle
+        between roots. Returns (file_results, extension_stats, root_stats):
+        file_results carries each file's root, extension_stats is the
+        combined rollup and root_stats maps each root to its own
+        extension_stats.
+        """
+        entries = [entry for group in root_entries for entry in group]
+        counts, digests = self._count_all(roots, entries)
+
+        start = time.perf_counter()
+        file_results = ResultStore()
+        keys = []
+        root_stats = {}
+        offset = 0
+        for root, group in zip(roots, root_entries):
+            root_results, root_keys = self._collect_store(group, counts[offset:offset + len(group)],
+                                                          digests[offset:offset + len(group)] if digests else None)
+            for i, entry in enumerate(group):
+                if counts[offset + i] is not None:
+                    file_results.append(entry.rel_path, counts[offset + i], entry.size, entry.extension, root=root)
+            keys += root_keys
+            root_stats[root] = root_results.extension_stats()
+            offset += len(group)
+        if digests is not None:
+            # Copies are found across roots too: shared code counts once in the combined totals
+            file_results.mark_duplicates(keys)
+        self._record("aggregate", start, len(entries))
+        return file_results, file_results.extension_stats(), root_stats
+
+    def _count_all(self, folder_paths, entries):
+        """(counts, digests) for entries in input order; the cache covers folder_paths.
+
+        counts are None where cancelled; digests is None without dedup, else
+        the content digest of every hashed file (None for the others).
+        """
+        # Only files whose size is shared with another file can have a copy
+        hashed = None
+        if self.dedup:
+            start = time.perf_counter()
+            size_counts = Counter(entry.size for entry in entries)
+            hashed = [entry.size > 0 and size_counts[entry.size] > 1 for entry in entries]
+            self._record("size_buckets", start, len(entries))
+
+        # Reuse cached counts for files whose size and mtime did not change
+        start = time.perf_counter()
+        use_cache = self.cache is not None and self.cache.enabled
+        cached = {}
+        cached_digests = {}
+        if use_cache and not self.force_rescan:
+            for folder_path in folder_paths:
+                cached.update(self._cache_lookup(folder_path))
+                if hashed is not None:
+                    cached_digests.update(self.cache.lookup_digests(folder_path))
+        keys = [cache_key(entry.path) for entry in entries] if use_cache else None
+
+        counts = [None] * len(entries)
+        digests = [None] * len(entries) if hashed is not None else None
+        hit_keys = []
+        digest_hit_keys = []
+        hit_bytes = 0
+        misses = []
+        for i, entry in enumerate(entries):
+            hit = cached.get(keys[i]) if cached else None
+            if hit is not None and hit[0] == entry.size and hit[1] == entry.mtime_ns:
+                if hashed is not None and hashed[i] and hit[2] != "binary":
+                    # A file to hash is only skipped when its digest is cached too
+                    known = cached_digests.get(keys[i])
+                    if known is None or known[:2] != hit[:2]:
+                        misses.append(i)
+                        continue
+                    digests[i] = known[2]
+                    digest_hit_keys.append(keys[i])
+                counts[i] = hit[2]
+                hit_keys.append(keys[i])
+                hit_bytes += entry.size
+            else:
+                misses.append(i)
+        if use_cache:
+            self._record("cache_lookup", start, len(entries), hit_bytes)
+
+        self.progress.start_counting()
+        self.progress.done(len(hit_keys), hit_bytes)
+
+        # Count everything else
+        start = time.perf_counter()
+        miss_sizes = [entries[i].size for i in misses]
+        fingerprint = [entries[i].size if hashed[i] else None for i in misses] if hashed is not None else None
+        miss_counts, miss_digests = self._count_paths([entries[i].path for i in misses], miss_sizes, fingerprint)
+        for i, lines, digest in zip(misses, miss_counts, miss_digests):
+            counts[i] = lines
+            if digests is not None:
+                digests[i] = digest
+        self._record("count_wall", start, len(misses), sum(miss_sizes))
+
+        if use_cache:
+            start = time.perf_counter()
+            self._cache_update([
+                (keys[i], entries[i].size, entries[i].mtime_ns, counts[i], entries[i].extension)
+                for i in misses if counts[i] is not None
+            ], hit_keys)
+            if digests is not None:
+                self.cache.update_digests([
+                    (keys[i], entries[i].size, entries[i].mtime_ns, digests[i])
+                    for i in misses if digests[i] is not None
+                ], digest_hit_keys)
+            self._record("cache_update", start, len(misses))
+        return counts, digests
+
+    def _cache_lookup(self, folder_path):
+        """Cached {key: (size, mtime_ns, lines)}; "metrics" joins the all / non_empty / code_only entries"""
+        if self.method != "metrics":
+            return self.cache.lookup(folder_path, self.cache_method)
+
+        totals, nonempty, code = (self.cache.lookup(folder_path, method) for method in _METRICS_CACHE_METHODS)
+        cached = {}
+        for key, (size, mtime_ns, total) in totals.items():
+            parts = (nonempty.get(key), code.get(key))
+            if any(part is None or part[:2] != (size, mtime_ns) for part in parts):
+                continue
+            if total == "binary":
+                cached[key] = (size, mtime_ns, "binary")
+            else:
+                lines_nonempty, lines_code = parts[0][2], parts[1][2]
+                cached[key] = (size, mtime_ns, LineMetrics(total, lines_code, lines_nonempty - lines_code,
+                                                           total - lines_nonempty))
+        return cached
+
+    def _cache_update(self, entries, hit_keys):
+        """Store (key, size, mtime_ns, lines, extension) entries; metrics are split per method"""
+        if self.method != "metrics":
+            self.cache.update(self.cache_method, entries, hit_keys)
+            return
+
+        def part(lines, index):
+            if lines == "binary":
+                return lines
+            return (lines.total, lines.total - lines.blank, lines.code)[index]
+
+        for index, method in enumerate(_METRICS_CACHE_METHODS):
+            self.cache.update(method, (
+                (key, size, mtime_ns, part(lines, index), extension)
+                for key, size, mtime_ns, lines, extension in entries
+            ), hit_keys)
+
+    def _record(self, stage, start, calls=1, size=0):
+        """Add the time since start to a stage, if instrumentation is on"""
+        if self.stats is not None:
+            self.stats.add(stage, time.perf_counter() - start, calls, size)
+
+    def _run_inline(self, paths):
+        """Small jobs (or a single worker) skip the pools entirely"""
+        return self.workers == 1 or len(paths) < MIN_PARALLEL_FILES
+
+    def _batches(self, paths):
+        return [paths[i:i + self.batch_size] for i in range(0, len(paths), self.batch_size)]
+
+    def _count_paths(self, paths, sizes, fingerprint=None):
+        """(counts, digests) of the files, keeping input order and reporting progress per batch.
+
+        fingerprint is as for _count_batch, over all paths; without it the
+        digests are all None.
+        """
+        batches = self._batches(range(len(paths)))
+        counts = [None] * len(paths)
+        digests = [None] * len(paths)
+        remaining = set(range(len(batches)))
+
+        def finish(b, batch_counts):
+            if fingerprint is not None:
+                batch_counts, batch_digests = batch_counts
+                for i, digest in zip(batches[b], batch_digests):
+                    digests[i] = digest
+            if self.stats is not None:
+                batch_counts, batch_stats = batch_counts
+                self.stats.merge(batch_stats)
+            for i, lines in zip(batches[b], batch_counts):
+                counts[i] = lines
+            remaining.discard(b)
+            self.progress.done(len(batches[b]), sum(sizes[i] for i in batches[b]))
+
+        if self._run_inline(paths):
+            for b, batch in enumerate(batches):
+                if self._cancelled():
+                    break
+                finish(b, _count_batch([paths[i] for i in batch], self.method, self.mmap_threshold, self.token,
+                                       self._batch_sizes(batch, sizes), self._batch_fingerprint(batch, fingerprint)))
+            return counts, digests
+
+        # Worker processes can only see the token if it is backed by multiprocessing events
+        if self.use_processes and (self.token is None or self.token.shareable):
+            try:
+                with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                         initargs=(self.token,)) as cpu_pool:
+                    self._drain(cpu_pool, paths, sizes, batches, remaining, finish, None, fingerprint)
+            except (OSError, NotImplementedError, RuntimeError) as e:
+                # Some environments (sandboxes, frozen builds without
+                # freeze_support) cannot spawn processes - use threads instead
+                print(f"Process pool unavailable, falling back to threads: {e}")
+
+        if remaining and not self._cancelled():
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                self._drain(pool, paths, sizes, batches, remaining, finish, self.token, fingerprint)
+        return counts, digests
+
+    def _cancelled(self):
+        return self.token is not None and self.token.checkpoint()
+
+    def _batch_sizes(self, batch, sizes):
+        """File sizes for a batch when instrumenting (which makes workers time themselves), else None"""
+        return [sizes[i] for i in batch] if self.stats is not None else None
+
+    def _batch_fingerprint(self, batch, fingerprint):
+        """The fingerprint sizes for a batch, or None when not hashing"""
+        return [fingerprint[i] for i in batch] if fingerprint is not None else None
+
+    def _drain(self, pool, paths, sizes, batches, remaining, finish, token, fingerprint=None):
+        """Submit the remaining batches to the pool and collect them as they complete.
+
+        On cancel, batches that have not started are cancelled so the pool
+        shuts down as soon as the running ones reach their next checkpoint.
+        """
+        futures = {
+            pool.submit(_count_batch, [paths[i] for i in batches[b]], self.method, self.mmap_threshold, token,
+                        self._batch_sizes(batches[b], sizes), self._batch_fingerprint(batches[b], fingerprint)): b
+            for b in sorted(remaining)
+        }
+        for future in as_completed(futures):
+            finish(futures[future], future.result())
+            if self.token is not None and self.token.cancelled:
+                for pending in futures:
+                    pending.cancel()
+                break
+
+    def _collect(self, entries, counts, digests=None):
+        """Build file_results (a ResultStore) / extension_stats in input order"""
+        file_results = self._collect_store(entries, counts, digests)[0]
+        return file_results, file_results.extension_stats()
+
+    def _collect_store(self, entries, counts, digests):
+        """A ResultStore of the counted entries, and each row's content key ((size, digest) or None).
+
+        With digests the store is already marked with its duplicates.
+        """
+        file_results = ResultStore()
+        keys = []
+        for i, (entry, lines) in enumerate(zip(entries, counts)):
+            # Always add file to results, even if binary or 0 lines
+            if lines is not None:
+                file_results.append(entry.rel_path, lines, entry.size, entry.extension)
+                if digests is not None:
+                    keys.append((entry.size, digests[i]) if digests[i] is not None else None)
+        if digests is not None:
+            file_results.mark_duplicates(keys)
+        return file_results, keys
@@ -0,0 +1,199 @@
+"""
+Compare two analyses of the same code.
+
+The baseline is a previous JSON export (the generate_json_data schema) or
+a snapshot kept in the result cache; the other side is usually the
+results just counted. Files are matched on their path with one hash
+join: the baseline's paths go into a dict and a single pass over the new
+results pops every match, so whatever is left was removed. Only added,
+removed and changed files are kept; unchanged ones cost a dict lookup and
+two comparisons each.
+
+Deltas use the total line count (binary files count as 0 lines). Batch
+results are matched on (root, path), so a batch is only compared with
+another batch, and a single folder with a single folder. Both sides must
+have been counted with the same method ("metrics" totals are "all" lines).
+"""
+
+import json
+import os
+from collections import namedtuple
+
+from line_counter_results import ResultStore
+
+ADDED = "added"
+REMOVED = "removed"
+CHANGED = "changed"
+
+# One added, removed or changed file; old_* are None for added files and new_* for removed ones
+FileDelta = namedtuple('FileDelta', ['status', 'path', 'extension', 'old_lines', 'new_lines', 'old_size', 'new_size',
+                                     'root'])
+
+DELTA_KEYS = ('old_files', 'new_files', 'files_added', 'files_removed', 'files_changed', 'files_unchanged',
+              'old_lines', 'new_lines', 'lines_added', 'lines_removed', 'lines_delta',
+              'old_size', 'new_size', 'size_delta')
+
+# Match paths case-insensitively where file names are
+_CASE_INSENSITIVE = os.path.normcase("A") == "a"
+
+
+class SnapshotDiff:
+    """The deltas between two result sets.
+
+    files lists a FileDelta per added, removed or changed file;
+    extension_deltas and summary hold the DELTA_KEYS counts per extension
+    and overall. old_label / new_label name the two sides.
+    """
+
+    def __init__(self, files, extension_deltas, old_label, new_label):
+        self.files = files
+        self.extension_deltas = extension_deltas
+        self.old_label = old_label
+        self.new_label = new_label
+        self.summary = {key: sum(delta[key] for delta in extension_deltas.values()) for key in DELTA_KEYS}
+
+    def sorted_files(self):
+        """Files in export order: largest line change first, then by path"""
+        return sorted(self.files, key=lambda delta: (-abs(lines_delta(delta)), delta.root or "", delta.path))
+
+    def __repr__(self):
+        return f"<SnapshotDiff {len(self.files)} files>"
+
+
+def _lines(lines):
+    """Line count for the deltas: binary and missing files have none"""
+    return lines if isinstance(lines, int) else 0
+
+
+def lines_delta(delta):
+    """New minus old line count of a FileDelta"""
+    return _lines(delta.new_lines) - _lines(delta.old_lines)
+
+
+def size_delta(delta):
+    """New minus old size of a FileDelta"""
+    return (delta.new_size or 0) - (delta.old_size or 0)
+
+
+def _join_keys(store):
+    """The path of every row (with its root in batch results), as the join key"""
+    paths = store.paths
+    if _CASE_INSENSITIVE:
+        paths = [os.path.normcase(path) for path in paths]
+    if store.roots is None:
+        return paths
+    names = store.root_names
+    return list(zip((names[root_id] for root_id in store.roots), paths))
+
+
+def _diff_method(method):
+    """The count method whose line counts a result of method holds"""
+    return "all" if method == "metrics" else method
+
+
+def check_count_method(summary, method):
+    """Raise ValueError unless an export's analysis_summary was counted like method.
+
+    Exports without a count_method (older ones) are accepted.
+    """
+    baseline = summary.get('count_method')
+    if baseline is not None and _diff_method(baseline) != _diff_method(method):
+        raise ValueError(f"the baseline was counted with the '{baseline}' method, not '{method}'")
+
+
+def _empty_delta():
+    return dict.fromkeys(DELTA_KEYS, 0)
+
+
+def diff_results(old, new, old_label="baseline", new_label="current"):
+    """Compare two ResultStores and return a SnapshotDiff.
+
+    Raises ValueError when only one of them is a batch of several roots.
+    """
+    if (old.roots is None) != (new.roots is None):
+        batch = old_label if old.roots is not None else new_label
+        raise ValueError(f"{batch} is a batch of several folders; compare it with a batch of the same folders")
+    deltas = {}
+    for side, store in (('old', old), ('new', new)):
+        for ext, stats in store.extension_stats().items():
+            delta = deltas.get(ext)
+            if delta is None:
+                delta = deltas[ext] = _empty_delta()
+            delta[f'{side}_files'] = stats['files']
+            delta[f'{side}_lines'] = stats['lines']
+            delta[f'{side}_size'] = stats['size']
+
+    old_lines, old_sizes, old_binary = old.lines, old.sizes, old.binary
+    new_lines, new_sizes, new_binary = new.lines, new.sizes, new.binary
+    files = []
+
+    def count(store, i):
+        return "binary" if store.binary[i] else store.lines[i]
+
+    def root(store, i):
+        return store.root_names[store.roots[i]] if store.roots is not None else None
+
+    def record(status, ext, old_count, new_count, old_size, new_size, path, root_name):
+        files.append(FileDelta(status, path, ext, old_count, new_count, old_size, new_size, root_name))
+        delta = deltas[ext]
+        delta[f'files_{status}'] += 1
+        change = _lines(new_count) - _lines(old_count)
+        if change > 0:
+            delta['lines_added'] += change
+        else:
+            delta['lines_removed'] -= change
+
+    # The hash join: every new row pops its match, what stays in the dict was removed
+    index = dict(zip(_join_keys(old), range(len(old))))
+    pop = index.pop
+    for i, key in enumerate(_join_keys(new)):
+        j = pop(key, None)
+        if j is None:
+            record(ADDED, new.extensions[new.ext_ids[i]], None, count(new, i), None, new_sizes[i],
+                   new.paths[i], root(new, i))
+        elif new_lines[i] != old_lines[j] or new_sizes[i] != old_sizes[j] or new_binary[i] != old_binary[j]:
+            record(CHANGED, new.extensions[new.ext_ids[i]], count(old, j), count(new, i), old_sizes[j],
+                   new_sizes[i], new.paths[i], root(new, i))
+    for j in index.values():
+        record(REMOVED, old.extensions[old.ext_ids[j]], count(old, j), None, old_sizes[j], None,
+               old.paths[j], root(old, j))
+
+    for delta in deltas.values():
+        delta['files_unchanged'] = delta['new_files'] - delta['files_added'] - delta['files_changed']
+        delta['lines_delta'] = delta['new_lines'] - delta['old_lines']
+        delta['size_delta'] = delta['new_size'] - delta['old_size']
+    return SnapshotDiff(files, deltas, old_label, new_label)
+
+
+def load_json_export(path):
+    """Read a JSON export back into a ResultStore; returns (file_results, analysis_summary).
+
+    Raises ValueError when the file is not a Line Counter JSON export.
+    """
+    with open(path, encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path} is not valid JSON: {e}")
+    if not isinstance(data, dict) or not isinstance(data.get('files'), list):
+        raise ValueError(f"{path} is not a Line Counter JSON export")
+
+    store = ResultStore()
+    try:
+        for entry in data['files']:
+            store.append(entry['path'], entry['lines_of_code'], entry['file_size_bytes'],
+                         entry.get('extension') or "", entry.get('root'))
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"{path} is not a Line Counter JSON export: {e}")
+    return store, data.get('analysis_summary') or {}
+
+
+def format_diff_summary(diff):
+    """One line of totals: files and lines added / removed and the net change"""
+    summary = diff.summary
+    return (f"Files: {summary['old_files']:,} -> {summary['new_files']:,} "
+            f"(+{summary['files_added']:,} added, -{summary['files_removed']:,} removed, "
+            f"{summary['files_changed']:,} changed); "
+            f"Lines: {summary['old_lines']:,} -> {summary['new_lines']:,} "
+            f"(+{summary['lines_added']:,} / -{summary['lines_removed']:,}, net {summary['lines_delta']:+,}); "
+            f"Size: {summary['size_delta'] / 1024:+,.1f} KB")
@@ -0,0 +1,459 @@
+"""
+CSV / JSON export of analysis results, shared by the GUI and the command line.
+
+The exports are produced as an iterator of text chunks (iter_csv_chunks,
+iter_json_chunks) that can be written straight to a file handle
+(write_csv, write_json), so exporting a huge result never holds more than
+a chunk of rows in memory. generate_csv_data / generate_json_data join the
+chunks for callers that want the whole document as one string.
+
+Results of the "metrics" count method carry code / comment / blank line
+counts; both formats then add those columns, totals and per-extension sums.
+
+Results of a dedup run carry unique file / line counts next to the raw
+ones (each content counted once), every file row names the counted copy it
+duplicates, and the groups of identical files are listed after the
+summaries.
+
+Batch results (several roots) pass root_stats, {root: extension_stats}:
+every file row then names its root, and a per-root summary follows the
+combined one.
+
+A SnapshotDiff (see line_counter_diff) is exported the same way: one row
+per added, removed or changed file with old and new counts, then the
+totals and the per-extension deltas.
+"""
+
+import json
+import csv
+import io
+
+from line_counter_core import metric_totals, summarize, unique_totals
+from line_counter_diff import lines_delta, size_delta
+from line_counter_results import METRIC_KEYS, ResultStore, ResultView
+
+# File rows formatted per yielded chunk
+EXPORT_CHUNK_ROWS = 1000
+
+
+def file_sort_key(file_info):
+    """Sort key for file results (use with reverse=True): most lines first, binary files at the end"""
+    if file_info['lines'] == "binary":
+        return (-1, file_info['path'])  # Binary files at end
+    return (file_info['lines'], file_info['path'])
+
+
+def sort_files(file_results):
+    """Files in export order; sort once and pass the list to several exports"""
+    if isinstance(file_results, (ResultStore, ResultView)):
+        return file_results.sorted_view()
+    return sorted(file_results, key=file_sort_key, reverse=True)
+
+
+def sort_extensions(extension_stats):
+    """(extension, stats) pairs in export order: most lines first"""
+    return sorted(extension_stats.items(), key=lambda x: x[1]['lines'], reverse=True)
+
+
+def duplicate_groups(file_results):
+    """Groups of identical files of a dedup run (see ResultStore.duplicate_groups); [] otherwise"""
+    if isinstance(file_results, ResultStore):
+        return file_results.duplicate_groups()
+    return []
+
+
+def root_totals(extension_stats):
+    """(files, lines, size) of one root from its extension_stats"""
+    return tuple(sum(stats[key] for stats in extension_stats.values()) for key in ('files', 'lines', 'size'))
+
+
+def iter_csv_chunks(file_results, extension_stats, sorted_files=None, root_stats=None):
+    """Yield the CSV export as text chunks of at most EXPORT_CHUNK_ROWS rows"""
+    if sorted_files is None:
+        sorted_files = sort_files(file_results)
+    total_files, total_lines, total_size = summarize(file_results)
+    metrics = metric_totals(extension_stats)
+    unique = unique_totals(extension_stats)
+
+    output = io.StringIO()
+    writer = csv.writer(output)
+
+    def flush():
+        chunk = output.getvalue()
+        output.seek(0)
+        output.truncate()
+        return chunk
+
+    # Write header
+    header = ['File Path', 'Extension', 'Lines of Code', 'File Size (bytes)', 'File Size (KB)']
+    if metrics:
+        header += ['Code Lines', 'Comment Lines', 'Blank Lines']
+    if root_stats is not None:
+        header.append('Root')
+    if unique:
+        header.append('Duplicate Of')
+    writer.writerow(header)
+
+    # Write data for each file (binary files at the end)
+    for i, file_info in enumerate(sorted_files, 1):
+        size_kb = file_info['size'] / 1024
+        row = [
+            file_info['path'],
+            file_info['extension'] or '(no extension)',
+            file_info['lines'],
+            file_info['size'],
+            f"{size_kb:.2f}"
+        ]
+        if metrics:
+            row += [file_info['code'], file_info['comment'], file_info['blank']]
+        if root_stats is not None:
+            row.append(file_info['root'])
+        if unique:
+            row.append(file_info['duplicate_of'] or '')
+        writer.writerow(row)
+        if i % EXPORT_CHUNK_ROWS == 0:
+            yield flush()
+
+    # Add summary section
+    writer.writerow([])  # Empty row
+    writer.writerow(['=== SUMMARY ==='])
+    writer.writerow(['Total Files', '', total_files, '', ''])
+    writer.writerow(['Total Lines', '', total_lines, '', ''])
+    if metrics:
+        writer.writerow(['Total Code Lines', '', metrics['code'], '', ''])
+        writer.writerow(['Total Comment Lines', '', metrics['comment'], '', ''])
+        writer.writerow(['Total Blank Lines', '', metrics['blank'], '', ''])
+    if unique:
+        writer.writerow(['Unique Files', '', unique['files'], '', ''])
+        writer.writerow(['Unique Lines', '', unique['lines'], '', ''])
+    writer.writerow(['Total Size (MB)', '', '', '', f"{total_size / (1024*1024):.2f}"])
+
+    # Add extension summary
+    writer.writerow([])
+    writer.writerow(['=== BY EXTENSION ==='])
+    header = ['Extension', 'Files', 'Lines', 'Size (KB)']
+    if metrics:
+        header += ['Code Lines', 'Comment Lines', 'Blank Lines']
+    if unique:
+        header += ['Unique Files', 'Unique Lines']
+    writer.writerow(header if len(header) > 4 else header + [''])
+
+    for ext, stats in sort_extensions(extension_stats):
+        ext_name = ext if ext else '(no extension)'
+        size_kb = stats['size'] / 1024
+        row = [ext_name, stats['files'], stats['lines'], f"{size_kb:.2f}"]
+        if metrics:
+            row += [stats['code'], stats['comment'], stats['blank']]
+        if unique:
+            row += [stats['unique_files'], stats['unique_lines']]
+        writer.writerow(row if len(row) > 4 else row + [''])
+
+    if root_stats is not None:
+        writer.writerow([])
+        writer.writerow(['=== BY ROOT ==='])
+        header = ['Root', 'Files', 'Lines', 'Size (KB)']
+        if metrics:
+            header += ['Code Lines', 'Comment Lines', 'Blank Lines']
+        writer.writerow(header)
+        for root, stats in root_stats.items():
+            files, lines, size = root_totals(stats)
+            row = [root, files, lines, f"{size / 1024:.2f}"]
+            if metrics:
+                root_metrics = metric_totals(stats) or dict.fromkeys(METRIC_KEYS, 0)
+                row += [root_metrics[key] for key in METRIC_KEYS]
+            writer.writerow(row)
+
+    if unique:
+        writer.writerow([])
+        writer.writerow(['=== DUPLICATE GROUPS ==='])
+        writer.writerow(['Counted File', 'Copies', 'Lines Each', 'Size (bytes)', 'Repeated Lines'])
+        for i, group in enumerate(duplicate_groups(file_results), 1):
+            first = group[0]
+            writer.writerow([first['path'], len(group) - 1, first['lines'], first['size'],
+                             first['lines'] * (len(group) - 1)])
+            if i % EXPORT_CHUNK_ROWS == 0:
+                yield flush()
+
+    yield flush()
+
+
+def _json_block(value, indent):
+    """json.dumps(value, indent=2) re-indented to sit `indent` spaces deep in the document"""
+    return json.dumps(value, indent=2, ensure_ascii=False).replace("\n", "\n" + " " * indent)
+
+
+def _json_array(key, items):
+    """Yield '"key": [...]' chunks formatted exactly as json.dumps(indent=2) nests them"""
+    items = iter(items)
+    first = next(items, None)
+    if first is None:
+        yield f'  "{key}": []'
+        return
+
+    parts = [f'  "{key}": [\n    ', _json_block(first, 4)]
+    count = 1
+    for item in items:
+        parts.append(",\n    ")
+        parts.append(_json_block(item, 4))
+        count += 1
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield "".join(parts)
+            parts = []
+    parts.append("\n  ]")
+    yield "".join(parts)
+
+
+def iter_json_chunks(file_results, extension_stats, analyzed_folder, count_method, sorted_files=None,
+                     run_stats=None, root_stats=None):
+    """Yield the JSON export as text chunks; joined they equal generate_json_data.
+
+    A RunStats, if given, is included as analysis_summary['run_statistics'].
+    With root_stats, analyzed_folder is the list of roots, files carry a
+    'root' and a 'root_summary' array follows the extension summary.
+    """
+    if sorted_files is None:
+        sorted_files = sort_files(file_results)
+    total_files, total_lines, total_size = summarize(file_results)
+    metrics = metric_totals(extension_stats)
+    unique = unique_totals(extension_stats)
+    groups = duplicate_groups(file_results) if unique else []
+
+    analysis_summary = {
+        'total_files': total_files,
+        'total_lines': total_lines,
+        'total_size_bytes': total_size,
+        'analyzed_folder': analyzed_folder,
+        'count_method': count_method
+    }
+    if metrics:
+        for key in ('code', 'comment', 'blank'):
+            analysis_summary[f'total_{key}_lines'] = metrics[key]
+    if unique:
+        analysis_summary['unique_files'] = unique['files']
+        analysis_summary['unique_lines'] = unique['lines']
+        analysis_summary['duplicate_groups'] = len(groups)
+    if run_stats is not None:
+        analysis_summary['run_statistics'] = run_stats.as_dict()
+    yield '{\n  "analysis_summary": ' + _json_block(analysis_summary, 2) + ",\n"
+
+    def file_entry(file_info):
+        entry = {
+            'path': file_info['path'],
+            'extension': file_info['extension'] or None,
+            'lines_of_code': file_info['lines'],
+            'file_size_bytes': file_info['size'],
+            'file_size_kb': round(file_info['size'] / 1024, 2)
+        }
+        if metrics:
+            for key in ('code', 'comment', 'blank'):
+                entry[f'{key}_lines'] = file_info[key]
+        if root_stats is not None:
+            entry['root'] = file_info['root']
+        if unique:
+            entry['duplicate_of'] = file_info['duplicate_of']
+        return entry
+
+    def extension_entry(ext, stats):
+        entry = {
+            'extension': ext if ext else None,
+            'file_count': stats['files'],
+            'total_lines': stats['lines'],
+            'total_size_bytes': stats['size'],
+            'total_size_kb': round(stats['size'] / 1024, 2)
+        }
+        if metrics:
+            for key in ('code', 'comment', 'blank'):
+                entry[f'total_{key}_lines'] = stats[key]
+        if unique:
+            entry['unique_files'] = stats['unique_files']
+            entry['unique_lines'] = stats['unique_lines']
+        return entry
+
+    def group_entry(group):
+        first = group[0]
+        return {'lines_each': first['lines'], 'file_size_bytes': first['size'],
+                'repeated_lines': first['lines'] * (len(group) - 1), 'files': [info['path'] for info in group]}
+
+    yield from _json_array('files', map(file_entry, sorted_files))
+    yield ",\n"
+
+    yield from _json_array('extension_summary', (
+        extension_entry(ext, stats) for ext, stats in sort_extensions(extension_stats)
+    ))
+
+    def root_entry(root, stats):
+        files, lines, size = root_totals(stats)
+        entry = {'root': root, 'total_files': files, 'total_lines': lines, 'total_size_bytes': size}
+        if metrics:
+            root_metrics = metric_totals(stats) or dict.fromkeys(METRIC_KEYS, 0)
+            for key in METRIC_KEYS:
+                entry[f'total_{key}_lines'] = root_metrics[key]
+        entry['extension_summary'] = [extension_entry(ext, ext_stats) for ext, ext_stats in sort_extensions(stats)]
+        return entry
+
+    if root_stats is not None:
+        yield ",\n"
+        yield from _json_array('root_summary', (root_entry(root, stats) for root, stats in root_stats.items()))
+    if unique:
+        yield ",\n"
+        yield from _json_array('duplicate_groups', map(group_entry, groups))
+    yield "\n}"
+
+
+def write_csv(f, file_results, extension_stats, sorted_files=None, root_stats=None):
+    """Stream the CSV export to a text file opened with newline=''"""
+    for chunk in iter_csv_chunks(file_results, extension_stats, sorted_files, root_stats):
+        f.write(chunk)
+
+
+def write_json(f, file_results, extension_stats, analyzed_folder, count_method, sorted_files=None,
+               run_stats=None, root_stats=None):
+    """Stream the JSON export to a text file"""
+    for chunk in iter_json_chunks(file_results, extension_stats, analyzed_folder, count_method, sorted_files,
+                                  run_stats, root_stats):
+        f.write(chunk)
+
+
+def generate_csv_data(file_results, extension_stats, sorted_files=None, root_stats=None):
+    """Generate CSV formatted data from results"""
+    return "".join(iter_csv_chunks(file_results, extension_stats, sorted_files, root_stats))
+
+
+def generate_json_data(file_results, extension_stats, analyzed_folder, count_method, sorted_files=None,
+                       run_stats=None, root_stats=None):
+    """Generate JSON formatted data from results"""
+    return "".join(iter_json_chunks(file_results, extension_stats, analyzed_folder, count_method, sorted_files,
+                                    run_stats, root_stats))
+
+
+def sort_extension_deltas(extension_deltas):
+    """(extension, delta) pairs in export order: largest line change first"""
+    return sorted(extension_deltas.items(), key=lambda x: (-abs(x[1]['lines_delta']), x[0]))
+
+
+def _blank(value):
+    return "" if value is None else value
+
+
+def iter_diff_csv_chunks(diff, sorted_files=None):
+    """Yield the CSV export of a SnapshotDiff as text chunks"""
+    if sorted_files is None:
+        sorted_files = diff.sorted_files()
+    batch = any(delta.root is not None for delta in sorted_files)
+
+    output = io.StringIO()
+    writer = csv.writer(output)
+
+    def flush():
+        chunk = output.getvalue()
+        output.seek(0)
+        output.truncate()
+        return chunk
+
+    header = ['Status', 'File Path', 'Extension', 'Old Lines', 'New Lines', 'Lines Delta',
+              'Old Size (bytes)', 'New Size (bytes)', 'Size Delta (bytes)']
+    if batch:
+        header.append('Root')
+    writer.writerow(header)
+
+    for i, delta in enumerate(sorted_files, 1):
+        row = [
+            delta.status,
+            delta.path,
+            delta.extension or '(no extension)',
+            _blank(delta.old_lines),
+            _blank(delta.new_lines),
+            lines_delta(delta),
+            _blank(delta.old_size),
+            _blank(delta.new_size),
+            size_delta(delta)
+        ]
+        if batch:
+            row.append(delta.root)
+        writer.writerow(row)
+        if i % EXPORT_CHUNK_ROWS == 0:
+            yield flush()
+
+    summary = diff.summary
+    writer.writerow([])
+    writer.writerow(['=== SUMMARY ==='])
+    writer.writerow(['Baseline', diff.old_label])
+    writer.writerow(['Compared', diff.new_label])
+    writer.writerow(['', 'Old', 'New', 'Delta'])
+    writer.writerow(['Files', summary['old_files'], summary['new_files'], summary['new_files'] - summary['old_files']])
+    writer.writerow(['Lines', summary['old_lines'], summary['new_lines'], summary['lines_delta']])
+    writer.writerow(['Size (bytes)', summary['old_size'], summary['new_size'], summary['size_delta']])
+    writer.writerow(['Files Added', summary['files_added']])
+    writer.writerow(['Files Removed', summary['files_removed']])
+    writer.writerow(['Files Changed', summary['files_changed']])
+    writer.writerow(['Files Unchanged', summary['files_unchanged']])
+    writer.writerow(['Lines Added', summary['lines_added']])
+    writer.writerow(['Lines Removed', summary['lines_removed']])
+
+    writer.writerow([])
+    writer.writerow(['=== BY EXTENSION ==='])
+    writer.writerow(['Extension', 'Old Files', 'New Files', 'Files Added', 'Files Removed', 'Files Changed',
+                     'Old Lines', 'New Lines', 'Lines Added', 'Lines Removed', 'Lines Delta',
+                     'Old Size (bytes)', 'New Size (bytes)', 'Size Delta (bytes)'])
+    for ext, delta in sort_extension_deltas(diff.extension_deltas):
+        writer.writerow([ext if ext else '(no extension)'] + [delta[key] for key in (
+            'old_files', 'new_files', 'files_added', 'files_removed', 'files_changed', 'old_lines', 'new_lines',
+            'lines_added', 'lines_removed', 'lines_delta', 'old_size', 'new_size', 'size_delta')])
+
+    yield flush()
+
+
+def iter_diff_json_chunks(diff, sorted_files=None):
+    """Yield the JSON export of a SnapshotDiff as text chunks"""
+    if sorted_files is None:
+        sorted_files = diff.sorted_files()
+
+    diff_summary = {'baseline': diff.old_label, 'compared': diff.new_label}
+    diff_summary.update(diff.summary)
+    yield '{\n  "diff_summary": ' + _json_block(diff_summary, 2) + ",\n"
+
+    def file_entry(delta):
+        entry = {
+            'status': delta.status,
+            'path': delta.path,
+            'extension': delta.extension or None,
+            'old_lines': delta.old_lines,
+            'new_lines': delta.new_lines,
+            'lines_delta': lines_delta(delta),
+            'old_size_bytes': delta.old_size,
+            'new_size_bytes': delta.new_size,
+            'size_delta_bytes': size_delta(delta)
+        }
+        if delta.root is not None:
+            entry['root'] = delta.root
+        return entry
+
+    yield from _json_array('files', map(file_entry, sorted_files))
+    yield ",\n"
+    yield from _json_array('extension_summary', (
+        dict(extension=ext if ext else None, **delta)
+        for ext, delta in sort_extension_deltas(diff.extension_deltas)
+    ))
+    yield "\n}"
+
+
+def write_diff_csv(f, diff, sorted_files=None):
+    """Stream the CSV export of a SnapshotDiff to a text file opened with newline=''"""
+    for chunk in iter_diff_csv_chunks(diff, sorted_files):
+        f.write(chunk)
+
+
+def write_diff_json(f, diff, sorted_files=None):
+    """Stream the JSON export of a SnapshotDiff to a text file"""
+    for chunk in iter_diff_json_chunks(diff, sorted_files):
+        f.write(chunk)
+
+
+def generate_diff_csv_data(diff, sorted_files=None):
+    """CSV export of a SnapshotDiff as one string"""
+    return "".join(iter_diff_csv_chunks(diff, sorted_files))
+
+
+def generate_diff_json_data(diff, sorted_files=None):
+    """JSON export of a SnapshotDiff as one string"""
+    return "".join(iter_diff_json_chunks(diff, sorted_files))
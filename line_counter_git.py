@@ -0,0 +1,331 @@
+"""
+Git-aware file enumeration for the Line Counter tool.
+
+Instead of walking the working tree, the tracked files are read straight
+from the repository index (.git/index, versions 2-4, parsed locally), so
+untracked build output and ignored folders are never visited. When the
+index cannot be parsed here (a split or sparse index, or an unknown
+version) `git ls-files -z` is used instead.
+
+A commit can be counted without checking it out: `git ls-tree` lists the
+blobs with their sizes and a single `git cat-file --batch` process streams
+their contents through the usual line counter.
+
+The include / exclude settings still apply to the tracked files.
+"""
+
+import os
+import stat
+import struct
+import subprocess
+import threading
+import time
+from collections import namedtuple
+
+from line_counter_core import (
+    BINARY_SNIFF_SIZE, MMAP_THRESHOLD, READ_CHUNK_SIZE, TEXT_EXTENSIONS, FileEntry, FileFilter, LineCounter,
+    ProgressTracker, analyze_folder, file_suffix, is_binary_chunk
+)
+from line_counter_ignore import common_dir, locate_repository
+from line_counter_results import ResultStore
+
+# Entry modes that are not files in the working tree
+GITLINK_MODE = 0o160000
+SYMLINK_MODE = 0o120000
+SPARSE_DIR_MODE = 0o040000
+
+# Index extensions that mean the entries listed are not the whole index
+_INCOMPLETE_INDEX_EXTENSIONS = (b'link', b'sdir')
+
+# A tracked blob: path relative to the listing folder ('/'-separated), mode, object id and size
+IndexEntry = namedtuple('IndexEntry', ['path', 'mode', 'size'])
+TreeEntry = namedtuple('TreeEntry', ['path', 'mode', 'object_id', 'size'])
+
+
+class GitError(Exception):
+    """The folder is not in a git repository, or git could not answer"""
+
+
+def find_repository(folder_path):
+    """Return (work_tree, git_dir) of the repository containing folder_path"""
+    found = locate_repository(folder_path)
+    if found is None:
+        raise GitError(f"not inside a git repository: {folder_path}")
+    return found
+
+
+def _hash_size(git_dir):
+    """Object id length in bytes: 32 for sha256 repositories, 20 otherwise"""
+    try:
+        with open(os.path.join(common_dir(git_dir), "config"), encoding="utf-8") as f:
+            for line in f:
+                key, _, value = line.partition("=")
+                if key.strip().lower() == "objectformat" and value.strip().lower() == "sha256":
+                    return 32
+    except OSError:
+        pass
+    return 20
+
+
+def read_index(git_dir):
+    """Parse git_dir/index and return its stage-0 IndexEntry items in index order.
+
+    Raises GitError when the file is missing, damaged, or uses features
+    this parser does not follow (split / sparse index).
+    """
+    try:
+        with open(os.path.join(git_dir, "index"), "rb") as f:
+            data = f.read()
+    except OSError as e:
+        raise GitError(f"cannot read the index: {e}")
+
+    if len(data) < 12 or data[:4] != b'DIRC':
+        raise GitError("not a git index")
+    version, count = struct.unpack(">II", data[4:12])
+    if version not in (2, 3, 4):
+        raise GitError(f"unsupported index version {version}")
+
+    hash_size = _hash_size(git_dir)
+    fixed = 40 + hash_size + 2  # stat data, object id, flags
+    entries = []
+    previous = b''
+    pos = 12
+    try:
+        for _ in range(count):
+            start = pos
+            mode, = struct.unpack_from(">I", data, pos + 24)
+            size, = struct.unpack_from(">I", data, pos + 36)
+            flags, = struct.unpack_from(">H", data, pos + 40 + hash_size)
+            pos += fixed
+            if flags & 0x4000 and version >= 3:
+                pos += 2  # extended flags
+
+            if version == 4:
+                # Prefix compression: drop N bytes of the previous path, then a NUL-terminated suffix
+                strip = data[pos] & 0x7f
+                while data[pos] & 0x80:
+                    pos += 1
+                    strip = ((strip + 1) << 7) | (data[pos] & 0x7f)
+                pos += 1
+                end = data.index(b'\0', pos)
+                name = previous[:len(previous) - strip] + data[pos:end]
+                pos = end + 1
+            else:
+                end = data.index(b'\0', pos)
+                name = data[pos:end]
+                # Entries are NUL-padded to a multiple of eight bytes
+                pos = start + ((end - start + 8) & ~7)
+            previous = name
+
+            if mode == SPARSE_DIR_MODE:
+                raise GitError("sparse index")
+            # Conflicted paths appear once per stage; keep stage 0 only
+            if flags & 0x3000 == 0:
+                entries.append(IndexEntry(os.fsdecode(name), mode, size))
+    except (struct.error, ValueError, IndexError):
+        raise GitError("damaged index")
+
+    # Extensions follow the entries; the last hash_size bytes are the checksum
+    while pos + 8 <= len(data) - hash_size:
+        signature = data[pos:pos + 4]
+        length, = struct.unpack_from(">I", data, pos + 4)
+        if signature in _INCOMPLETE_INDEX_EXTENSIONS:
+            raise GitError(f"index extension {signature.decode('ascii')} is not supported")
+        pos += 8 + length
+    return entries
+
+
+def _run_git(args, cwd):
+    """Output of a git command as bytes; GitError when git is missing or fails"""
+    try:
+        result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, check=True)
+    except OSError as e:
+        raise GitError(f"cannot run git: {e}")
+    except subprocess.CalledProcessError as e:
+        raise GitError(e.stderr.decode("utf-8", errors="replace").strip() or f"git {args[0]} failed")
+    return result.stdout
+
+
+def list_tracked_files(folder_path):
+    """Tracked paths under folder_path, relative to it and '/'-separated.
+
+    The index is parsed directly; git ls-files is the fallback.
+    """
+    work_tree, git_dir = find_repository(folder_path)
+    prefix = os.path.relpath(os.path.abspath(folder_path), work_tree).replace(os.sep, "/")
+    prefix = "" if prefix == "." else prefix + "/"
+
+    try:
+        entries = read_index(git_dir)
+    except GitError:
+        output = _run_git(["ls-files", "-z", "--full-name"], cwd=folder_path)
+        return [os.fsdecode(path)[len(prefix):] for path in output.split(b'\0') if path]
+
+    return [
+        entry.path[len(prefix):] for entry in entries
+        if entry.path.startswith(prefix) and entry.mode != GITLINK_MODE
+    ]
+
+
+def _filtered(paths, file_filter):
+    """Paths whose folders and file name pass the filter (folders relative to the analyzed folder)"""
+    allowed = {"": True}
+    for path in paths:
+        parent, _, name = path.rpartition("/")
+        ok = allowed.get(parent)
+        if ok is None:
+            ok = allowed[parent] = all(file_filter.include_folder(part) for part in parent.split("/"))
+        if ok and file_filter.include_file(name):
+            yield path
+
+
+def scan_git_files(folder_path, file_filter, token=None):
+    """Yield a FileEntry per tracked, included file, like scan_files does for a walk.
+
+    Only the listed files are stat'ed; tracked files missing from the
+    working tree (deleted, or outside a sparse checkout) are skipped.
+    """
+    folder_path = os.fspath(folder_path)
+    for i, path in enumerate(_filtered(list_tracked_files(folder_path), file_filter)):
+        if token is not None and i % 256 == 0 and token.checkpoint():
+            return
+        rel_path = path.replace("/", os.sep)
+        full_path = os.path.join(folder_path, rel_path)
+        try:
+            info = os.stat(full_path)
+        except OSError:
+            continue
+        if not stat.S_ISREG(info.st_mode):
+            continue
+        yield FileEntry(full_path, rel_path, file_suffix(path).lower(), info.st_size, info.st_mtime_ns)
+
+
+def list_commit_files(folder_path, commit):
+    """TreeEntry items for the blobs of commit under folder_path (paths relative to it)"""
+    find_repository(folder_path)
+    # Run from the folder so ls-tree lists just that part of the tree, relative to it
+    output = _run_git(["ls-tree", "-r", "-z", "-l", commit], cwd=folder_path)
+    entries = []
+    for record in output.split(b'\0'):
+        if not record:
+            continue
+        info, _, path = record.partition(b'\t')
+        mode, kind, object_id, size = info.split()
+        if kind != b'blob' or int(mode, 8) == SYMLINK_MODE:
+            continue
+        entries.append(TreeEntry(os.fsdecode(path), int(mode, 8), object_id.decode("ascii"), int(size)))
+    return entries
+
+
+def _count_blob(stream, size, method, file_ext):
+    """Count a blob of the given size from a cat-file --batch stream (consumes the trailing LF)"""
+    known_text = file_ext in TEXT_EXTENSIONS
+    counter = LineCounter(method, file_ext)
+    binary = False
+    remaining = size
+    first = True
+    while remaining:
+        chunk = stream.read(min(READ_CHUNK_SIZE, remaining))
+        if not chunk:
+            raise GitError("git cat-file output ended early")
+        remaining -= len(chunk)
+        if first:
+            first = False
+            binary = not known_text and is_binary_chunk(chunk[:BINARY_SNIFF_SIZE])
+        if not binary:
+            counter.feed(chunk)
+    stream.read(1)
+    return "binary" if binary else counter.finish()
+
+
+def count_commit(folder_path, commit, include_exts, exclude_patterns, exclude_folders, method="all",
+                 progress=None, token=None, stats=None, dedup=False):
+    """Count the files of folder_path as of commit; returns (file_results, extension_stats).
+
+    Nothing is checked out: blob contents are streamed from one
+    `git cat-file --batch` process. A cancelled run returns the blobs
+    counted so far. With dedup, the blob ids already are content hashes:
+    files sharing one are marked as duplicates, and a blob is read once per
+    extension (which decides how it is counted).
+    """
+    progress = progress or ProgressTracker()
+    file_filter = FileFilter(include_exts, exclude_patterns, exclude_folders)
+
+    start = time.perf_counter()
+    by_path = {entry.path: entry for entry in list_commit_files(folder_path, commit)}
+    entries = [by_path[path] for path in _filtered(by_path, file_filter)]
+    total_size = sum(entry.size for entry in entries)
+    progress.found(len(entries), total_size)
+    if stats is not None:
+        stats.add("walk", time.perf_counter() - start, len(entries), total_size)
+
+    progress.start_counting()
+    store = ResultStore()
+    start = time.perf_counter()
+    try:
+        process = subprocess.Popen(["git", "cat-file", "--batch"], cwd=folder_path,
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    except OSError as e:
+        raise GitError(f"cannot run git: {e}")
+
+    # Blobs come back in request order, so a repeated blob can simply be left out
+    requests = [(entry.object_id, file_suffix(entry.path).lower()) for entry in entries]
+    if dedup:
+        requests = list(dict.fromkeys(requests))
+    counted = {}
+    keys = []
+
+    def send():
+        # Requests are written from a thread so a full output pipe cannot block them
+        try:
+            for object_id, _ in requests:
+                process.stdin.write(object_id.encode("ascii") + b"\n")
+            process.stdin.close()
+        except (OSError, ValueError):
+            pass  # git exited, or the run was cancelled
+
+    sender = threading.Thread(target=send, daemon=True)
+    sender.start()
+    try:
+        for entry in entries:
+            if token is not None and token.checkpoint():
+                break
+            ext = file_suffix(entry.path).lower()
+            lines = counted.get((entry.object_id, ext))
+            if lines is None:
+                header = process.stdout.readline().split()
+                if len(header) != 3 or header[1] != b'blob':
+                    raise GitError(f"unexpected git cat-file output for {entry.path}")
+                lines = _count_blob(process.stdout, int(header[2]), method, ext)
+                if dedup:
+                    counted[entry.object_id, ext] = lines
+            store.append(entry.path.replace("/", os.sep), lines, entry.size, ext)
+            if dedup:
+                # Like the file engine: empty and binary files are never grouped
+                keys.append(entry.object_id if entry.size and lines != "binary" else None)
+            progress.done(1, entry.size)
+    finally:
+        process.kill()
+        process.wait()
+        sender.join()
+        process.stdout.close()
+    if stats is not None:
+        stats.add("count_wall", time.perf_counter() - start, len(store), store.total_size)
+    if dedup:
+        store.mark_duplicates(keys)
+
+    progress.finish("cancelled" if token is not None and token.cancelled else "done")
+    return store, store.extension_stats()
+
+
+def analyze_repository(folder_path, include_exts, exclude_patterns, exclude_folders, method="all", workers=None,
+                       cache=None, force_rescan=False, mmap_threshold=MMAP_THRESHOLD, commit=None,
+                       progress=None, token=None, stats=None, dedup=False):
+    """analyze_folder over the tracked files only, or over commit's snapshot when one is given"""
+    if commit:
+        return count_commit(folder_path, commit, include_exts, exclude_patterns, exclude_folders, method,
+                            progress=progress, token=token, stats=stats, dedup=dedup)
+    find_repository(folder_path)
+    return analyze_folder(folder_path, include_exts, exclude_patterns, exclude_folders, method, workers=workers,
+                          cache=cache, force_rescan=force_rescan, mmap_threshold=mmap_threshold,
+                          progress=progress, token=token, stats=stats, scanner=scan_git_files, dedup=dedup)
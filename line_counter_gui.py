@@ -1,18 +1,46 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
-import fnmatch
 from pathlib import Path
 import threading
-import json
-import csv
-import io
+import multiprocessing
+import queue
+import time
+
+from line_counter_core import (
+    DEFAULT_INCLUDE_EXTENSIONS, DEFAULT_EXCLUDE_PATTERNS, DEFAULT_EXCLUDE_FOLDERS,
+    CancelToken, ProgressTracker, RunStats, analyze_folder, analyze_roots, default_worker_count, file_suffix, format_progress, format_stats, group_by_extension, metric_totals,
+    read_manifest, split_list, summarize, unique_totals
+)
+from line_counter_cache import ResultCache
+from line_counter_diff import (
+    check_count_method, diff_results, format_diff_summary, lines_delta, load_json_export, size_delta
+)
+from line_counter_export import (
+    generate_csv_data, generate_json_data, iter_csv_chunks, iter_diff_csv_chunks, iter_diff_json_chunks,
+    iter_json_chunks, root_totals, sort_extension_deltas, sort_files
+)
+from line_counter_git import analyze_repository, scan_git_files
+from line_counter_results import ResultStore
+from line_counter_watch import FolderWatcher, LiveResults
+
+# How often the UI picks up progress from the counting thread
+PROGRESS_POLL_MS = 100
+
+# Result rows inserted per event-loop turn, and per "show more" page of a group
+TREE_BATCH_SIZE = 500
+TREE_PAGE_SIZE = 5000
+
+# Export preview: lines rendered per "Load More" page, and the largest export
+# (in files) that may be copied to the clipboard
+PREVIEW_PAGE_LINES = 2000
+CLIPBOARD_MAX_FILES = 20000
 
 class LineCounterGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Line Counter - Code Analysis Tool")
-        self.root.geometry("800x700")
+        self.root.geometry("800x850")
         root.resizable(False, False)
         
         # Disable fullscreen mode with more robust approach
@@ -20,19 +48,57 @@ class LineCounterGUI:
         
         # Variables
         self.selected_folder = tk.StringVar()
-        self.exclude_patterns = tk.StringVar(value="*.pyc,*.exe,*.dll,*.so,*.o,*.obj, *.md, *.txt")
-        self.exclude_folders = tk.StringVar(value=".git,.svn,__pycache__,node_modules,.vscode")
-        self.include_extensions = tk.StringVar(value=".py,.js,.html,.css,.java,.cpp,.c,.h,.cs,.php,.rb,.go,.rs,.ts,.jsx,.tsx,.vue,.swift,.kt,.scala,.r,.m,.mm,.sh,.bat,.ps1,.sql")
+        # Batch mode: every folder to analyze, when more than one was picked
+        self.selected_roots = []
+        self.exclude_patterns = tk.StringVar(value=DEFAULT_EXCLUDE_PATTERNS)
+        self.exclude_folders = tk.StringVar(value=DEFAULT_EXCLUDE_FOLDERS)
+        self.include_extensions = tk.StringVar(value=DEFAULT_INCLUDE_EXTENSIONS)
         self.line_count_method = tk.StringVar(value="all")
+        self.worker_count = tk.IntVar(value=default_worker_count())
+        self.use_cache = tk.BooleanVar(value=True)
+        self.keep_history = tk.BooleanVar(value=False)
+        self.force_rescan = tk.BooleanVar(value=False)
+        self.collect_stats = tk.BooleanVar(value=False)
+        self.honor_gitignore = tk.BooleanVar(value=False)
+        self.git_tracked = tk.BooleanVar(value=False)
+        self.git_commit = tk.StringVar()
+        self.watch_changes = tk.BooleanVar(value=False)
+        self.count_copies_once = tk.BooleanVar(value=False)
         
         # Results storage
         self.results = {}
         self.total_lines = 0
         self.total_files = 0
+        self.total_size = 0
         
-        # Storage for export functionality
+        # Storage for export functionality; files are sorted once, on first export
         self.file_results = []
         self.extension_stats = {}
+        self.sorted_files = None
+        # {root: extension_stats} of a batch run, None for a single folder
+        self.root_stats = None
+        # taken_at of the cache snapshot saved by the last run, left out of "Compare..."
+        self.saved_snapshot = None
+        
+        # Per-stage timings of the last run, when "Collect run statistics" is on
+        self.run_stats = None
+        
+        # Progress snapshots from the counting thread, drained by poll_progress
+        self.progress_queue = queue.Queue()
+        self.counting = False
+        
+        # Cancel / pause state shared with the walker and workers of the current run
+        self.cancel_token = None
+        
+        # Watch mode: the watcher of the shown folder and the results it keeps current
+        self.watcher = None
+        self.live = None
+        
+        # Lazily populated results tree: group item -> bucket state, "more" rows -> group item
+        self.tree_groups = {}
+        self.tree_more_items = {}
+        self.tree_ext_items = {}
+        self.tree_generation = 0
         
         self.setup_ui()
         
@@ -48,7 +114,7 @@ class LineCounterGUI:
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
         main_frame.columnconfigure(1, weight=1)
-        main_frame.rowconfigure(7, weight=1)
+        main_frame.rowconfigure(12, weight=1)
         
         # Folder selection
         ttk.Label(main_frame, text="Select Folder:").grid(row=0, column=0, sticky=tk.W, pady=5)
@@ -58,6 +124,8 @@ class LineCounterGUI:
         
         ttk.Entry(folder_frame, textvariable=self.selected_folder, state="readonly").grid(row=0, column=0, sticky=(tk.W, tk.E), padx=(0, 5))
         ttk.Button(folder_frame, text="Browse", command=self.browse_folder).grid(row=0, column=1)
+        ttk.Button(folder_frame, text="Add Folder", command=self.add_folder).grid(row=0, column=2, padx=(5, 0))
+        ttk.Button(folder_frame, text="Manifest...", command=self.load_manifest).grid(row=0, column=3, padx=(5, 0))
         
         # Include extensions
         ttk.Label(main_frame, text="Include Extensions:").grid(row=1, column=0, sticky=tk.W, pady=5)
@@ -80,31 +148,81 @@ class LineCounterGUI:
         
         ttk.Radiobutton(count_frame, text="All lines", variable=self.line_count_method, value="all").pack(side=tk.LEFT, padx=(0, 10))
         ttk.Radiobutton(count_frame, text="Non-empty lines", variable=self.line_count_method, value="non_empty").pack(side=tk.LEFT, padx=(0, 10))
-        ttk.Radiobutton(count_frame, text="Code lines only", variable=self.line_count_method, value="code_only").pack(side=tk.LEFT)
-        
-        # Buttons
-        button_frame = ttk.Frame(main_frame)
-        button_frame.grid(row=7, column=0, columnspan=3, pady=10, sticky=tk.W)
+        ttk.Radiobutton(count_frame, text="Code lines only", variable=self.line_count_method, value="code_only").pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Radiobutton(count_frame, text="All metrics (one pass)", variable=self.line_count_method, value="metrics").pack(side=tk.LEFT, padx=(0, 20))
+        
+        # Worker pool size
+        ttk.Label(count_frame, text="Workers:").pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Spinbox(count_frame, from_=1, to=max(64, default_worker_count()), width=4, textvariable=self.worker_count).pack(side=tk.LEFT)
+        
+        # Run options
+        ttk.Label(main_frame, text="Options:").grid(row=7, column=0, sticky=tk.W, pady=5)
+        options_frame = ttk.Frame(main_frame)
+        options_frame.grid(row=7, column=1, columnspan=2, sticky=tk.W, pady=5)
+        
+        # Two lines so every option fits the window width: the cache, then how the run goes
+        cache_options = ttk.Frame(options_frame)
+        cache_options.pack(anchor=tk.W)
+        ttk.Checkbutton(cache_options, text="Use result cache", variable=self.use_cache).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Checkbutton(cache_options, text="Keep run history", variable=self.keep_history).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Checkbutton(cache_options, text="Force full rescan", variable=self.force_rescan).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(cache_options, text="Clear Cache", command=self.clear_cache).pack(side=tk.LEFT)
+        
+        run_options = ttk.Frame(options_frame)
+        run_options.pack(anchor=tk.W, pady=(5, 0))
+        ttk.Checkbutton(run_options, text="Collect run statistics", variable=self.collect_stats).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Checkbutton(run_options, text="Watch for changes", variable=self.watch_changes).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Checkbutton(run_options, text="Count identical files once", variable=self.count_copies_once).pack(side=tk.LEFT, padx=(0, 10))
+        
+        # Git source: tracked files from the index, or a commit's snapshot without a checkout
+        ttk.Label(main_frame, text="Source:").grid(row=8, column=0, sticky=tk.W, pady=5)
+        source_frame = ttk.Frame(main_frame)
+        source_frame.grid(row=8, column=1, columnspan=2, sticky=tk.W, pady=5)
+        
+        ttk.Checkbutton(source_frame, text="Honor .gitignore", variable=self.honor_gitignore).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Checkbutton(source_frame, text="Git tracked files only", variable=self.git_tracked).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Label(source_frame, text="Commit:").pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Entry(source_frame, textvariable=self.git_commit, width=20).pack(side=tk.LEFT)
+        ttk.Label(source_frame, text="(empty = working tree)", font=("Arial", 8)).pack(side=tk.LEFT, padx=(5, 0))
+        
+        # Buttons: running a count on the first line, what to do with its results on the second
+        buttons = ttk.Frame(main_frame)
+        buttons.grid(row=9, column=0, columnspan=3, pady=10, sticky=tk.W)
+        button_frame = ttk.Frame(buttons)
+        button_frame.pack(anchor=tk.W)
+        result_buttons = ttk.Frame(buttons)
+        result_buttons.pack(anchor=tk.W, pady=(5, 0))
         
         self.count_button = ttk.Button(button_frame, text="Count Lines", command=self.start_counting)
         self.count_button.pack(side=tk.LEFT, padx=(0, 10))
         
+        # Only enabled while a count is running
+        self.pause_button = ttk.Button(button_frame, text="Pause", command=self.toggle_pause, state="disabled")
+        self.pause_button.pack(side=tk.LEFT, padx=(0, 10))
+        self.cancel_button = ttk.Button(button_frame, text="Cancel", command=self.cancel_counting, state="disabled")
+        self.cancel_button.pack(side=tk.LEFT, padx=(0, 10))
+        
         ttk.Button(button_frame, text="Clear Results", command=self.clear_results).pack(side=tk.LEFT, padx=(0, 10))
         
         # Export buttons (initially hidden)
-        self.export_csv_button = ttk.Button(button_frame, text="Export as CSV", command=self.export_csv)
-        self.export_json_button = ttk.Button(button_frame, text="Export as JSON", command=self.export_json)
+        self.export_csv_button = ttk.Button(result_buttons, text="Export as CSV", command=self.export_csv)
+        self.export_json_button = ttk.Button(result_buttons, text="Export as JSON", command=self.export_json)
+        self.stats_button = ttk.Button(result_buttons, text="Run Statistics", command=self.show_run_stats)
+        self.compare_button = ttk.Button(result_buttons, text="Compare...", command=self.show_compare_menu)
         
         # Initially hide export buttons
         self.show_export_buttons(False)
         
         # Progress bar
         self.progress = ttk.Progressbar(main_frame, mode='indeterminate')
-        self.progress.grid(row=8, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
+        self.progress.grid(row=10, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=5)
+        
+        self.progress_label = ttk.Label(main_frame, text="", font=("Arial", 8))
+        self.progress_label.grid(row=11, column=0, columnspan=3, sticky=tk.W)
         
         # Results area
         results_frame = ttk.LabelFrame(main_frame, text="Results", padding="5")
-        results_frame.grid(row=9, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=10)
+        results_frame.grid(row=12, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=10)
         results_frame.columnconfigure(0, weight=1)
         results_frame.rowconfigure(1, weight=1)
         
@@ -119,13 +237,20 @@ class LineCounterGUI:
         tree_frame.rowconfigure(0, weight=1)
         
         # Treeview with scrollbars
-        self.tree = ttk.Treeview(tree_frame, columns=("Lines", "Size"), show="tree headings")
+        # Code / Comment / Blank are only displayed for "metrics" results
+        self.tree = ttk.Treeview(tree_frame, columns=("Lines", "Code", "Comment", "Blank", "Size"), show="tree headings",
+                                 displaycolumns=("Lines", "Size"))
         self.tree.heading("#0", text="File/Extension")
         self.tree.heading("Lines", text="Lines of Code")
+        self.tree.heading("Code", text="Code")
+        self.tree.heading("Comment", text="Comment")
+        self.tree.heading("Blank", text="Blank")
         self.tree.heading("Size", text="File Size")
         
         self.tree.column("#0", width=400)
         self.tree.column("Lines", width=100)
+        for column in ("Code", "Comment", "Blank"):
+            self.tree.column(column, width=80)
         self.tree.column("Size", width=100)
         
         v_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
@@ -133,298 +258,491 @@ class LineCounterGUI:
         self.tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
         
         self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.tree.bind("<<TreeviewOpen>>", self.on_tree_open)
+        self.tree.bind("<Double-1>", self.on_tree_double_click)
         v_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
         h_scrollbar.grid(row=1, column=0, sticky=(tk.W, tk.E))
         
     def browse_folder(self):
         folder = filedialog.askdirectory(title="Select folder to analyze")
         if folder:
+            self.selected_roots = []
             self.selected_folder.set(folder)
             
+    def add_folder(self):
+        """Add another folder; several folders are analyzed as one batch"""
+        folder = filedialog.askdirectory(title="Add folder to the batch")
+        if folder:
+            roots = self.get_roots()
+            if folder not in roots:
+                roots.append(folder)
+            self.set_roots(roots)
+            
+    def load_manifest(self):
+        """Take the batch of folders from a manifest file (one folder per line)"""
+        filename = filedialog.askopenfilename(title="Select folder manifest",
+                                              filetypes=[("Text files", "*.txt"), ("All files", "*.*")])
+        if not filename:
+            return
+        try:
+            roots = read_manifest(filename)
+        except (OSError, UnicodeDecodeError) as e:
+            messagebox.showerror("Error", f"Cannot read the manifest:\n{str(e)}")
+            return
+        if not roots:
+            messagebox.showerror("Error", "The manifest lists no folders!")
+            return
+        self.set_roots(roots)
+        
+    def get_roots(self):
+        """The folders to analyze: the batch, or the single selected folder"""
+        if self.selected_roots:
+            return list(self.selected_roots)
+        return [self.selected_folder.get()] if self.selected_folder.get() else []
+        
+    def set_roots(self, roots):
+        self.selected_roots = list(roots) if len(roots) > 1 else []
+        if len(roots) > 1:
+            self.selected_folder.set(f"{len(roots)} folders: " + "; ".join(roots))
+        else:
+            self.selected_folder.set(roots[0] if roots else "")
+            
     def start_counting(self):
-        if not self.selected_folder.get():
+        roots = self.get_roots()
+        if not roots:
             messagebox.showerror("Error", "Please select a folder first!")
             return
             
-        if not os.path.exists(self.selected_folder.get()):
-            messagebox.showerror("Error", "Selected folder does not exist!")
+        missing = [root for root in roots if not os.path.exists(root)]
+        if missing:
+            messagebox.showerror("Error", f"Selected folder does not exist!\n\n{missing[0]}")
             return
             
+        if self.watch_changes.get() and (len(roots) > 1 or self.git_tracked.get() or self.git_commit.get().strip()
+                                         or self.count_copies_once.get()):
+            messagebox.showerror("Error", "Watching for changes takes a single folder's working tree.\n\n"
+                                          "Turn off \"Git tracked files only\" and \"Count identical files once\", "
+                                          "clear the commit and keep one folder, or turn off \"Watch for changes\".")
+            return
+            
+        self.stop_watch()
+        
         # Disable button and start progress
         self.count_button.config(state="disabled")
+        self.pause_button.config(state="normal", text="Pause")
+        self.cancel_button.config(state="normal")
+        self.cancel_token = CancelToken()
+        self.progress.config(mode='indeterminate', value=0)
         self.progress.start()
+        self.progress_label.config(text="Scanning...")
+        self.counting = True
+        self.root.after(PROGRESS_POLL_MS, self.poll_progress)
         
         # Run counting in separate thread
-        thread = threading.Thread(target=self.count_lines)
+        thread = threading.Thread(target=self.count_lines, args=(self.cancel_token,))
         thread.daemon = True
         thread.start()
         
-    def count_lines(self):
-        try:
-            folder_path = Path(self.selected_folder.get())
-            
-            # Parse patterns
-            include_exts = [ext.strip() for ext in self.include_extensions.get().split(",") if ext.strip()]
-            exclude_patterns = [pattern.strip() for pattern in self.exclude_patterns.get().split(",") if pattern.strip()]
-            exclude_folders = [folder.strip() for folder in self.exclude_folders.get().split(",") if folder.strip()]
+    def toggle_pause(self):
+        """Pause or resume the running count"""
+        token = self.cancel_token
+        if token is None or token.cancelled:
+            return
+        text = self.progress_label.cget('text')
+        if text.startswith("Paused - "):
+            text = text[len("Paused - "):]
+        if token.paused:
+            token.resume()
+            self.pause_button.config(text="Pause")
+        else:
+            token.pause()
+            self.pause_button.config(text="Resume")
+            text = "Paused - " + text
+        self.progress_label.config(text=text)
             
-            # Check for special extension patterns
-            include_all_except_excluded = ".**" in include_exts
-            include_everything = ".*" in include_exts
+    def cancel_counting(self):
+        """Stop the running count (the files counted so far are still shown), or stop watching"""
+        if self.cancel_token is None:
+            self.stop_watch()
+        else:
+            self.cancel_token.cancel()
+            self.pause_button.config(state="disabled")
+            self.cancel_button.config(state="disabled")
+            self.progress_label.config(text="Cancelling...")
+        
+    def get_worker_count(self):
+        """Read the worker spinbox, falling back to the default on bad input"""
+        try:
+            return max(1, int(self.worker_count.get()))
+        except (tk.TclError, ValueError):
+            return default_worker_count()
             
-            # Remove special patterns from the list for normal processing
-            if include_all_except_excluded:
-                include_exts = [ext for ext in include_exts if ext != ".**"]
-            if include_everything:
-                include_exts = [ext for ext in include_exts if ext != ".*"]
+    def count_lines(self, token):
+        try:
+            roots = self.get_roots()
             
-            # Results storage
-            file_results = []
-            extension_stats = {}
+            # Parse patterns
+            include_exts = split_list(self.include_extensions.get())
+            exclude_patterns = split_list(self.exclude_patterns.get())
+            exclude_folders = split_list(self.exclude_folders.get())
             
-            # Walk through directory
-            for root, dirs, files in os.walk(folder_path):
-                # Filter out excluded directories
-                dirs[:] = [d for d in dirs if not any(fnmatch.fnmatch(d, pattern) for pattern in exclude_folders)]
-                
-                for file in files:
-                    file_path = Path(root) / file
-                    
-                    # Check if file should be excluded by pattern (unless .* is used)
-                    if not include_everything and any(fnmatch.fnmatch(file, pattern) for pattern in exclude_patterns):
-                        continue
-                        
-                    # Check if file extension is included
-                    file_ext = file_path.suffix.lower()
-                    
-                    # Determine if file should be included based on extension rules
-                    should_include = False
-                    
-                    if include_everything:
-                        # .* pattern: include everything
-                        should_include = True
-                    elif include_all_except_excluded:
-                        # .** pattern: include all extensions except those matching exclude patterns
-                        should_include = True  # Already filtered by exclude patterns above
-                    elif include_exts:
-                        # Normal extension filtering: include only specified extensions
-                        should_include = any(file_ext == ext for ext in include_exts)
-                    else:
-                        # No extensions specified: include everything (backward compatibility)
-                        should_include = True
-                    
-                    if not should_include:
-                        continue
-                        
-                    # Count lines
-                    try:
-                        lines = self.count_file_lines(file_path, self.line_count_method.get())
-                        file_size = file_path.stat().st_size
-                        rel_path = file_path.relative_to(folder_path)
-                        
-                        # Always add file to results, even if binary or 0 lines
-                        file_results.append({
-                            'path': str(rel_path),
-                            'lines': lines,
-                            'size': file_size,
-                            'extension': file_ext
-                        })
-                        
-                        # Update extension stats
-                        if file_ext not in extension_stats:
-                            extension_stats[file_ext] = {'files': 0, 'lines': 0, 'size': 0}
-                        extension_stats[file_ext]['files'] += 1
-                        
-                        # Only add to line and size count if not binary
-                        if lines != "binary" and lines > 0:
-                            extension_stats[file_ext]['lines'] += lines
-                        extension_stats[file_ext]['size'] += file_size
-                            
-                    except Exception as e:
-                        print(f"Error reading {file_path}: {e}")
-                        continue
+            cache = ResultCache() if self.use_cache.get() else None
+            stats = RunStats() if self.collect_stats.get() else None
+            commit = self.git_commit.get().strip()
+            dedup = self.count_copies_once.get()
+            watcher = None
+            if len(roots) > 1:
+                if commit:
+                    raise ValueError("a commit can only be counted for a single folder")
+                analyze, target = analyze_roots, roots
+                options = {'gitignore': self.honor_gitignore.get(), 'dedup': dedup,
+                           'scanner': scan_git_files if self.git_tracked.get() else None}
+            elif commit or self.git_tracked.get():
+                analyze, target, options = analyze_repository, Path(roots[0]), {'commit': commit, 'dedup': dedup}
+            elif self.watch_changes.get():
+                # The watcher runs the first analysis itself, so it knows every file it counted
+                watcher = FolderWatcher(roots[0], include_exts, exclude_patterns, exclude_folders,
+                                        self.line_count_method.get(), workers=self.get_worker_count(),
+                                        gitignore=self.honor_gitignore.get())
+            else:
+                analyze, target, options = analyze_folder, Path(roots[0]), {'gitignore': self.honor_gitignore.get(),
+                                                                            'dedup': dedup}
+            progress = ProgressTracker(self.progress_queue.put)
+            try:
+                if watcher is not None:
+                    results = watcher.analyze(cache=cache, force_rescan=self.force_rescan.get(),
+                                              progress=progress, token=token, stats=stats)
+                else:
+                    results = analyze(
+                        target, include_exts, exclude_patterns, exclude_folders,
+                        self.line_count_method.get(), workers=self.get_worker_count(),
+                        cache=cache, force_rescan=self.force_rescan.get(),
+                        progress=progress, token=token, stats=stats, **options)
+                if (cache is not None and self.keep_history.get() and len(roots) == 1 and not commit
+                        and not token.cancelled):
+                    # Keep this run as a snapshot to compare later runs against
+                    self.saved_snapshot = cache.save_snapshot(roots[0], self.line_count_method.get(), results[0])
+            finally:
+                if cache is not None:
+                    cache.close()
+            file_results, extension_stats = results[:2]
+            root_stats = results[2] if len(results) > 2 else None
             
             # Update UI in main thread
-            self.root.after(0, self.update_results, file_results, extension_stats)
+            self.root.after(0, self.update_results, file_results, extension_stats, token.cancelled, stats, root_stats)
+            
+            if watcher is not None and not token.cancelled:
+                # Queued after update_results, so every batch of changes finds the results in place
+                self.root.after(0, self.watch_started, watcher, file_results)
+                watcher.on_change = lambda changes: self.root.after(0, self.apply_watch_changes, changes)
+                watcher.start()
             
         except Exception as e:
             self.root.after(0, lambda: messagebox.showerror("Error", f"An error occurred: {str(e)}"))
         finally:
             self.root.after(0, self.counting_finished)
             
-    def is_binary_file(self, file_path):
-        """Check if a file is binary by examining the first 8192 bytes"""
-        try:
-            # First check if the file extension is known to be text
-            file_ext = Path(file_path).suffix.lower()
-            
-            # Known text file extensions - these should never be considered binary
-            text_extensions = {
-                '.txt', '.md', '.rst', '.log', '.ini', '.cfg', '.conf', '.config',
-                '.py', '.pyw', '.js', '.jsx', '.ts', '.tsx', '.html', '.htm', '.xhtml',
-                '.css', '.scss', '.sass', '.less', '.json', '.xml', '.yaml', '.yml',
-                '.java', '.c', '.cpp', '.cc', '.cxx', '.h', '.hpp', '.cs', '.php',
-                '.rb', '.go', '.rs', '.swift', '.kt', '.scala', '.r', '.m', '.mm',
-                '.sh', '.bash', '.zsh', '.fish', '.bat', '.cmd', '.ps1', '.sql',
-                '.pl', '.pm', '.lua', '.tcl', '.vb', '.vbs', '.asm', '.s',
-                '.dockerfile', '.makefile', '.cmake', '.gradle', '.maven',
-                '.gitignore', '.gitattributes', '.htaccess', '.env',
-                '.vue', '.svelte', '.elm', '.dart', '.groovy', '.clj', '.cljs',
-                '.lisp', '.scm', '.rkt', '.hs', '.fs', '.fsx', '.ml', '.mli',
-                '.tex', '.bib', '.sty', '.cls', '.dtx', '.ins'
-            }
-            
-            # If it's a known text extension, don't consider it binary
-            if file_ext in text_extensions:
-                return False
-                
-            # For files without extension or unknown extensions, check content
-            with open(file_path, 'rb') as f:
-                chunk = f.read(8192)
-                
-            # Empty files are not binary
-            if len(chunk) == 0:
-                return False
-                
-            # Check for null bytes which strongly indicate binary files
-            if b'\x00' in chunk:
-                return True
-                
-            # Expanded definition of text characters including more Unicode ranges
-            # ASCII printable (32-126) + common control chars (9=tab, 10=LF, 13=CR) + extended ASCII (128-255)
-            text_chars = sum(1 for byte in chunk if 
-                           (32 <= byte <= 126) or  # ASCII printable
-                           byte in (9, 10, 13) or  # Tab, LF, CR
-                           (128 <= byte <= 255))   # Extended ASCII/UTF-8 continuation bytes
-            
-            # Much more lenient threshold - only consider binary if less than 50% are text-like
-            if len(chunk) > 0 and text_chars / len(chunk) < 0.50:
-                return True
-                
-            return False
-        except:
-            # If we can't read the file, assume it's binary to be safe
-            return True
-
-    def count_file_lines(self, file_path, method):
-        """Count lines in a file based on the selected method"""
-        # First check if file is binary
-        if self.is_binary_file(file_path):
-            return "binary"
-            
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-        except:
-            try:
-                with open(file_path, 'r', encoding='latin-1', errors='ignore') as f:
-                    lines = f.readlines()
-            except:
-                return 0
-        
-        if method == "all":
-            # Count all lines including empty ones
-            return len(lines)
-        elif method == "non_empty":
-            # Count only non-empty lines (original behavior)
-            return sum(1 for line in lines if line.strip())
-        elif method == "code_only":
-            # Count lines that are not empty and not comments (basic heuristic)
-            count = 0
-            for line in lines:
-                stripped = line.strip()
-                if stripped and not self.is_comment_line(stripped, file_path.suffix):
-                    count += 1
-            return count
-        else:
-            return len(lines)  # Default to all lines
-    
-    def is_comment_line(self, line, file_extension):
-        """Basic heuristic to detect comment lines based on file extension"""
-        ext = file_extension.lower()
-        
-        # Python, Shell, R, etc.
-        if ext in ['.py', '.sh', '.r', '.rb', '.pl', '.ps1']:
-            return line.startswith('#')
-        
-        # JavaScript, TypeScript, Java, C/C++, C#, etc.
-        elif ext in ['.js', '.ts', '.jsx', '.tsx', '.java', '.c', '.cpp', '.h', '.cs', '.php', '.go', '.rs', '.swift', '.kt', '.scala']:
-            return line.startswith('//') or line.startswith('/*') or line.startswith('*')
-        
-        # HTML, XML
-        elif ext in ['.html', '.htm', '.xml', '.vue']:
-            return line.startswith('<!--') or line.startswith('*')
-        
-        # CSS
-        elif ext in ['.css']:
-            return line.startswith('/*') or line.startswith('*')
-        
-        # SQL
-        elif ext in ['.sql']:
-            return line.startswith('--') or line.startswith('/*')
-        
-        # Default: no comment detection
-        return False
-                
-    def update_results(self, file_results, extension_stats):
+    def update_results(self, file_results, extension_stats, partial=False, run_stats=None, root_stats=None):
+        start = time.perf_counter()
         # Store results for export functionality
         self.file_results = file_results
         self.extension_stats = extension_stats
+        self.sorted_files = None
+        self.run_stats = run_stats
+        self.root_stats = root_stats
         
         # Clear previous results
-        self.tree.delete(*self.tree.get_children())
+        self.reset_tree()
         
         # Calculate totals (excluding binary files from line count)
-        self.total_files = len(file_results)
-        self.total_lines = sum(result['lines'] for result in file_results if result['lines'] != "binary" and isinstance(result['lines'], int))
-        total_size = sum(result['size'] for result in file_results)
-        
-        # Update summary
-        size_mb = total_size / (1024 * 1024)
-        self.summary_label.config(text=f"Total: {self.total_files} files, {self.total_lines:,} lines of code, {size_mb:.2f} MB")
+        self.show_summary(partial)
         
         # Show export buttons when results are available
         self.show_export_buttons(True)
         
-        # Add extension summaries
+        # Batch runs: one row per root under a "Folders" group
+        if root_stats is not None:
+            folders = self.tree.insert("", "end", text=f"Folders ({len(root_stats)})")
+            for root, stats in root_stats.items():
+                files, lines, size = root_totals(stats)
+                self.tree.insert(folders, "end", text=f"{root} ({files} files)",
+                                 values=(f"{lines:,}", *self.metric_values(metric_totals(stats) or {}), f"{size / 1024:.1f} KB"))
+        
+        # Add extension summaries; their files are only inserted when a group is expanded
+        buckets = group_by_extension(file_results)
         for ext, stats in sorted(extension_stats.items(), key=lambda x: x[1]['lines'], reverse=True):
-            ext_name = ext if ext else "(no extension)"
-            size_kb = stats['size'] / 1024
-            parent = self.tree.insert("", "end", text=f"{ext_name} files ({stats['files']} files)", 
-                                    values=(f"{stats['lines']:,}", f"{size_kb:.1f} KB"))
+            self.insert_extension_group(ext, stats, buckets.get(ext, []))
+        
+        if run_stats is not None:
+            run_stats.add("tree", time.perf_counter() - start, len(extension_stats))
+        
+    def show_summary(self, partial=False):
+        """Recompute the totals of the current results and show them in the summary label"""
+        self.total_files, self.total_lines, self.total_size = summarize(self.file_results)
+        size_mb = self.total_size / (1024 * 1024)
+        summary = f"Total: {self.total_files} files, {self.total_lines:,} lines of code, {size_mb:.2f} MB"
+        metrics = metric_totals(self.extension_stats)
+        if metrics:
+            summary += (f" ({metrics['code']:,} code, {metrics['comment']:,} comment, "
+                        f"{metrics['blank']:,} blank)")
+        self.tree.configure(displaycolumns=("Lines", "Code", "Comment", "Blank", "Size") if metrics else ("Lines", "Size"))
+        if self.root_stats is not None:
+            summary += f" in {len(self.root_stats)} folders"
+        unique = unique_totals(self.extension_stats)
+        if unique:
+            summary += (f" - unique: {unique['files']} files, {unique['lines']:,} lines "
+                        f"({len(self.file_results.duplicate_groups())} groups of identical files)")
+        if partial:
+            summary += " (cancelled - partial results)"
+        self.summary_label.config(text=summary)
+        
+    def extension_row(self, ext, stats):
+        """Text and values of an extension's group row"""
+        ext_name = ext if ext else "(no extension)"
+        size_kb = stats['size'] / 1024
+        text = f"{ext_name} files ({stats['files']} files)"
+        if 'unique_files' in stats:
+            text = (f"{ext_name} files ({stats['files']} files, {stats['unique_files']} unique, "
+                    f"{stats['unique_lines']:,} unique lines)")
+        return (text,
+                (f"{stats['lines']:,}", *self.metric_values(stats), f"{size_kb:.1f} KB"))
+        
+    def insert_extension_group(self, ext, stats, ext_files):
+        """Add an extension's group row; its files are inserted when it is expanded"""
+        text, values = self.extension_row(ext, stats)
+        parent = self.tree.insert("", "end", text=text, values=values)
+        self.tree_groups[parent] = {'files': ext_files, 'sorted': False, 'shown': 0, 'loading': False}
+        self.tree_ext_items[ext] = parent
+        if ext_files:
+            # Placeholder child so the group gets an expand arrow
+            self.tree.insert(parent, "end", text="Loading...")
+        
+    def watch_started(self, watcher, file_results):
+        """Keep the shown results current from now on (unless they were replaced meanwhile)"""
+        if self.file_results is not file_results:
+            watcher.stop()
+            return
+        self.watcher = watcher
+        self.live = LiveResults(file_results)
+        
+    def apply_watch_changes(self, changes):
+        """Apply a batch from the watcher to the results, the summary and the extension rows in place"""
+        if self.live is None:
+            return  # stopped watching meanwhile
+        if changes.error is not None:
+            self.stop_watch()
+            self.progress_label.config(text=f"Watch stopped: {changes.error}")
+            return
+        touched = set(changes.updated.extensions)
+        touched.update(file_suffix(path).lower() for path in changes.removed)
+        self.extension_stats = self.live.apply(changes)
+        self.sorted_files = None
+        self.show_summary()
+        
+        buckets = group_by_extension(self.file_results)
+        reload = []
+        for ext in touched | self.tree_ext_items.keys():
+            stats = self.extension_stats.get(ext)
+            parent = self.tree_ext_items.get(ext)
+            if parent is None:
+                if stats is not None:
+                    self.insert_extension_group(ext, stats, buckets[ext])
+                continue
+            if stats is None:
+                # Every file of this extension is gone
+                self.tree.delete(parent)
+                del self.tree_groups[parent]
+                del self.tree_ext_items[ext]
+                continue
+            # Row numbers shift when files are removed, so every group takes its new file list
+            text, values = self.extension_row(ext, stats)
+            self.tree.item(parent, text=text, values=values)
+            group = self.tree_groups[parent]
+            group['files'] = buckets[ext]
+            group['sorted'] = False
+            if group['shown'] or group['loading']:
+                if ext in touched:
+                    reload.append(parent)
+                else:
+                    group['files'] = sort_files(group['files'])
+                    group['sorted'] = True
+        
+        # The files of expanded groups that changed are inserted again; restarting
+        # the lazy inserts also restarts the groups still being filled
+        if reload:
+            reload += [parent for parent, group in self.tree_groups.items() if group['loading'] and parent not in reload]
+            self.tree_generation += 1
+            self.tree_more_items = {item: parent for item, parent in self.tree_more_items.items()
+                                    if parent not in reload}
+            for parent in reload:
+                self.tree.delete(*self.tree.get_children(parent))
+                group = self.tree_groups[parent]
+                group['shown'] = 0
+                self.load_group_page(parent)
+        
+        self.progress_label.config(text=f"Watching for changes - {len(changes.updated)} updated, "
+                                        f"{len(changes.removed)} removed at {time.strftime('%H:%M:%S')}")
+        
+    def stop_watch(self):
+        """Stop keeping the shown results current"""
+        if self.watcher is None:
+            return
+        self.watcher.stop()
+        self.watcher = None
+        self.live = None
+        self.cancel_button.config(state="disabled")
+        self.progress_label.config(text="Stopped watching for changes")
+        
+    def metric_values(self, info):
+        """Code / Comment / Blank cells for a file or extension row ("" outside "metrics" results)"""
+        return tuple("" if info.get(key) is None else f"{info[key]:,}" for key in ("code", "comment", "blank"))
+        
+    def reset_tree(self):
+        """Remove every row and forget pending lazy inserts"""
+        self.tree.delete(*self.tree.get_children())
+        self.tree_groups = {}
+        self.tree_more_items = {}
+        self.tree_ext_items = {}
+        self.tree_generation += 1
+        
+    def on_tree_open(self, event):
+        """Insert a group's files the first time it is expanded"""
+        parent = self.tree.focus()
+        group = self.tree_groups.get(parent)
+        if group is None or group['shown'] or group['loading']:
+            return
+        self.tree.delete(*self.tree.get_children(parent))
+        self.load_group_page(parent)
+        
+    def on_tree_double_click(self, event):
+        """Double-clicking a "more files" row shows the next page of the group"""
+        item = self.tree.identify_row(event.y)
+        parent = self.tree_more_items.pop(item, None)
+        if parent is not None:
+            self.tree.delete(item)
+            self.load_group_page(parent)
             
-            # Add individual files for this extension
-            ext_files = [f for f in file_results if f['extension'] == ext]
+    def load_group_page(self, parent):
+        """Insert the next TREE_PAGE_SIZE files of a group, TREE_BATCH_SIZE rows per event-loop turn"""
+        group = self.tree_groups[parent]
+        if not group['sorted']:
             # Sort with binary files at the end
-            ext_files.sort(key=lambda x: (-1, x['path']) if x['lines'] == "binary" else (x['lines'], x['path']), reverse=True)
+            group['files'] = sort_files(group['files'])
+            group['sorted'] = True
+        group['loading'] = True
+        end = min(group['shown'] + TREE_PAGE_SIZE, len(group['files']))
+        self.insert_tree_rows(parent, end, self.tree_generation)
+        
+    def insert_tree_rows(self, parent, end, generation):
+        if generation != self.tree_generation:
+            return  # Results were cleared or replaced meanwhile
             
-            for file_info in ext_files:
-                size_kb = file_info['size'] / 1024
-                # Handle binary files display
-                if file_info['lines'] == "binary":
-                    lines_display = "binary"
-                else:
-                    lines_display = f"{file_info['lines']:,}"
-                    
-                self.tree.insert(parent, "end", text=file_info['path'], 
-                               values=(lines_display, f"{size_kb:.1f} KB"))
+        started = time.perf_counter()
+        group = self.tree_groups[parent]
+        start = group['shown']
+        stop = min(start + TREE_BATCH_SIZE, end)
+        
+        for file_info in group['files'][start:stop]:
+            size_kb = file_info['size'] / 1024
+            # Handle binary files display
+            if file_info['lines'] == "binary":
+                lines_display = "binary"
+            else:
+                lines_display = f"{file_info['lines']:,}"
+                
+            text = file_info['path']
+            if file_info.get('root'):
+                # Batch results: prefix the root's folder name
+                text = os.path.join(os.path.basename(os.path.normpath(file_info['root'])), text)
+            if file_info.get('duplicate_of'):
+                text += f"  (copy of {file_info['duplicate_of']})"
+            self.tree.insert(parent, "end", text=text, 
+                           values=(lines_display, *self.metric_values(file_info), f"{size_kb:.1f} KB"))
+        group['shown'] = stop
+        if self.run_stats is not None:
+            self.run_stats.add("tree", time.perf_counter() - started, stop - start)
+        
+        if stop < end:
+            self.root.after(1, self.insert_tree_rows, parent, end, generation)
+            return
+            
+        group['loading'] = False
+        remaining = len(group['files']) - stop
+        if remaining:
+            more = self.tree.insert(parent, "end", text=f"... {remaining:,} more files (double-click to show more)")
+            self.tree_more_items[more] = parent
+        
+    def poll_progress(self):
+        """Apply the latest progress snapshot from the counting thread"""
+        snapshot = None
+        try:
+            while True:
+                snapshot = self.progress_queue.get_nowait()
+        except queue.Empty:
+            pass
+        
+        if snapshot is not None:
+            self.show_progress(snapshot)
+        
+        if self.counting:
+            self.root.after(PROGRESS_POLL_MS, self.poll_progress)
+            
+    def show_progress(self, snapshot):
+        """Update the progress bar and label from a ProgressSnapshot"""
+        if snapshot.stage != "scanning" and str(self.progress.cget('mode')) != 'determinate':
+            # File list is known: switch from the spinner to a real bar
+            self.progress.stop()
+            self.progress.config(mode='determinate')
+        if str(self.progress.cget('mode')) == 'determinate':
+            self.progress.config(maximum=max(snapshot.bytes_found, 1), value=snapshot.bytes_done)
+        text = format_progress(snapshot)
+        if self.cancel_token is not None and self.cancel_token.paused:
+            text = "Paused - " + text
+        self.progress_label.config(text=text)
         
     def counting_finished(self):
+        self.counting = False
+        self.poll_progress()
         self.progress.stop()
         self.count_button.config(state="normal")
+        self.pause_button.config(state="disabled", text="Pause")
+        self.cancel_button.config(state="disabled")
+        self.cancel_token = None
+        if self.watcher is not None:
+            # Cancel now stops watching
+            self.cancel_button.config(state="normal")
+            self.progress_label.config(text="Watching for changes (Cancel stops watching)")
         
     def clear_results(self):
-        self.tree.delete(*self.tree.get_children())
+        self.stop_watch()
+        self.reset_tree()
         self.summary_label.config(text="No analysis performed yet")
+        self.progress_label.config(text="")
+        self.progress.config(value=0)
         self.results = {}
         self.total_lines = 0
         self.total_files = 0
+        self.total_size = 0
         
         # Clear export data and hide export buttons
         self.file_results = []
         self.extension_stats = {}
+        self.sorted_files = None
+        self.run_stats = None
+        self.root_stats = None
+        self.saved_snapshot = None
         self.show_export_buttons(False)
 
+    def clear_cache(self):
+        """Delete every entry from the persistent result cache"""
+        if not messagebox.askyesno("Clear Cache", "Remove all cached results and the run history?\n\n"
+                                   "The next analysis will recount every file, and earlier runs can no longer "
+                                   "be compared."):
+            return
+        with ResultCache() as cache:
+            cache.clear()
+        messagebox.showinfo("Success", "Result cache cleared.")
+
     def format_size(self, size_bytes):
         """Format file size in human readable format"""
         for unit in ['B', 'KB', 'MB', 'GB']:
@@ -438,9 +756,16 @@ class LineCounterGUI:
         if show:
             self.export_csv_button.pack(side=tk.LEFT, padx=(0, 10))
             self.export_json_button.pack(side=tk.LEFT, padx=(0, 10))
+            self.compare_button.pack(side=tk.LEFT, padx=(0, 10))
+            if self.run_stats is not None:
+                self.stats_button.pack(side=tk.LEFT, padx=(0, 10))
+            else:
+                self.stats_button.pack_forget()
         else:
             self.export_csv_button.pack_forget()
             self.export_json_button.pack_forget()
+            self.compare_button.pack_forget()
+            self.stats_button.pack_forget()
 
     def export_csv(self):
         """Export results as CSV with preview and save/copy options"""
@@ -448,11 +773,8 @@ class LineCounterGUI:
             messagebox.showwarning("Warning", "No results to export!")
             return
             
-        # Generate CSV data
-        csv_data = self.generate_csv_data()
-        
         # Show preview dialog
-        self.show_export_preview("CSV Export", csv_data, "csv")
+        self.show_export_preview("CSV Export", "csv")
 
     def export_json(self):
         """Export results as JSON with preview and save/copy options"""
@@ -460,91 +782,68 @@ class LineCounterGUI:
             messagebox.showwarning("Warning", "No results to export!")
             return
             
-        # Generate JSON data
-        json_data = self.generate_json_data()
-        
         # Show preview dialog
-        self.show_export_preview("JSON Export", json_data, "json")
+        self.show_export_preview("JSON Export", "json")
+
+    def get_sorted_files(self):
+        """Files in export order, shared by every export of the current results"""
+        if self.sorted_files is None:
+            start = time.perf_counter()
+            self.sorted_files = sort_files(self.file_results)
+            if self.run_stats is not None:
+                self.run_stats.add("sort", time.perf_counter() - start, len(self.file_results))
+        return self.sorted_files
+
+    def stable_results(self):
+        """The current results for a background thread.
+
+        While watching, the results change under a running export or
+        comparison, so those get a copy of them as they are now.
+        """
+        if self.watcher is None:
+            return self.file_results
+        return ResultStore.from_results(self.file_results)
+
+    def export_results(self):
+        """(file_results, sorted_files) to export"""
+        if self.watcher is None:
+            return self.file_results, self.get_sorted_files()
+        snapshot = self.stable_results()
+        return snapshot, sort_files(snapshot)
 
     def generate_csv_data(self):
         """Generate CSV formatted data from results"""
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow(['File Path', 'Extension', 'Lines of Code', 'File Size (bytes)', 'File Size (KB)'])
-        
-        # Write data for each file (sort with binary files at the end)
-        def sort_key(x):
-            if x['lines'] == "binary":
-                return (-1, x['path'])  # Binary files at end
-            return (x['lines'], x['path'])
-        
-        for file_info in sorted(self.file_results, key=sort_key, reverse=True):
-            size_kb = file_info['size'] / 1024
-            writer.writerow([
-                file_info['path'],
-                file_info['extension'] or '(no extension)',
-                file_info['lines'],
-                file_info['size'],
-                f"{size_kb:.2f}"
-            ])
-        
-        # Add summary section
-        writer.writerow([])  # Empty row
-        writer.writerow(['=== SUMMARY ==='])
-        writer.writerow(['Total Files', '', self.total_files, '', ''])
-        writer.writerow(['Total Lines', '', self.total_lines, '', ''])
-        writer.writerow(['Total Size (MB)', '', '', '', f"{sum(f['size'] for f in self.file_results) / (1024*1024):.2f}"])
-        
-        # Add extension summary
-        writer.writerow([])
-        writer.writerow(['=== BY EXTENSION ==='])
-        writer.writerow(['Extension', 'Files', 'Lines', 'Size (KB)', ''])
-        
-        for ext, stats in sorted(self.extension_stats.items(), key=lambda x: x[1]['lines'], reverse=True):
-            ext_name = ext if ext else '(no extension)'
-            size_kb = stats['size'] / 1024
-            writer.writerow([ext_name, stats['files'], stats['lines'], f"{size_kb:.2f}", ''])
-        
-        return output.getvalue()
+        file_results, sorted_files = self.export_results()
+        return generate_csv_data(file_results, self.extension_stats, sorted_files, self.root_stats)
 
     def generate_json_data(self):
         """Generate JSON formatted data from results"""
-        export_data = {
-            'analysis_summary': {
-                'total_files': self.total_files,
-                'total_lines': self.total_lines,
-                'total_size_bytes': sum(f['size'] for f in self.file_results),
-                'analyzed_folder': self.selected_folder.get(),
-                'count_method': self.line_count_method.get()
-            },
-            'files': [
-                {
-                    'path': file_info['path'],
-                    'extension': file_info['extension'] or None,
-                    'lines_of_code': file_info['lines'],
-                    'file_size_bytes': file_info['size'],
-                    'file_size_kb': round(file_info['size'] / 1024, 2)
-                }
-                for file_info in sorted(self.file_results, key=lambda x: (-1, x['path']) if x['lines'] == "binary" else (x['lines'], x['path']), reverse=True)
-            ],
-            'extension_summary': [
-                {
-                    'extension': ext if ext else None,
-                    'file_count': stats['files'],
-                    'total_lines': stats['lines'],
-                    'total_size_bytes': stats['size'],
-                    'total_size_kb': round(stats['size'] / 1024, 2)
-                }
-                for ext, stats in sorted(self.extension_stats.items(), key=lambda x: x[1]['lines'], reverse=True)
-            ]
-        }
-        
-        return json.dumps(export_data, indent=2, ensure_ascii=False)
+        file_results, sorted_files = self.export_results()
+        return generate_json_data(file_results, self.extension_stats,
+                                  self.analyzed_folder(), self.line_count_method.get(),
+                                  sorted_files, self.run_stats, self.root_stats)
+
+    def export_chunks(self, file_type, results=None):
+        """Iterator over the export text of the current results (or of results, a
+        (file_results, sorted_files) pair), a block of rows at a time"""
+        file_results, sorted_files = results or self.export_results()
+        if file_type == "csv":
+            return iter_csv_chunks(file_results, self.extension_stats, sorted_files, self.root_stats)
+        return iter_json_chunks(file_results, self.extension_stats, self.analyzed_folder(),
+                                self.line_count_method.get(), sorted_files, self.run_stats, self.root_stats)
+
+    def analyzed_folder(self):
+        """The analyzed folder for the JSON export, or the list of roots of a batch"""
+        return list(self.root_stats) if self.root_stats is not None else self.selected_folder.get()
+
+    def show_export_preview(self, title, file_type):
+        """Show preview dialog with export data and save/copy options.
 
-    def show_export_preview(self, title, data, file_type):
-        """Show preview dialog with export data and save/copy options"""
+        Only the first PREVIEW_PAGE_LINES lines are rendered; "Load More"
+        appends the next page. Saving streams the export to disk on a
+        background thread, and copying is refused for exports too large for
+        the clipboard.
+        """
         # Create preview window
         preview_window = tk.Toplevel(self.root)
         preview_window.title(title)
@@ -561,7 +860,10 @@ class LineCounterGUI:
         info_frame.columnconfigure(1, weight=1)
         
         ttk.Label(info_frame, text=f"{title} Preview", font=("Arial", 12, "bold")).grid(row=0, column=0, columnspan=2, sticky=tk.W, pady=(0, 10))
-        ttk.Label(info_frame, text=f"Files: {self.total_files}, Lines: {self.total_lines:,}").grid(row=1, column=0, sticky=tk.W)
+        ttk.Label(info_frame, text=f"Files: {self.total_files}, Lines: {self.total_lines:,}, "
+                                   f"Size: {self.format_size(self.total_size)}").grid(row=1, column=0, sticky=tk.W)
+        page_label = ttk.Label(info_frame, text="Preparing preview...")
+        page_label.grid(row=1, column=1, sticky=tk.E)
         
         # Text area with scrollbars
         text_frame = ttk.Frame(preview_window, padding="10")
@@ -578,16 +880,69 @@ class LineCounterGUI:
         text_widget.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         v_scroll.grid(row=0, column=1, sticky=(tk.N, tk.S))
         h_scroll.grid(row=1, column=0, sticky=(tk.W, tk.E))
-        
-        # Insert data
-        text_widget.insert(tk.END, data)
         text_widget.config(state=tk.DISABLED)  # Make read-only
         
         # Buttons
         button_frame = ttk.Frame(preview_window, padding="10")
         button_frame.grid(row=2, column=0, sticky=(tk.W, tk.E))
         
+        preview = {'chunks': None, 'lines': 0, 'done': False}
+        
+        def load_more():
+            """Append the next page of the export to the preview"""
+            if preview['done'] or not preview_window.winfo_exists():
+                return
+            page = []
+            page_lines = 0
+            for chunk in preview['chunks']:
+                page.append(chunk)
+                page_lines += chunk.count("\n")
+                if page_lines >= PREVIEW_PAGE_LINES:
+                    break
+            else:
+                preview['done'] = True
+            preview['lines'] += page_lines
+            
+            text_widget.config(state=tk.NORMAL)
+            text_widget.insert(tk.END, "".join(page))
+            text_widget.config(state=tk.DISABLED)
+            
+            if preview['done']:
+                page_label.config(text=f"Showing all {preview['lines']:,} lines")
+                more_button.config(state="disabled")
+            else:
+                page_label.config(text=f"Showing the first {preview['lines']:,} lines")
+                more_button.config(state="normal")
+        
+        # Taken on the UI thread: while watching, this is a copy the watcher cannot change under the sort
+        preview_results = self.stable_results()
+        cached = self.sorted_files if preview_results is self.file_results else None
+        
+        def prepare_preview():
+            # Sorting a large result takes a moment; keep it off the UI thread
+            start = time.perf_counter()
+            sorted_files = cached if cached is not None else sort_files(preview_results)
+            self.root.after(0, start_preview, sorted_files, time.perf_counter() - start)
+        
+        def start_preview(sorted_files, elapsed):
+            # Shared with later exports only if the results are still the ones that were sorted
+            if self.file_results is preview_results and self.sorted_files is None:
+                self.sorted_files = sorted_files
+                if self.run_stats is not None:
+                    self.run_stats.add("sort", elapsed, len(preview_results))
+            if preview_window.winfo_exists():
+                preview['chunks'] = self.export_chunks(file_type, (preview_results, sorted_files))
+                load_more()
+        
         def copy_to_clipboard():
+            if len(self.file_results) > CLIPBOARD_MAX_FILES:
+                messagebox.showwarning(
+                    "Too Large to Copy",
+                    f"This export has {len(self.file_results):,} files, which is too large for the clipboard "
+                    f"(limit: {CLIPBOARD_MAX_FILES:,} files).\n\nUse \"Save to File\" instead.",
+                    parent=preview_window)
+                return
+            data = self.generate_csv_data() if file_type == "csv" else self.generate_json_data()
             preview_window.clipboard_clear()
             preview_window.clipboard_append(data)
             messagebox.showinfo("Success", "Data copied to clipboard!")
@@ -613,26 +968,13 @@ class LineCounterGUI:
                     if not filename.lower().endswith(f'.{file_extension}'):
                         filename += f'.{file_extension}'
                     
-                    # Use different newline settings for CSV vs JSON
-                    newline_setting = '' if file_type == "csv" else None
+                    save_button.config(state="disabled")
+                    page_label.config(text="Saving...")
                     
-                    try:
-                        with open(filename, 'w', encoding='utf-8', newline=newline_setting) as f:
-                            f.write(data)
-                        
-                        # Verify the file was actually written
-                        if os.path.exists(filename) and os.path.getsize(filename) > 0:
-                            messagebox.showinfo("Success", f"Data saved successfully!\n\nFile: {filename}\nSize: {os.path.getsize(filename)} bytes")
-                            preview_window.destroy()
-                        else:
-                            messagebox.showerror("Error", "File was created but appears to be empty or inaccessible.")
-                            
-                    except PermissionError:
-                        messagebox.showerror("Permission Error", f"Cannot write to the selected location.\nPlease choose a different location or run as administrator.\n\nFile: {filename}")
-                    except OSError as e:
-                        messagebox.showerror("File System Error", f"Cannot write to file:\n{str(e)}\n\nPlease try a different location or filename.")
-                    except Exception as e:
-                        messagebox.showerror("Error", f"Failed to save file:\n{str(e)}\n\nFile: {filename}")
+                    # Stream the export to disk without blocking the UI
+                    thread = threading.Thread(target=write_file, args=(filename, self.export_chunks(file_type)))
+                    thread.daemon = True
+                    thread.start()
                 else:
                     # User cancelled the dialog - this is normal, no error message needed
                     pass
@@ -640,9 +982,247 @@ class LineCounterGUI:
             except Exception as e:
                 messagebox.showerror("Error", f"An error occurred while trying to save:\n{str(e)}")
         
+        def write_file(filename, chunks):
+            # Use different newline settings for CSV vs JSON
+            newline_setting = '' if file_type == "csv" else None
+            error = None
+            start = time.perf_counter()
+            try:
+                with open(filename, 'w', encoding='utf-8', newline=newline_setting) as f:
+                    for chunk in chunks:
+                        f.write(chunk)
+                if self.run_stats is not None:
+                    self.run_stats.add("export", time.perf_counter() - start, self.total_files)
+            except Exception as e:
+                error = e
+            self.root.after(0, save_finished, filename, error)
+        
+        def save_finished(filename, error):
+            if preview_window.winfo_exists():
+                save_button.config(state="normal")
+                page_label.config(text=f"Showing the first {preview['lines']:,} lines" if not preview['done']
+                                  else f"Showing all {preview['lines']:,} lines")
+            
+            if isinstance(error, PermissionError):
+                messagebox.showerror("Permission Error", f"Cannot write to the selected location.\nPlease choose a different location or run as administrator.\n\nFile: {filename}")
+            elif isinstance(error, OSError):
+                messagebox.showerror("File System Error", f"Cannot write to file:\n{str(error)}\n\nPlease try a different location or filename.")
+            elif error is not None:
+                messagebox.showerror("Error", f"Failed to save file:\n{str(error)}\n\nFile: {filename}")
+            # Verify the file was actually written
+            elif os.path.exists(filename) and os.path.getsize(filename) > 0:
+                messagebox.showinfo("Success", f"Data saved successfully!\n\nFile: {filename}\nSize: {os.path.getsize(filename)} bytes")
+                if preview_window.winfo_exists():
+                    preview_window.destroy()
+            else:
+                messagebox.showerror("Error", "File was created but appears to be empty or inaccessible.")
+        
         ttk.Button(button_frame, text="Copy to Clipboard", command=copy_to_clipboard).pack(side=tk.LEFT, padx=(0, 10))
-        ttk.Button(button_frame, text="Save to File", command=save_to_file).pack(side=tk.LEFT, padx=(0, 10))
+        save_button = ttk.Button(button_frame, text="Save to File", command=save_to_file)
+        save_button.pack(side=tk.LEFT, padx=(0, 10))
+        more_button = ttk.Button(button_frame, text="Load More", command=load_more, state="disabled")
+        more_button.pack(side=tk.LEFT, padx=(0, 10))
         ttk.Button(button_frame, text="Close", command=preview_window.destroy).pack(side=tk.RIGHT)
+        
+        thread = threading.Thread(target=prepare_preview)
+        thread.daemon = True
+        thread.start()
+
+    def show_run_stats(self):
+        """Show the per-stage timings and slowest files of the last run"""
+        if self.run_stats is None:
+            messagebox.showinfo("Run Statistics", "Enable \"Collect run statistics\" and run the analysis again.")
+            return
+        
+        stats_window = tk.Toplevel(self.root)
+        stats_window.title("Run Statistics")
+        stats_window.geometry("700x400")
+        stats_window.columnconfigure(0, weight=1)
+        stats_window.rowconfigure(0, weight=1)
+        
+        text_widget = tk.Text(stats_window, wrap=tk.NONE, font=("Consolas", 9))
+        text_widget.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=10, pady=10)
+        
+        def refresh():
+            # Tree population, sorting and exports keep adding to the statistics
+            text_widget.config(state=tk.NORMAL)
+            text_widget.delete("1.0", tk.END)
+            text_widget.insert(tk.END, format_stats(self.run_stats))
+            text_widget.config(state=tk.DISABLED)
+        refresh()
+        
+        button_frame = ttk.Frame(stats_window, padding="10")
+        button_frame.grid(row=1, column=0, sticky=(tk.W, tk.E))
+        ttk.Button(button_frame, text="Refresh", command=refresh).pack(side=tk.LEFT)
+        ttk.Button(button_frame, text="Close", command=stats_window.destroy).pack(side=tk.RIGHT)
+
+    def show_compare_menu(self):
+        """Pick the baseline to compare the results with: a JSON export or a cached run"""
+        menu = tk.Menu(self.root, tearoff=0)
+        menu.add_command(label="Previous JSON export...", command=self.compare_with_export)
+        if self.use_cache.get() and self.root_stats is None:
+            folder, method = self.analyzed_folder(), self.line_count_method.get()
+            with ResultCache() as cache:
+                snapshots = [snapshot for snapshot in cache.list_snapshots(folder, method)
+                             if snapshot[0] != self.saved_snapshot]
+            menu.add_separator()
+            for taken_at, files in snapshots:
+                taken = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(taken_at / 1e9))
+                menu.add_command(label=f"Cached run of {taken} ({files:,} files)",
+                                 command=lambda t=taken_at, label=taken: self.compare_with_snapshot(t, label))
+            if not snapshots:
+                menu.add_command(label="No earlier cached runs of this folder", state="disabled")
+        button = self.compare_button
+        menu.tk_popup(button.winfo_rootx(), button.winfo_rooty() + button.winfo_height())
+
+    def compare_with_export(self):
+        filename = filedialog.askopenfilename(title="Select a previous JSON export",
+                                              filetypes=[("JSON files", "*.json"), ("All files", "*.*")])
+        if not filename:
+            return
+        method = self.line_count_method.get()
+
+        def load():
+            baseline, summary = load_json_export(filename)
+            check_count_method(summary, method)
+            return baseline
+        self.start_compare(load, filename)
+
+    def compare_with_snapshot(self, taken_at, taken):
+        folder, method = self.analyzed_folder(), self.line_count_method.get()
+
+        def load():
+            # The connection belongs to the loading thread
+            with ResultCache() as cache:
+                return cache.load_snapshot(folder, method, taken_at)
+        self.start_compare(load, f"cached run of {taken}")
+
+    def start_compare(self, load_baseline, label):
+        """Load the baseline and compute the deltas in the background, then show them"""
+        current = self.stable_results()
+        compared = self.analyzed_folder()
+        compared = ", ".join(compared) if isinstance(compared, list) else compared
+        self.compare_button.config(state="disabled")
+        self.progress_label.config(text=f"Comparing with {label}...")
+
+        def run():
+            try:
+                baseline = load_baseline()
+                if baseline is None:
+                    raise ValueError("the snapshot is no longer in the cache")
+                diff = diff_results(baseline, current, label, compared)
+                self.root.after(0, self.show_diff, diff)
+            except Exception as e:
+                self.root.after(0, lambda: messagebox.showerror("Error", f"Cannot compare with {label}:\n{str(e)}"))
+            finally:
+                self.root.after(0, lambda: (self.compare_button.config(state="normal"),
+                                            self.progress_label.config(text="")))
+
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+
+    def show_diff(self, diff):
+        """Show a comparison: totals, per-extension deltas and the changed files, with a diff export"""
+        diff_window = tk.Toplevel(self.root)
+        diff_window.title("Comparison")
+        diff_window.geometry("900x600")
+        diff_window.columnconfigure(0, weight=1)
+        diff_window.rowconfigure(1, weight=1)
+
+        info_frame = ttk.Frame(diff_window, padding="10")
+        info_frame.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        ttk.Label(info_frame, text=f"Baseline: {diff.old_label}").grid(row=0, column=0, sticky=tk.W)
+        ttk.Label(info_frame, text=f"Compared: {diff.new_label}").grid(row=1, column=0, sticky=tk.W)
+        ttk.Label(info_frame, text=format_diff_summary(diff), wraplength=860,
+                  font=("Arial", 10, "bold")).grid(row=2, column=0, sticky=tk.W, pady=(5, 0))
+
+        tree_frame = ttk.Frame(diff_window, padding="10")
+        tree_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        tree_frame.columnconfigure(0, weight=1)
+        tree_frame.rowconfigure(0, weight=1)
+        tree = ttk.Treeview(tree_frame, columns=("Old", "New", "Delta", "Size"), show="tree headings")
+        tree.heading("#0", text="Extension / File")
+        tree.heading("Old", text="Old Lines")
+        tree.heading("New", text="New Lines")
+        tree.heading("Delta", text="Lines Delta")
+        tree.heading("Size", text="Size Delta")
+        tree.column("#0", width=440)
+        for column in ("Old", "New", "Delta", "Size"):
+            tree.column(column, width=100)
+        v_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=v_scroll.set)
+        tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        v_scroll.grid(row=0, column=1, sticky=(tk.N, tk.S))
+
+        # Changed files are listed per extension, largest change first, and inserted when a group is expanded
+        groups = {}
+        for delta in diff.sorted_files():
+            groups.setdefault(delta.extension, []).append(delta)
+        pending = {}
+        for ext, delta in sort_extension_deltas(diff.extension_deltas):
+            ext_name = ext if ext else "(no extension)"
+            parent = tree.insert("", "end", text=f"{ext_name} files (+{delta['files_added']} / "
+                                                 f"-{delta['files_removed']} / {delta['files_changed']} changed)",
+                                 values=(f"{delta['old_lines']:,}", f"{delta['new_lines']:,}",
+                                         f"{delta['lines_delta']:+,}", f"{delta['size_delta'] / 1024:+.1f} KB"))
+            if groups.get(ext):
+                pending[parent] = groups[ext]
+                tree.insert(parent, "end", text="Loading...")
+
+        def on_open(event):
+            parent = tree.focus()
+            files = pending.pop(parent, None)
+            if files is None:
+                return
+            tree.delete(*tree.get_children(parent))
+            for delta in files[:TREE_PAGE_SIZE]:
+                text = delta.path if delta.root is None else os.path.join(os.path.basename(delta.root), delta.path)
+                tree.insert(parent, "end", text=f"[{delta.status}] {text}",
+                            values=("" if delta.old_lines is None else delta.old_lines,
+                                    "" if delta.new_lines is None else delta.new_lines,
+                                    f"{lines_delta(delta):+,}", f"{size_delta(delta) / 1024:+.1f} KB"))
+            if len(files) > TREE_PAGE_SIZE:
+                tree.insert(parent, "end", text=f"... {len(files) - TREE_PAGE_SIZE:,} more files (see the export)")
+        tree.bind("<<TreeviewOpen>>", on_open)
+
+        button_frame = ttk.Frame(diff_window, padding="10")
+        button_frame.grid(row=2, column=0, sticky=(tk.W, tk.E))
+
+        def save(file_type):
+            filename = filedialog.asksaveasfilename(
+                title=f"Save {file_type.upper()} comparison",
+                defaultextension=f".{file_type}",
+                filetypes=[(f"{file_type.upper()} files", f"*.{file_type}"), ("All files", "*.*")],
+                initialfile=f"line_count_diff.{file_type}"
+            )
+            if not filename:
+                return
+            chunks = iter_diff_csv_chunks(diff) if file_type == "csv" else iter_diff_json_chunks(diff)
+
+            def write_file():
+                error = None
+                try:
+                    with open(filename, 'w', encoding='utf-8', newline='' if file_type == "csv" else None) as f:
+                        for chunk in chunks:
+                            f.write(chunk)
+                except Exception as e:
+                    error = e
+                self.root.after(0, save_finished, filename, error)
+
+            thread = threading.Thread(target=write_file)
+            thread.daemon = True
+            thread.start()
+
+        def save_finished(filename, error):
+            if error is not None:
+                messagebox.showerror("Error", f"Failed to save file:\n{str(error)}\n\nFile: {filename}")
+            else:
+                messagebox.showinfo("Success", f"Comparison saved!\n\nFile: {filename}")
+
+        ttk.Button(button_frame, text="Export Diff as CSV", command=lambda: save("csv")).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="Export Diff as JSON", command=lambda: save("json")).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="Close", command=diff_window.destroy).pack(side=tk.RIGHT)
 
     def disable_fullscreen(self):
         """Comprehensive fullscreen prevention system"""
@@ -734,6 +1314,8 @@ class LineCounterGUI:
         self.root.maxsize(max_width, max_height)
 
 def main():
+    # Needed for the worker process pool in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = LineCounterGUI(root)
     root.mainloop()
@@ -0,0 +1,242 @@
+"""
+.gitignore support for the folder walk.
+
+Rules come from .git/info/exclude, the repository's top-level .gitignore
+and every nested .gitignore, with git's semantics: blank lines and
+#-comments are skipped, "!" re-includes, a trailing "/" matches folders
+only, a "/" at the start or in the middle anchors the pattern to the
+folder of its .gitignore (otherwise it matches a name at any depth), and
+"**" matches across folders ("**/x", "x/**", "a/**/b"). A deeper
+.gitignore wins over a shallower one, and within a file the last matching
+rule wins.
+
+Each .gitignore is compiled once (and reused by later runs while the file
+is unchanged); the walker keeps one IgnoreMatcher per folder, and an
+ignored folder is pruned before it is opened - just as git does, nothing
+inside an ignored folder can be re-included.
+"""
+
+import os
+import re
+from functools import lru_cache
+
+IGNORE_FILE = ".gitignore"
+
+# Match rules case-insensitively where file names are (like core.ignorecase)
+_FLAGS = re.IGNORECASE if os.path.normcase("A") == "a" else 0
+
+
+def locate_repository(folder_path):
+    """(work_tree, git_dir) of the repository containing folder_path, or None"""
+    path = os.path.abspath(folder_path)
+    while True:
+        dot_git = os.path.join(path, ".git")
+        if os.path.isdir(dot_git):
+            return path, dot_git
+        if os.path.isfile(dot_git):
+            # Worktrees and submodules: ".git" is a file pointing at the real git dir
+            try:
+                with open(dot_git, encoding="utf-8") as f:
+                    line = f.readline().strip()
+            except OSError:
+                line = ""
+            if line.startswith("gitdir:"):
+                return path, os.path.normpath(os.path.join(path, line[len("gitdir:"):].strip()))
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def common_dir(git_dir):
+    """The git dir shared by all worktrees (holds info/exclude and config)"""
+    try:
+        with open(os.path.join(git_dir, "commondir"), encoding="utf-8") as f:
+            return os.path.normpath(os.path.join(git_dir, f.read().strip()))
+    except OSError:
+        return git_dir
+
+
+def translate(pattern):
+    """Regex source for a gitignore glob: * and ? stop at "/", ** crosses folders"""
+    parts = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            j = i
+            while j < n and pattern[j] == '*':
+                j += 1
+            whole_segment = j - i == 2 and (i == 0 or pattern[i - 1] == '/')
+            if whole_segment and j == n:
+                parts.append('.*')  # "**" or a trailing "/**": everything
+            elif whole_segment and pattern[j] == '/':
+                parts.append('(?:.*/)?')  # "**/": zero or more folders
+                j += 1
+            else:
+                parts.append('[^/]*')  # other runs of asterisks are plain "*"
+            i = j
+        elif c == '?':
+            parts.append('[^/]')
+            i += 1
+        elif c == '[':
+            j = i + 1
+            if j < n and pattern[j] in '!^':
+                j += 1
+            if j < n and pattern[j] == ']':
+                j += 1
+            j = pattern.find(']', j)
+            if j < 0:
+                parts.append(re.escape(c))
+                i += 1
+                continue
+            body = pattern[i + 1:j]
+            negate = body[:1] in ('!', '^')
+            if negate:
+                body = body[1:]
+            body = body.replace('\\', '\\\\')
+            parts.append('(?!/)[' + ('^' if negate else '') + body + ']')
+            i = j + 1
+        elif c == '\\' and i + 1 < n:
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(c))
+            i += 1
+    return ''.join(parts)
+
+
+def parse_rule(line):
+    """(regex source, negate, dir_only, anchored) for one line, or None for blanks and comments"""
+    line = line.rstrip('\r')
+    if not line or line.startswith('#'):
+        return None
+    # Trailing spaces are dropped unless escaped with a backslash
+    stripped = line.rstrip(' ')
+    if stripped != line and stripped.endswith('\\'):
+        stripped += ' '
+    line = stripped
+    negate = line.startswith('!')
+    if negate:
+        line = line[1:]
+    dir_only = line.endswith('/')
+    if dir_only:
+        line = line[:-1]
+    if not line:
+        return None
+    anchored = '/' in line
+    if line.startswith('/'):
+        line = line[1:]
+    return translate(line), negate, dir_only, anchored
+
+
+class IgnoreRules:
+    """The compiled rules of one ignore file"""
+
+    def __init__(self, lines):
+        self.rules = []
+        for line in lines:
+            rule = parse_rule(line)
+            if rule is not None:
+                source, negate, dir_only, anchored = rule
+                self.rules.append((re.compile(source + r'\Z', _FLAGS), negate, dir_only, anchored))
+        # One combined regex per kind rejects non-matching names without trying each rule
+        self._any_name = self._combine(rule for rule in self.rules if not rule[3])
+        self._any_path = self._combine(rule for rule in self.rules if rule[3])
+
+    @staticmethod
+    def _combine(rules):
+        sources = [f"(?:{regex.pattern})" for regex, _, _, _ in rules]
+        return re.compile('|'.join(sources), _FLAGS).match if sources else None
+
+    def match(self, name, path, is_dir):
+        """True (ignored), False (re-included) or None (no rule applies).
+
+        name is the entry's own name and path its path relative to the
+        folder of this ignore file, '/'-separated.
+        """
+        if not ((self._any_name and self._any_name(name)) or (self._any_path and self._any_path(path))):
+            return None
+        for regex, negate, dir_only, anchored in reversed(self.rules):
+            if dir_only and not is_dir:
+                continue
+            if regex.match(path if anchored else name):
+                return not negate
+        return None
+
+    def __bool__(self):
+        return bool(self.rules)
+
+
+@lru_cache(maxsize=1024)
+def _load(path, size, mtime_ns):
+    try:
+        with open(path, encoding="utf-8", errors="surrogateescape") as f:
+            return IgnoreRules(f.read().splitlines())
+    except OSError as e:
+        print(f"Error reading {path}: {e}")
+        return IgnoreRules(())
+
+
+def load_rules(path):
+    """Compiled rules of an ignore file, reused while the file is unchanged; None if it is missing"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return _load(path, st.st_size, st.st_mtime_ns)
+
+
+class IgnoreMatcher:
+    """The ignore rules in force in one folder.
+
+    levels holds (rules, prefix) from the lowest precedence (info/exclude)
+    to the deepest .gitignore; prefix is this folder's path relative to
+    the folder the rules came from.
+    """
+
+    def __init__(self, levels=()):
+        self.levels = levels
+
+    @classmethod
+    def for_folder(cls, folder_path):
+        """The matcher for folder_path, with the rules of every folder above it up to the repository root.
+
+        The folder's own .gitignore is added by the walker (with_file), as
+        for every folder below it. Outside a repository only the ignore
+        files inside the folder apply.
+        """
+        folder_path = os.path.abspath(folder_path)
+        found = locate_repository(folder_path)
+        if found is None:
+            return cls()
+        work_tree, git_dir = found
+        matcher = cls().with_file(os.path.join(common_dir(git_dir), "info", "exclude"))
+        rel = os.path.relpath(folder_path, work_tree)
+        if rel != ".":
+            path = work_tree
+            for name in rel.split(os.sep):
+                matcher = matcher.with_file(os.path.join(path, IGNORE_FILE)).child(name)
+                path = os.path.join(path, name)
+        return matcher
+
+    def with_file(self, path):
+        """This matcher plus the rules of the ignore file at path (which sits in this folder)"""
+        rules = load_rules(path)
+        if not rules:
+            return self
+        return IgnoreMatcher(self.levels + ((rules, ''),))
+
+    def child(self, name):
+        """The matcher for subfolder name, before its own ignore file is added"""
+        return IgnoreMatcher(tuple((rules, prefix + name + '/') for rules, prefix in self.levels))
+
+    def ignored(self, name, is_dir):
+        """True if the entry called name in this folder is ignored"""
+        if is_dir and name == ".git":
+            return True
+        for rules, prefix in reversed(self.levels):
+            result = rules.match(name, prefix + name, is_dir)
+            if result is not None:
+                return result
+        return False
@@ -0,0 +1,197 @@
+"""
+Comment syntax per language, used by the "code_only" count method.
+
+Each Language is compiled once into two classifiers, one for bytes (pure
+ASCII content) and one for decoded text, and an extension is resolved to its
+Language with a single dict lookup per file (get_language).
+
+A classifier works on whole buffers of complete lines. A buffer without
+any block opener (one find() per opener) only needs a line-comment prefix
+check per line; otherwise the open block is carried from line to line and
+only the lines holding a delimiter are scanned token by token. Block
+comments (/* */, <!-- -->) keep their state across lines and chunks.
+Python docstrings - a triple-quoted string that starts a line - count as
+comments; a triple-quoted string after code is a multi-line string and
+counts as code.
+
+Tokens inside a string literal are skipped when the quotes before them on
+the line do not pair up. That is a heuristic, like the rest of the counting:
+strings spanning lines and escaped quotes are not tracked.
+"""
+
+import re
+
+# Part of the cache key of code_only results; bump when classification changes
+CLASSIFIER_VERSION = 2
+
+
+def count_nonempty(data):
+    """Count the lines that are not blank in str or bytes of complete \\n-separated lines"""
+    newline, strip = ('\n', str.strip) if isinstance(data, str) else (b'\n', bytes.strip)
+    return sum(map(bool, map(strip, data.split(newline))))
+
+
+class Language:
+    """Comment syntax of one language family.
+
+    line_comments: prefixes that comment out the rest of the line
+    blocks: (open, close) pairs of block comments
+    docstrings: string delimiters that count as comments when they start a line
+    quotes: quote characters checked before treating a token after code as one
+    """
+
+    def __init__(self, name, extensions, line_comments=(), blocks=(), docstrings=(), quotes='"\''):
+        self.name = name
+        self.extensions = extensions
+        self.line_comments = line_comments
+        # (open, close, is_docstring); block state refers to an index into this list
+        self.delimiters = [(open_, close, False) for open_, close in blocks]
+        self.delimiters += [(delimiter, delimiter, True) for delimiter in docstrings]
+        self.quotes = quotes
+        self.bytes = Classifier(self, bytes)
+        self.text = Classifier(self, str)
+
+    def resume(self, code, state, rest_comment, nonblank=True):
+        """A short ASCII line start that scans to the given result (see LineCounter._compact_carry)"""
+        text = "x " if code else ""
+        if rest_comment:
+            text += self.line_comments[0]
+        elif state is not None:
+            text += self.delimiters[state[0]][0] + " "
+        elif nonblank and not code and self.delimiters:
+            # A comment that closed on this line: an empty block keeps the line non-blank
+            open_, close, _ = self.delimiters[0]
+            text += open_ + close
+        return text.encode('ascii')
+
+    def __repr__(self):
+        return f"<Language {self.name}>"
+
+
+class Classifier:
+    """A Language compiled for str or for bytes"""
+
+    def __init__(self, language, kind):
+        encode = (lambda s: s.encode('ascii')) if kind is bytes else (lambda s: s)
+        self.line_comments = tuple(encode(p) for p in language.line_comments)
+        self.opens = [encode(open_) for open_, _, _ in language.delimiters]
+        self.closes = [encode(close) for _, close, _ in language.delimiters]
+        self.docstring = [doc for _, _, doc in language.delimiters]
+        self.open_index = {open_: i for i, open_ in enumerate(self.opens)}
+        self.quotes = [encode(q) for q in language.quotes]
+        self.newline = encode('\n')
+        self.strip = kind.strip
+        # "Holds an opener" test, and the opener length for the one-line block check
+        self.has_open = re.compile(encode('|').join(map(re.escape, self.opens))).search if self.opens else None
+        self.open_len = len(self.opens[0]) if len(set(map(len, self.opens))) == 1 else None
+
+        # Longest first, so '<!--' wins over a '<' prefix and '"""' over '"'
+        tokens = sorted(set(self.line_comments) | set(self.opens), key=len, reverse=True)
+        self.token = re.compile(encode('|').join(re.escape(t) for t in tokens)) if tokens else None
+        # ASCII bytes that take no part in a token or a quote: safe places to cut a long line
+        special = set(''.join(language.line_comments) + ''.join(d for d, _, _ in language.delimiters)
+                      + ''.join(c for _, c, _ in language.delimiters) + language.quotes)
+        self.safe = bytes(b for b in range(128) if chr(b) not in special)
+
+    def count_code(self, data, state=None):
+        """Count code lines in complete \\n-separated lines; returns (count, state).
+
+        state is None, or (delimiter index, is_comment) for a block left open
+        by an earlier buffer.
+        """
+        if state is None and not any(open_ in data for open_ in self.opens):
+            # No block syntax anywhere in the buffer: a prefix check per line is enough
+            return self.count_plain(data), None
+
+        prefixes = self.line_comments
+        has_open = self.has_open
+        closes = self.closes
+        count = 0
+        for line in map(self.strip, data.split(self.newline)):
+            if not line:
+                continue
+            if state is None:
+                if not has_open(line):
+                    if not line.startswith(prefixes):
+                        count += 1
+                    continue
+                # The usual one-line /* ... */ or <!-- ... --> needs no token scan
+                index = self.open_index.get(line[:self.open_len]) if self.open_len else None
+                if index is not None and line.find(closes[index], self.open_len) == len(line) - len(closes[index]):
+                    continue
+            elif closes[state[0]] not in line:
+                count += not state[1]  # inside a block comment, or the body of a multi-line string
+                continue
+            code, state, _ = self.scan_line(line, state)
+            count += code
+        return count, state
+
+    def count_plain(self, data):
+        """Code lines in a buffer that holds no block opener"""
+        if not self.line_comments:
+            return count_nonempty(data)
+        prefixes = self.line_comments
+        count = 0
+        for line in map(self.strip, data.split(self.newline)):
+            if line and not line.startswith(prefixes):
+                count += 1
+        return count
+
+    def scan_line(self, line, state=None):
+        """Classify one line; returns (has_code, state after the line, ends_in_line_comment)"""
+        s = line.strip()
+        n = len(s)
+        pos = 0
+        code = False
+        while pos < n:
+            if state is not None:
+                index, comment = state
+                j = s.find(self.closes[index], pos)
+                if j < 0:
+                    return code or not comment, state, False
+                code = code or not comment
+                pos = j + len(self.closes[index])
+                state = None
+                continue
+
+            start = pos
+            while True:
+                match = self.token.search(s, pos) if self.token is not None else None
+                if match is None:
+                    return code or bool(s[start:].strip()), None, False
+                hit = match.start()
+                if self.quotes and any(s.count(q, start, hit) % 2 for q in self.quotes):
+                    pos = hit + 1  # inside a string literal
+                    continue
+                code = code or bool(s[start:hit].strip())
+                index = self.open_index.get(match.group())
+                if index is None:
+                    return code, None, True
+                comment = not code if self.docstring[index] else True
+                code = code or not comment
+                state = (index, comment)
+                pos = match.end()
+                break
+        return code, state, False
+
+
+_C_LIKE = ('.js', '.ts', '.jsx', '.tsx', '.java', '.c', '.cpp', '.h', '.cs', '.php', '.go', '.rs', '.swift',
+           '.kt', '.scala')
+
+LANGUAGES = [
+    Language("Python", ('.py',), ('#',), docstrings=('"""', "'''")),
+    Language("Shell", ('.sh', '.r', '.rb', '.pl'), ('#',)),
+    Language("PowerShell", ('.ps1',), ('#',), blocks=(('<#', '#>'),)),
+    Language("C-like", _C_LIKE, ('//',), blocks=(('/*', '*/'),), quotes='"\'`'),
+    Language("Markup", ('.html', '.htm', '.xml', '.vue'), blocks=(('<!--', '-->'),), quotes=''),
+    Language("CSS", ('.css',), blocks=(('/*', '*/'),)),
+    Language("SQL", ('.sql',), ('--',), blocks=(('/*', '*/'),), quotes="'"),
+]
+
+# Extension -> Language, resolved once per file
+EXTENSION_LANGUAGES = {ext: language for language in LANGUAGES for ext in language.extensions}
+
+
+def get_language(file_extension):
+    """The Language for an extension, or None when comments are not recognised"""
+    return EXTENSION_LANGUAGES.get(file_extension.lower())
@@ -0,0 +1,436 @@
+"""
+Compact storage for per-file results.
+
+A ResultStore keeps one typed array per column instead of one dict per file:
+line counts and sizes are 64-bit integers, binary files are a flag column
+(their line count is stored as 0), and each extension is stored once in an
+interned table and referenced by index. Totals and per-extension stats are
+kept up to date as files are added, so summaries are O(1).
+
+For code that still thinks in file dicts, a store behaves like the old list:
+len(), indexing and iteration give {'path', 'lines', 'size', 'extension'}
+dicts (lines is "binary" for binary files), built on demand.
+
+Files counted with the "metrics" method arrive as LineMetrics; the store then
+grows code / comment / blank columns, and its rows and extension stats carry
+those keys as well ('lines' is the total).
+
+Batch analyses store each file's root folder too (an interned root column);
+rows then carry a 'root' key.
+
+Watch mode edits a store in place: replace() updates a changed file and
+remove() drops deleted ones, adjusting the totals as it goes.
+
+mark_duplicates() records which rows have the same content as an earlier
+row (from the content fingerprints of a dedup run): the copies stay in the
+results, but extension stats gain 'unique_files' / 'unique_lines' that
+count each content once, and rows carry the path they duplicate. Changing
+the rows afterwards drops the marks.
+
+to_bytes() / from_bytes() pack a store into a compressed blob (the columns
+as raw arrays, in this machine's byte order) for the snapshots kept in the
+result cache.
+"""
+
+import json
+import struct
+import zlib
+from array import array
+from collections import namedtuple
+
+# One pass over a file gives all of these; code + comment + blank == total
+LineMetrics = namedtuple('LineMetrics', 'total code comment blank')
+METRIC_KEYS = ('code', 'comment', 'blank')
+
+
+class ResultStore:
+    """Column store of file results with incremental totals"""
+
+    def __init__(self):
+        self.paths = []
+        self.lines = array('q')
+        self.sizes = array('q')
+        self.binary = array('B')
+        self.ext_ids = array('I')
+        # Interned extension table and per-extension running totals
+        self.extensions = []
+        self._ext_index = {}
+        self._ext_files = array('q')
+        self._ext_lines = array('q')
+        self._ext_sizes = array('q')
+        self.total_lines = 0
+        self.total_size = 0
+        self.binary_files = 0
+        self._sort_lines = None
+        # code / comment / blank columns, per extension and totals; None until a LineMetrics arrives
+        self.metrics = None
+        self._ext_metrics = None
+        self.metric_totals = None
+        # Root folder ids and names; None until a row with a root arrives
+        self.roots = None
+        self.root_names = []
+        self._root_index = {}
+        # Row of the counted copy (-1 for none) and unique totals; None until mark_duplicates()
+        self.duplicate_of = None
+        self._ext_unique_files = None
+        self._ext_unique_lines = None
+        self.unique_files = 0
+        self.unique_lines = 0
+
+    @classmethod
+    def from_results(cls, file_results):
+        """Build a store from file dicts"""
+        store = cls()
+        for file_info in file_results:
+            lines = file_info['lines']
+            if 'code' in file_info and lines != "binary":
+                lines = LineMetrics(lines, file_info['code'], file_info['comment'], file_info['blank'])
+            store.append(file_info['path'], lines, file_info['size'], file_info['extension'], file_info.get('root'))
+        return store
+
+    def to_bytes(self):
+        """The store as a compressed blob for from_bytes()"""
+        header = json.dumps({
+            'rows': len(self.paths),
+            'extensions': self.extensions,
+            'roots': self.root_names if self.roots is not None else None,
+            'metrics': self.metrics is not None,
+        }).encode("utf-8")
+        columns = [self.lines, self.sizes, self.binary, self.ext_ids]
+        if self.roots is not None:
+            columns.append(self.roots)
+        if self.metrics is not None:
+            columns.extend(self.metrics)
+        paths = "\0".join(self.paths).encode("utf-8", errors="surrogateescape")
+        parts = [struct.pack("<II", len(header), len(paths)), header, paths]
+        parts.extend(column.tobytes() for column in columns)
+        return zlib.compress(b"".join(parts), 1)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Rebuild a store written by to_bytes() (on a machine with the same byte order)"""
+        data = zlib.decompress(data)
+        header_size, paths_size = struct.unpack_from("<II", data)
+        pos = 8
+        header = json.loads(data[pos:pos + header_size])
+        pos += header_size
+        store = cls()
+        rows = header['rows']
+        if rows:
+            store.paths = data[pos:pos + paths_size].decode("utf-8", errors="surrogateescape").split("\0")
+        pos += paths_size
+
+        def column(typecode):
+            nonlocal pos
+            values = array(typecode)
+            size = rows * values.itemsize
+            values.frombytes(data[pos:pos + size])
+            pos += size
+            return values
+
+        store.lines, store.sizes, store.binary, store.ext_ids = column('q'), column('q'), column('B'), column('I')
+        if header['roots'] is not None:
+            store.roots = column('I')
+            store.root_names = header['roots']
+            store._root_index = {root: i for i, root in enumerate(store.root_names) if i}
+        if header['metrics']:
+            store._add_metric_columns()
+            store.metrics = (column('q'), column('q'), column('q'))
+
+        # The running totals are rebuilt from the columns
+        store.extensions = header['extensions']
+        store._ext_index = {ext: i for i, ext in enumerate(store.extensions)}
+        count = len(store.extensions)
+        store._ext_files, store._ext_lines, store._ext_sizes = (array('q', bytes(8 * count)) for _ in range(3))
+        for ext_id, lines, size in zip(store.ext_ids, store.lines, store.sizes):
+            store._ext_files[ext_id] += 1
+            store._ext_lines[ext_id] += lines
+            store._ext_sizes[ext_id] += size
+        store.total_lines = sum(store.lines)
+        store.total_size = sum(store.sizes)
+        store.binary_files = sum(store.binary)
+        if store.metrics is not None:
+            store._ext_metrics = tuple(array('q', bytes(8 * count)) for _ in METRIC_KEYS)
+            for values, ext_column in zip(store.metrics, store._ext_metrics):
+                for ext_id, value in zip(store.ext_ids, values):
+                    ext_column[ext_id] += value
+            store.metric_totals = tuple(sum(values) for values in store.metrics)
+        return store
+
+    def append(self, path, lines, size, extension, root=None):
+        """Add one file; lines is an int, a LineMetrics or "binary", root the batch root it belongs to"""
+        ext_id = self._ext_index.get(extension)
+        if ext_id is None:
+            ext_id = self._ext_index[extension] = len(self.extensions)
+            self.extensions.append(extension)
+            self._ext_files.append(0)
+            self._ext_lines.append(0)
+            self._ext_sizes.append(0)
+            if self.metrics is not None:
+                for column in self._ext_metrics:
+                    column.append(0)
+
+        if isinstance(lines, LineMetrics):
+            if self.metrics is None:
+                self._add_metric_columns()
+            values = lines[1:]
+            lines = lines.total
+        else:
+            values = (0, 0, 0)
+        if self.metrics is not None:
+            for column, ext_column, value in zip(self.metrics, self._ext_metrics, values):
+                column.append(value)
+                ext_column[ext_id] += value
+            self.metric_totals = tuple(total + value for total, value in zip(self.metric_totals, values))
+
+        if root is not None and self.roots is None:
+            self.roots = array('I', bytes(4 * len(self.paths)))
+            self.root_names.append(None)  # id 0: rows added without a root
+        if self.roots is not None:
+            root_id = self._root_index.get(root, 0)
+            if root_id == 0 and root is not None:
+                root_id = self._root_index[root] = len(self.root_names)
+                self.root_names.append(root)
+            self.roots.append(root_id)
+
+        is_binary = lines == "binary"
+        if is_binary:
+            lines = 0
+        self.paths.append(path)
+        self.lines.append(lines)
+        self.sizes.append(size)
+        self.binary.append(is_binary)
+        self.ext_ids.append(ext_id)
+
+        self._ext_files[ext_id] += 1
+        self._ext_lines[ext_id] += lines
+        self._ext_sizes[ext_id] += size
+        self.total_lines += lines
+        self.total_size += size
+        self.binary_files += is_binary
+        self._sort_lines = None
+        self.duplicate_of = None
+
+    def count(self, i):
+        """The count of row i as it was appended: an int, a LineMetrics or "binary" """
+        if self.binary[i]:
+            return "binary"
+        if self.metrics is not None:
+            return LineMetrics(self.lines[i], *(column[i] for column in self.metrics))
+        return self.lines[i]
+
+    def replace(self, i, lines, size):
+        """Update row i with a new count (int, LineMetrics or "binary") and size"""
+        ext_id = self.ext_ids[i]
+        self._account(ext_id, i, -1)
+        values = (0, 0, 0)
+        if isinstance(lines, LineMetrics):
+            if self.metrics is None:
+                self._add_metric_columns()
+            values = lines[1:]
+            lines = lines.total
+        is_binary = lines == "binary"
+        self.lines[i] = 0 if is_binary else lines
+        self.sizes[i] = size
+        self.binary[i] = is_binary
+        if self.metrics is not None:
+            for column, value in zip(self.metrics, values):
+                column[i] = value
+        self._account(ext_id, i, 1)
+
+    def remove(self, indices):
+        """Drop the given rows; the rows after them move up"""
+        drop = set(indices)
+        for i in drop:
+            self._account(self.ext_ids[i], i, -1)
+        keep = [i for i in range(len(self.paths)) if i not in drop]
+        self.paths = [self.paths[i] for i in keep]
+        self.lines, self.sizes, self.binary, self.ext_ids = (
+            array(column.typecode, map(column.__getitem__, keep))
+            for column in (self.lines, self.sizes, self.binary, self.ext_ids)
+        )
+        if self.metrics is not None:
+            self.metrics = tuple(array('q', map(column.__getitem__, keep)) for column in self.metrics)
+        if self.roots is not None:
+            self.roots = array('I', map(self.roots.__getitem__, keep))
+        self._sort_lines = None
+
+    def _account(self, ext_id, i, sign):
+        """Add (sign=1) or take away (sign=-1) row i in the totals"""
+        lines, size, is_binary = self.lines[i], self.sizes[i], self.binary[i]
+        self._ext_files[ext_id] += sign
+        self._ext_lines[ext_id] += sign * lines
+        self._ext_sizes[ext_id] += sign * size
+        self.total_lines += sign * lines
+        self.total_size += sign * size
+        self.binary_files += sign * is_binary
+        if self.metrics is not None:
+            values = [sign * column[i] for column in self.metrics]
+            for ext_column, value in zip(self._ext_metrics, values):
+                ext_column[ext_id] += value
+            self.metric_totals = tuple(total + value for total, value in zip(self.metric_totals, values))
+        self._sort_lines = None
+        self.duplicate_of = None
+
+    def mark_duplicates(self, keys):
+        """Mark each row whose key equals an earlier row's as a copy of that row.
+
+        keys holds one content fingerprint per row, None for rows that were
+        not fingerprinted (they are always unique). The first row with a key
+        is the counted copy.
+        """
+        duplicate_of = array('q', [-1]) * len(self.paths)
+        self._ext_unique_files = array('q', self._ext_files)
+        self._ext_unique_lines = array('q', self._ext_lines)
+        first = {}
+        for i, key in enumerate(keys):
+            if key is None:
+                continue
+            j = first.setdefault(key, i)
+            if j != i:
+                duplicate_of[i] = j
+                self._ext_unique_files[self.ext_ids[i]] -= 1
+                self._ext_unique_lines[self.ext_ids[i]] -= self.lines[i]
+        self.duplicate_of = duplicate_of
+        self.unique_files = sum(self._ext_unique_files)
+        self.unique_lines = sum(self._ext_unique_lines)
+
+    def duplicate_groups(self):
+        """Rows with the same content as ResultViews, the counted copy first; most repeated lines first"""
+        if self.duplicate_of is None:
+            return []
+        groups = {}
+        for i, j in enumerate(self.duplicate_of):
+            if j >= 0:
+                group = groups.get(j)
+                if group is None:
+                    group = groups[j] = array('q', [j])
+                group.append(i)
+        return sorted((ResultView(self, group) for group in groups.values()),
+                      key=lambda view: (-self.lines[view.indices[0]] * (len(view) - 1),
+                                        self.paths[view.indices[0]]))
+
+    def _add_metric_columns(self):
+        """Start the code / comment / blank columns, zero for the rows already stored"""
+        self.metrics = tuple(array('q', bytes(8 * len(self.paths))) for _ in METRIC_KEYS)
+        self._ext_metrics = tuple(array('q', bytes(8 * len(self.extensions))) for _ in METRIC_KEYS)
+        self.metric_totals = (0, 0, 0)
+
+    def totals(self):
+        """(total_files, total_lines, total_size); binary files add no lines"""
+        return len(self.paths), self.total_lines, self.total_size
+
+    def extension_stats(self):
+        """{extension: {'files', 'lines', 'size'}} in first-seen order"""
+        stats = {}
+        for i, ext in enumerate(self.extensions):
+            if not self._ext_files[i]:
+                continue  # every file of this extension was removed
+            ext_stats = stats[ext] = {'files': self._ext_files[i], 'lines': self._ext_lines[i],
+                                      'size': self._ext_sizes[i]}
+            if self.metrics is not None:
+                for key, column in zip(METRIC_KEYS, self._ext_metrics):
+                    ext_stats[key] = column[i]
+            if self.duplicate_of is not None:
+                ext_stats['unique_files'] = self._ext_unique_files[i]
+                ext_stats['unique_lines'] = self._ext_unique_lines[i]
+        return stats
+
+    def row(self, i):
+        """File dict for row i"""
+        file_info = {
+            'path': self.paths[i],
+            'lines': "binary" if self.binary[i] else self.lines[i],
+            'size': self.sizes[i],
+            'extension': self.extensions[self.ext_ids[i]]
+        }
+        if self.metrics is not None:
+            for key, column in zip(METRIC_KEYS, self.metrics):
+                file_info[key] = None if self.binary[i] else column[i]
+        if self.roots is not None:
+            file_info['root'] = self.root_names[self.roots[i]]
+        if self.duplicate_of is not None:
+            j = self.duplicate_of[i]
+            file_info['duplicate_of'] = self.paths[j] if j >= 0 else None
+        return file_info
+
+    def view(self, indices=None):
+        """A ResultView over the given rows (all rows by default)"""
+        return ResultView(self, range(len(self.paths)) if indices is None else indices)
+
+    def sorted_view(self, indices=None):
+        """Rows in export order: most lines first, then path descending, binary files last"""
+        order = sorted(range(len(self.paths)) if indices is None else indices,
+                       key=self.paths.__getitem__, reverse=True)
+        # The stable second pass keeps the path order within equal line counts
+        order.sort(key=self._sort_key().__getitem__, reverse=True)
+        return ResultView(self, array('q', order))
+
+    def _sort_key(self):
+        """Line counts with binary files as -1, built once per set of rows"""
+        if self._sort_lines is None:
+            self._sort_lines = self.lines
+            if self.binary_files:
+                self._sort_lines = array('q', (-1 if flag else lines for lines, flag in zip(self.lines, self.binary)))
+        return self._sort_lines
+
+    def group_by_extension(self):
+        """{extension: ResultView} in one pass over the extension column"""
+        groups = [array('q') for _ in self.extensions]
+        for i, ext_id in enumerate(self.ext_ids):
+            groups[ext_id].append(i)
+        return {ext: ResultView(self, groups[i]) for i, ext in enumerate(self.extensions) if groups[i]}
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.view()[i]
+        return self.row(range(len(self.paths))[i])
+
+    def __iter__(self):
+        return map(self.row, range(len(self.paths)))
+
+    def __eq__(self, other):
+        if isinstance(other, ResultStore):
+            return (self.paths == other.paths and self.lines == other.lines and self.sizes == other.sizes and
+                    self.binary == other.binary and self.metrics == other.metrics and
+                    self._root_column() == other._root_column() and
+                    [self.extensions[i] for i in self.ext_ids] == [other.extensions[i] for i in other.ext_ids])
+        if isinstance(other, (list, tuple, ResultView)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def _root_column(self):
+        return None if self.roots is None else [self.root_names[i] for i in self.roots]
+
+    def __repr__(self):
+        return f"<ResultStore {len(self.paths)} files>"
+
+
+class ResultView:
+    """An ordered selection of rows of a ResultStore; iterates file dicts"""
+
+    def __init__(self, store, indices):
+        self.store = store
+        self.indices = indices
+
+    def sorted_view(self):
+        return self.store.sorted_view(self.indices)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return ResultView(self.store, self.indices[i])
+        return self.store.row(self.indices[i])
+
+    def __iter__(self):
+        return map(self.store.row, self.indices)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, ResultView, ResultStore)):
+            return list(self) == list(other)
+        return NotImplemented
@@ -0,0 +1,475 @@
+"""
+Watch mode: keep the results of a folder current as files change.
+
+After one full analysis, a FolderWatcher listens for file system events
+and recounts only the files that were created, changed or deleted; the
+folder is not walked again. Events are coalesced per path and applied
+once the folder has been quiet for `debounce` seconds (or `max_delay`
+seconds after the first event, during a long burst such as a checkout).
+
+Events come from inotify on Linux (a small ctypes binding, one watch per
+included folder) and from a scandir/stat poll of the watched folders
+everywhere else, or when inotify is out of watches. An inotify queue
+overflow, or a changed .gitignore when ignore files are honored, triggers
+a resync: one walk that compares sizes and mtimes and still recounts
+only what changed. Running out of inotify watches while watching falls
+back to polling the same way; any other error ends the watch and is
+reported to on_change as a WatchChanges with its error set.
+
+The watcher thread never touches the displayed results; it hands
+WatchChanges to on_change, and the owner applies them with LiveResults
+on its own thread (the GUI's event loop), which edits the ResultStore in
+place.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import stat
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from line_counter_core import (
+    MMAP_THRESHOLD, CountingEngine, FileEntry, FileFilter, analyze_folder, file_suffix, scan_files
+)
+from line_counter_ignore import IGNORE_FILE, IgnoreMatcher
+
+# Quiet time before a burst of events is applied, and the longest an event waits
+DEBOUNCE_SECONDS = 0.15
+MAX_DELAY_SECONDS = 0.5
+
+# How often the polling backend re-stats the watched folders
+POLL_INTERVAL = 1.0
+
+# A batch of updates: updated is a ResultStore of the recounted files
+# (paths relative to the watched folder), removed the paths that are gone.
+# The last batch of a watch that failed carries the error instead.
+WatchChanges = namedtuple('WatchChanges', ['updated', 'removed', 'error'], defaults=(None,))
+
+# inotify_add_watch / inotify_init1 errors meaning the per-user limits are reached
+_WATCH_LIMIT_ERRORS = (errno.ENOSPC, errno.EMFILE)
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyBackend:
+    """inotify through ctypes; read() returns (path, is_dir) events, (None, True) on overflow"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.paths = {}  # watch descriptor -> folder
+        self.watches = {}  # folder -> watch descriptor
+
+    def add(self, dir_path):
+        wd = self._add_watch(self.fd, os.fsencode(dir_path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), dir_path)
+        self.paths[wd] = dir_path
+        self.watches[dir_path] = wd
+
+    def remove(self, dir_path):
+        """Stop watching dir_path and every folder below it"""
+        prefix = os.path.join(dir_path, "")
+        for path in [p for p in self.watches if p == dir_path or p.startswith(prefix)]:
+            wd = self.watches.pop(path)
+            self.paths.pop(wd, None)
+            self._rm_watch(self.fd, wd)
+
+    def read(self, timeout):
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, pos)
+            name = data[pos + _EVENT_HEADER.size:pos + _EVENT_HEADER.size + length].rstrip(b'\0')
+            pos += _EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                events.append((None, True))
+                continue
+            if mask & IN_IGNORED:
+                path = self.paths.pop(wd, None)
+                if path is not None and self.watches.get(path) == wd:
+                    del self.watches[path]
+                continue
+            dir_path = self.paths.get(wd)
+            if dir_path is None:
+                continue
+            if not name:
+                events.append((dir_path, True))  # the folder itself was deleted or moved
+                continue
+            events.append((os.path.join(dir_path, os.fsdecode(name)), bool(mask & IN_ISDIR)))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingBackend:
+    """Re-stats the watched folders every `interval` seconds and reports what differs"""
+
+    def __init__(self, file_filter, interval=POLL_INTERVAL):
+        self.file_filter = file_filter
+        self.interval = interval
+        self.snapshots = {}  # folder -> {name: (is_dir, size, mtime_ns)}
+        self.next_poll = time.monotonic() + interval
+
+    def _snapshot(self, dir_path):
+        snapshot = {}
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        snapshot[entry.name] = (True, 0, 0)
+                    elif self.file_filter.include_file(entry.name):
+                        st = entry.stat()
+                        snapshot[entry.name] = (False, st.st_size, st.st_mtime_ns)
+                except OSError:
+                    continue
+        return snapshot
+
+    def add(self, dir_path):
+        self.snapshots[dir_path] = self._snapshot(dir_path)
+
+    def remove(self, dir_path):
+        prefix = os.path.join(dir_path, "")
+        for path in [p for p in self.snapshots if p == dir_path or p.startswith(prefix)]:
+            del self.snapshots[path]
+
+    def read(self, timeout):
+        wait = self.next_poll - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            return []
+        self.next_poll = time.monotonic() + self.interval
+
+        events = []
+        for dir_path, old in list(self.snapshots.items()):
+            try:
+                new = self._snapshot(dir_path)
+            except OSError:
+                del self.snapshots[dir_path]
+                events.append((dir_path, True))
+                continue
+            self.snapshots[dir_path] = new
+            for name in old.keys() | new.keys():
+                if old.get(name) != new.get(name):
+                    events.append((os.path.join(dir_path, name), (new.get(name) or old[name])[0]))
+        return events
+
+    def close(self):
+        self.snapshots.clear()
+
+
+def make_backend(file_filter):
+    """inotify where available, polling otherwise"""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyBackend()
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable, polling for changes instead: {e}")
+    return PollingBackend(file_filter)
+
+
+class LiveResults:
+    """A ResultStore kept current by applying WatchChanges (on the thread that owns the store)"""
+
+    def __init__(self, file_results):
+        self.file_results = file_results
+        self.rows = {path: i for i, path in enumerate(file_results.paths)}
+
+    def apply(self, changes):
+        """Apply one batch of changes and return the new extension_stats"""
+        store = self.file_results
+        if changes.error is not None:
+            return store.extension_stats()
+        removed = [self.rows.pop(path) for path in changes.removed if path in self.rows]
+        if removed:
+            store.remove(removed)
+            self.rows = {path: i for i, path in enumerate(store.paths)}
+
+        updated = changes.updated
+        for i, path in enumerate(updated.paths):
+            lines = updated.count(i)
+            row = self.rows.get(path)
+            if row is None:
+                self.rows[path] = len(store)
+                store.append(path, lines, updated.sizes[i], updated.extensions[updated.ext_ids[i]])
+            else:
+                store.replace(row, lines, updated.sizes[i])
+        return store.extension_stats()
+
+
+class FolderWatcher:
+    """Recounts the changed files of one folder in the background.
+
+    analyze() runs the initial full analysis (recording each file's size
+    and mtime), start() begins watching and stop() ends it. on_change is
+    called from the watcher thread with a WatchChanges per applied batch;
+    if watching fails, a last WatchChanges carries the error and the
+    thread ends.
+    """
+
+    def __init__(self, folder_path, include_exts, exclude_patterns, exclude_folders, method="all", on_change=None,
+                 workers=None, mmap_threshold=MMAP_THRESHOLD, gitignore=False, backend=None,
+                 debounce=DEBOUNCE_SECONDS, max_delay=MAX_DELAY_SECONDS):
+        self.folder = os.path.abspath(os.fspath(folder_path))
+        self.file_filter = FileFilter(include_exts, exclude_patterns, exclude_folders)
+        self.method = method
+        self.on_change = on_change
+        self.workers = workers
+        self.mmap_threshold = mmap_threshold
+        self.gitignore = gitignore
+        self.backend = backend
+        self.debounce = debounce
+        self.max_delay = max_delay
+        # rel_path -> (size, mtime_ns) of every counted file
+        self.known = {}
+        # folder path -> IgnoreMatcher with the folder's own .gitignore, kept by the walk of the watched folders
+        self.matchers = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def analyze(self, cache=None, force_rescan=False, progress=None, token=None, stats=None):
+        """The initial full analysis; returns (file_results, extension_stats) like analyze_folder"""
+        return analyze_folder(self.folder, [], [], [], self.method, workers=self.workers, cache=cache,
+                              force_rescan=force_rescan, mmap_threshold=self.mmap_threshold, progress=progress,
+                              token=token, stats=stats, scanner=self._scan)
+
+    def _scan(self, folder_path, file_filter, token):
+        """The walk of the initial analysis (with this watcher's filter), remembering what it found"""
+        for entry in scan_files(folder_path, self.file_filter, token=token, gitignore=self.gitignore):
+            self.known[entry.rel_path] = (entry.size, entry.mtime_ns)
+            yield entry
+
+    def start(self):
+        if self.backend is None:
+            self.backend = make_backend(self.file_filter)
+        try:
+            self._watch_tree(self.folder)
+        except OSError as e:
+            # Typically inotify's per-user watch limit
+            self._use_polling(e)
+            self._watch_tree(self.folder)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.backend is not None:
+            self.backend.close()
+            self.backend = None
+
+    def _use_polling(self, error):
+        """Replace the backend by a PollingBackend (the new one watches nothing yet)"""
+        print(f"Cannot watch {self.folder} with {type(self.backend).__name__}, polling instead: {error}")
+        self.backend.close()
+        self.backend = PollingBackend(self.file_filter, POLL_INTERVAL)
+
+    def _walk_dirs(self, dir_path):
+        """dir_path and every included folder below it, pruned like the walk"""
+        stack = [(dir_path, self._folder_matcher(dir_path))]
+        while stack:
+            path, ignore = stack.pop()
+            try:
+                with os.scandir(path) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            yield path
+            if ignore is not None:
+                if any(entry.name == IGNORE_FILE for entry in entries):
+                    ignore = ignore.with_file(os.path.join(path, IGNORE_FILE))
+                self.matchers[path] = ignore
+            for entry in entries:
+                try:
+                    if not entry.is_dir(follow_symlinks=False) or not self.file_filter.include_folder(entry.name):
+                        continue
+                except OSError:
+                    continue
+                if ignore is None or not ignore.ignored(entry.name, True):
+                    stack.append((entry.path, ignore.child(entry.name) if ignore is not None else None))
+
+    def _watch_tree(self, dir_path):
+        for path in self._walk_dirs(dir_path):
+            self.backend.add(path)
+
+    def _folder_matcher(self, dir_path):
+        """The IgnoreMatcher of a watched folder before its own .gitignore (None unless ignore files are honored)"""
+        if not self.gitignore:
+            return None
+        if dir_path == self.folder:
+            return IgnoreMatcher.for_folder(dir_path)
+        return self._matcher(os.path.dirname(dir_path)).child(os.path.basename(dir_path))
+
+    def _matcher(self, dir_path):
+        """The IgnoreMatcher of a watched folder: the one the walk kept, or one built down from its parent's"""
+        matcher = self.matchers.get(dir_path)
+        if matcher is None:
+            matcher = self._folder_matcher(dir_path).with_file(os.path.join(dir_path, IGNORE_FILE))
+        return matcher
+
+    def _ignored(self, path, is_dir):
+        """True if .gitignore rules exclude path (only when ignore files are honored)"""
+        if not self.gitignore:
+            return False
+        return self._matcher(os.path.dirname(path)).ignored(os.path.basename(path), is_dir)
+
+    def _run(self):
+        pending = set()
+        rescan = False
+        first = last = None
+        try:
+            while not self._stop.is_set():
+                for path, _ in self.backend.read(self.debounce if pending or rescan else 0.5):
+                    if path is None or (self.gitignore and os.path.basename(path) == IGNORE_FILE):
+                        rescan = True
+                    else:
+                        pending.add(path)
+                    last = time.monotonic()
+                    first = first or last
+                if first is None:
+                    continue
+                now = time.monotonic()
+                if now - last >= self.debounce or now - first >= self.max_delay:
+                    self._process(pending, rescan)
+                    pending = set()
+                    rescan = False
+                    first = last = None
+        except Exception as e:
+            # The watch cannot go on; tell the owner instead of dying silently
+            print(f"Stopped watching {self.folder}: {e}")
+            if self.on_change is not None:
+                self.on_change(WatchChanges(None, [], e))
+
+    def _process(self, pending, rescan):
+        """Apply one debounced batch; out of inotify watches, poll instead and resync"""
+        try:
+            if rescan:
+                self.resync()
+            else:
+                self._apply(pending)
+        except OSError as e:
+            if e.errno not in _WATCH_LIMIT_ERRORS or isinstance(self.backend, PollingBackend):
+                raise
+            # known is only updated once a batch is published, so the resync sees whatever was lost
+            self._use_polling(e)
+            self.resync()
+
+    def resync(self):
+        """Walk the whole folder once and apply whatever differs from the known files"""
+        self.backend.remove(self.folder)
+        self.matchers = {}
+        self._watch_tree(self.folder)
+        current = {entry.rel_path: entry for entry in scan_files(self.folder, self.file_filter,
+                                                                  gitignore=self.gitignore)}
+        removed = [rel for rel in self.known if rel not in current]
+        changed = [entry for rel, entry in current.items() if self.known.get(rel) != (entry.size, entry.mtime_ns)]
+        self._publish(changed, removed)
+
+    def _apply(self, paths):
+        """Recount / drop the given changed paths"""
+        changed = []
+        removed = []
+
+        def forget(rel, is_dir):
+            if rel in self.known:
+                removed.append(rel)
+            if is_dir:
+                prefix = os.path.join(rel, "")
+                removed.extend(p for p in self.known if p.startswith(prefix))
+
+        for path in sorted(paths):
+            rel = os.path.relpath(path, self.folder)
+            if rel == os.curdir or rel == os.pardir or rel.startswith(os.pardir + os.sep):
+                continue
+            parent = os.path.dirname(rel)
+            if parent and not all(self.file_filter.include_folder(part) for part in parent.split(os.sep)):
+                continue  # inside an excluded folder
+            name = os.path.basename(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                st = None
+
+            if st is not None and stat.S_ISDIR(st.st_mode):
+                if (os.path.islink(path) or not self.file_filter.include_folder(name)
+                        or self._ignored(path, True)):
+                    forget(rel, True)
+                    continue
+                # A new or moved-in folder: watch it, then count what it holds
+                if rel in self.known:
+                    forget(rel, False)
+                self.backend.remove(path)
+                self._watch_tree(path)
+                found = set()
+                for entry in scan_files(path, self.file_filter, gitignore=self._folder_matcher(path) or False):
+                    entry = entry._replace(rel_path=os.path.join(rel, entry.rel_path))
+                    found.add(entry.rel_path)
+                    if self.known.get(entry.rel_path) != (entry.size, entry.mtime_ns):
+                        changed.append(entry)
+                prefix = os.path.join(rel, "")
+                removed.extend(p for p in self.known if p.startswith(prefix) and p not in found)
+            elif (st is not None and stat.S_ISREG(st.st_mode) and self.file_filter.include_file(name)
+                  and not self._ignored(path, False)):
+                if self.known.get(rel) != (st.st_size, st.st_mtime_ns):
+                    changed.append(FileEntry(path, rel, file_suffix(name).lower(), st.st_size, st.st_mtime_ns))
+            else:
+                if st is None:
+                    self.backend.remove(path)
+                forget(rel, st is None)
+        self._publish(changed, removed)
+
+    def _publish(self, changed, removed):
+        """Count the changed entries, update the known files and hand the batch to on_change"""
+        if not changed and not removed:
+            return
+        engine = CountingEngine(self.method, workers=self.workers, mmap_threshold=self.mmap_threshold)
+        updated, _ = engine.count_entries(self.folder, changed)
+        removed = list(dict.fromkeys(removed))
+        for rel in removed:
+            del self.known[rel]
+        for entry in changed:
+            self.known[entry.rel_path] = (entry.size, entry.mtime_ns)
+        if self.on_change is not None:
+            self.on_change(WatchChanges(updated, removed))
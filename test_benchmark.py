@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test the synthetic tree generator and the benchmark report
+"""
+
+import os
+import tempfile
+
+from bench_line_counter import STAGES, benchmark, generate_tree
+from line_counter_core import DEFAULT_EXCLUDE_FOLDERS, split_list
+
+
+def tree_listing(root):
+    """(relative path, size) for every file under root"""
+    return sorted(
+        (os.path.relpath(os.path.join(dirpath, name), root), os.path.getsize(os.path.join(dirpath, name)))
+        for dirpath, _, filenames in os.walk(root) for name in filenames
+    )
+
+
+def test_generator_is_reproducible():
+    """The same seed gives the same tree, a different seed a different one"""
+    print("Testing the synthetic tree generator...")
+    with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b, \
+            tempfile.TemporaryDirectory() as c:
+        info = generate_tree(a, files=300, depth=3, binary_ratio=0.2, excluded_ratio=0.3, seed=1)
+        generate_tree(b, files=300, depth=3, binary_ratio=0.2, excluded_ratio=0.3, seed=1)
+        generate_tree(c, files=300, depth=3, binary_ratio=0.2, excluded_ratio=0.3, seed=2)
+
+        listing = tree_listing(a)
+        assert listing == tree_listing(b)
+        assert listing != tree_listing(c)
+        assert len(listing) == 300 and sum(size for _, size in listing) == info['bytes']
+
+        excluded_names = set(split_list(DEFAULT_EXCLUDE_FOLDERS))
+        excluded = [p for p, _ in listing if excluded_names.intersection(p.split(os.sep))]
+        binary = [p for p, _ in listing if p.endswith(".bin")]
+        assert 40 < len(excluded) < 140, len(excluded)
+        assert 30 < len(binary) < 100, len(binary)
+        assert max(p.count(os.sep) for p, _ in listing if p not in excluded) <= 3
+        print(f"✓ {len(listing)} files, {len(excluded)} in excluded folders, {len(binary)} binary")
+
+
+def test_benchmark_report():
+    """Every method gets a timing for every stage"""
+    print("\nTesting the benchmark report...")
+    with tempfile.TemporaryDirectory() as root:
+        generate_tree(root, files=200, excluded_ratio=0.5, seed=3)
+        results = benchmark(root, methods=("all", "code_only"), workers=1, repeat=1)
+
+    assert set(results) == {"all", "code_only"}
+    for method, stages in results.items():
+        assert tuple(stages) == STAGES
+        assert all(stage['seconds'] >= 0 for stage in stages.values())
+        # Excluded folders are filtered out before counting
+        assert stages['count']['files'] < stages['walk']['files'] == 200
+    print(f"✓ {len(STAGES)} stages timed for {len(results)} methods")
+
+
+if __name__ == "__main__":
+    print("Testing Benchmark Harness")
+    print("=" * 40)
+    test_generator_is_reproducible()
+    test_benchmark_report()
+    print("\nTest complete!")
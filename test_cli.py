@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Test the headless command line entry point
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import line_counter_cli
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_project(root):
+    """Create a tiny project with an excluded folder and an excluded file type"""
+    root = Path(root)
+    (root / "src").mkdir()
+    (root / "node_modules").mkdir()
+    (root / "src" / "main.py").write_text("import os\n\n# comment\nprint(os.name)\n", encoding="utf-8")
+    (root / "src" / "app.js").write_text("// header\nlet x = 1;\n", encoding="utf-8")
+    (root / "notes.md").write_text("# Notes\n", encoding="utf-8")
+    (root / "node_modules" / "dep.js").write_text("module.exports = 1;\n", encoding="utf-8")
+
+
+def run_json(folder, *extra):
+    """Run the CLI with JSON output and return the parsed document"""
+    with tempfile.TemporaryDirectory() as out_dir:
+        out_file = os.path.join(out_dir, "out.json")
+        assert line_counter_cli.main([folder, "--format", "json", "-o", out_file, "--workers", "1", *extra]) == 0
+        with open(out_file, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def test_json_output():
+    """Default filters skip node_modules and *.md"""
+    print("Testing CLI JSON output...")
+    with tempfile.TemporaryDirectory() as tmp:
+        make_project(tmp)
+
+        data = run_json(tmp)
+        paths = sorted(f['path'].replace(os.sep, "/") for f in data['files'])
+        assert paths == ["src/app.js", "src/main.py"], paths
+        assert data['analysis_summary']['total_lines'] == 6
+
+        data = run_json(tmp, "--method", "code_only")
+        assert data['analysis_summary']['total_lines'] == 3
+        assert data['analysis_summary']['count_method'] == "code_only"
+        print("✓ JSON output correct")
+
+
+def test_special_patterns():
+    """.** keeps exclude patterns, .* ignores them"""
+    print("\nTesting CLI special patterns...")
+    with tempfile.TemporaryDirectory() as tmp:
+        make_project(tmp)
+
+        data = run_json(tmp, "--include", ".**")
+        assert data['analysis_summary']['total_files'] == 2
+
+        data = run_json(tmp, "--include", ".*")
+        assert data['analysis_summary']['total_files'] == 3
+        print("✓ Special patterns honored")
+
+
+def test_batch_manifest():
+    """A manifest (plus folders on the command line) is analyzed as one batch"""
+    print("\nTesting CLI batch mode...")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("one", "two"):
+            os.mkdir(os.path.join(tmp, name))
+            make_project(os.path.join(tmp, name))
+        manifest = os.path.join(tmp, "roots.txt")
+        with open(manifest, "w", encoding="utf-8") as f:
+            f.write("# services\none\n\n")
+
+        data = run_json(os.path.join(tmp, "two"), "--manifest", manifest)
+        roots = data['analysis_summary']['analyzed_folder']
+        assert len(roots) == 2 and data['analysis_summary']['total_lines'] == 12
+        assert [entry['total_lines'] for entry in data['root_summary']] == [6, 6]
+        assert {entry['root'] for entry in data['files']} == set(roots)
+        print("✓ Batch totals per root and combined")
+
+
+def test_diff_against():
+    """--diff-against compares with a JSON export or the last cached snapshot"""
+    print("\nTesting CLI snapshot diff...")
+    with tempfile.TemporaryDirectory() as tmp:
+        project = os.path.join(tmp, "project")
+        os.mkdir(project)
+        make_project(project)
+        cache_file = os.path.join(tmp, "cache.sqlite")
+        baseline = os.path.join(tmp, "baseline.json")
+        assert line_counter_cli.main([project, "--format", "json", "-o", baseline, "--workers", "1",
+                                      "--cache-file", cache_file, "--keep-history"]) == 0
+
+        (Path(project) / "src" / "main.py").write_text("print(1)\n" * 10, encoding="utf-8")
+        os.remove(os.path.join(project, "src", "app.js"))
+        for options in (["--diff-against", "cache", "--cache-file", cache_file], ["--diff-against", baseline]):
+            data = run_json(project, *options)
+            assert data['diff_summary']['lines_delta'] == 4, options
+            assert [(entry['status'], entry['lines_delta']) for entry in data['files']] == [
+                ("changed", 6), ("removed", -2)]
+        # Only runs with --keep-history save a snapshot, so the next one compares with it
+        data = run_json(project, "--diff-against", "cache", "--cache-file", cache_file, "--keep-history")
+        assert data['diff_summary']['lines_delta'] == 4
+        data = run_json(project, "--diff-against", "cache", "--cache-file", cache_file)
+        assert data['files'] == [] and data['diff_summary']['files_unchanged'] == 1
+        try:
+            line_counter_cli.main([project, "--keep-history"])
+        except SystemExit as e:
+            assert e.code == 2
+        else:
+            raise AssertionError("--keep-history without --cache accepted")
+
+        # A baseline counted another way, or a batch baseline for one folder, is a usage error
+        batch_baseline = os.path.join(tmp, "batch.json")
+        assert line_counter_cli.main([project, project, "--format", "json", "-o", batch_baseline,
+                                      "--workers", "1"]) == 0
+        for options in (["--diff-against", baseline, "--method", "code_only"],
+                        ["--diff-against", batch_baseline]):
+            try:
+                line_counter_cli.main([project, *options])
+            except SystemExit as e:
+                assert e.code == 2
+            else:
+                raise AssertionError(f"{options} accepted")
+        data = run_json(project, "--diff-against", baseline, "--method", "metrics")
+        assert data['diff_summary']['lines_delta'] == 4
+        print("✓ Changes since the baseline exported")
+
+
+def test_dedup():
+    """--dedup adds unique totals that count a copied file once"""
+    print("\nTesting CLI duplicate detection...")
+    with tempfile.TemporaryDirectory() as tmp:
+        make_project(tmp)
+        (Path(tmp) / "vendor").mkdir()
+        (Path(tmp) / "vendor" / "main.py").write_bytes((Path(tmp) / "src" / "main.py").read_bytes())
+
+        data = run_json(tmp, "--dedup")
+        summary = data['analysis_summary']
+        assert (summary['total_lines'], summary['unique_lines'], summary['duplicate_groups']) == (10, 6, 1)
+        assert [entry['duplicate_of'] for entry in data['files']].count(None) == 2
+        try:
+            line_counter_cli.main([tmp, "--watch", "--dedup"])
+        except SystemExit as e:
+            assert e.code == 2
+        else:
+            raise AssertionError("--watch with --dedup accepted")
+        print("✓ Unique totals exported")
+
+
+def test_no_tkinter_import():
+    """Importing the CLI must not pull in tkinter"""
+    print("\nTesting that the CLI does not import tkinter...")
+    code = "import sys, line_counter_cli; print('tkinter' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "False"
+    print("✓ tkinter not imported")
+
+
+if __name__ == "__main__":
+    print("Testing Command Line Interface")
+    print("=" * 40)
+    test_json_output()
+    test_special_patterns()
+    test_batch_manifest()
+    test_diff_against()
+    test_dedup()
+    test_no_tkinter_import()
+    print("\nTest complete!")
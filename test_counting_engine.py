@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Test the parallel counting engine against the serial path
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+import line_counter_core
+from line_counter_core import (
+    CancelToken, CountingEngine, MIN_PARALLEL_FILES, ProgressTracker, RunStats, analyze_folder, analyze_roots,
+    format_progress, format_stats
+)
+from line_counter_export import generate_csv_data, generate_json_data
+
+
+def make_tree(root, file_count):
+    """Create a small tree of text and binary files"""
+    paths = []
+    for i in range(file_count):
+        sub = Path(root) / f"pkg{i % 7}"
+        sub.mkdir(exist_ok=True)
+        if i % 10 == 0:
+            path = sub / f"blob{i}.bin"
+            path.write_bytes(b"\x00\x01\x02" * (i + 1))
+        else:
+            path = sub / f"mod{i}.py"
+            path.write_text("# comment\n\nx = 1\n" * (i % 5 + 1) + "y = 2", encoding="utf-8")
+        paths.append(path)
+    return sorted(paths)
+
+
+def test_parallel_matches_serial():
+    """Process and thread pools must give the same results, in the same order, as one worker"""
+    print("Testing parallel engine against serial engine...")
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_tree(tmp, MIN_PARALLEL_FILES + 50)
+
+        for method in ("all", "non_empty", "code_only"):
+            serial = CountingEngine(method, workers=1).count(tmp, paths)
+            threaded = CountingEngine(method, workers=4, use_processes=False, batch_size=16).count(tmp, paths)
+            processes = CountingEngine(method, workers=4, batch_size=16).count(tmp, paths)
+
+            assert serial == threaded, f"thread pool differs for {method}"
+            assert serial == processes, f"process pool differs for {method}"
+            assert [f['path'] for f in serial[0]] == [str(p.relative_to(tmp)) for p in paths]
+            print(f"✓ {method}: {len(serial[0])} files, {sum(s['lines'] for s in serial[1].values())} lines")
+
+
+def test_extension_stats():
+    """Binary files are listed but do not add lines"""
+    print("\nTesting extension stats...")
+    with tempfile.TemporaryDirectory() as tmp:
+        text = Path(tmp) / "a.py"
+        text.write_text("a\nb\n\nc", encoding="utf-8")
+        blob = Path(tmp) / "b.bin"
+        blob.write_bytes(b"\x00" * 10)
+
+        file_results, extension_stats = CountingEngine("all", workers=1).count(tmp, [text, blob])
+
+        assert file_results[0] == {'path': 'a.py', 'lines': 4, 'size': os.path.getsize(text), 'extension': '.py'}
+        assert file_results[1]['lines'] == "binary"
+        assert extension_stats['.bin'] == {'files': 1, 'lines': 0, 'size': 10}
+        print("✓ Extension stats correct")
+
+
+def test_progress_reporting():
+    """Progress ends with every file and byte accounted for"""
+    print("\nTesting progress reporting...")
+    snapshots = []
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_tree(tmp, MIN_PARALLEL_FILES + 10)
+        progress = ProgressTracker(snapshots.append, interval=0)
+        file_results, _ = CountingEngine("all", workers=2, use_processes=False, batch_size=16,
+                                         progress=progress).count(tmp, paths)
+        progress.finish()
+
+    final = snapshots[-1]
+    total_size = sum(f['size'] for f in file_results)
+    assert final.stage == "done"
+    assert final.files_done == final.files_found == len(file_results)
+    assert final.bytes_done == final.bytes_found == total_size
+    done = [s.files_done for s in snapshots]
+    assert done == sorted(done)
+    assert "files/s" in format_progress(final)
+    print(f"✓ {len(snapshots)} snapshots, final: {format_progress(final)}")
+
+
+def test_cancel_returns_partial_results():
+    """Cancelling mid-run keeps the files counted so far and drops the rest"""
+    print("\nTesting cancellation...")
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_tree(tmp, MIN_PARALLEL_FILES * 2)
+        expected = {f['path']: f for f in CountingEngine("all", workers=1).count(tmp, paths)[0]}
+
+        for use_processes in (True, False):
+            token = CancelToken()
+            snapshots = []
+
+            def cancel_after_first_batch(snapshot):
+                snapshots.append(snapshot)
+                if snapshot.files_done:
+                    token.cancel()
+
+            progress = ProgressTracker(cancel_after_first_batch, interval=0)
+            file_results, _ = CountingEngine("all", workers=2, use_processes=use_processes, batch_size=16,
+                                             progress=progress, token=token).count(tmp, paths)
+
+            assert 0 < len(file_results) < len(paths), len(file_results)
+            assert all(expected[f['path']] == f for f in file_results)
+            print(f"✓ processes={use_processes}: {len(file_results)} of {len(paths)} files before cancel")
+
+        # Cancelled before the walk: nothing is found or counted
+        token = CancelToken()
+        token.cancel()
+        assert analyze_folder(tmp, [".*"], [], [], token=token) == ([], {})
+        print("✓ Cancelled walk stops immediately")
+
+
+def test_pause_and_resume():
+    """A paused run makes no progress until it is resumed"""
+    print("\nTesting pause and resume...")
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_tree(tmp, 50)
+        token = CancelToken()
+        token.pause()
+        progress = ProgressTracker()
+        results = []
+        thread = threading.Thread(target=lambda: results.append(
+            analyze_folder(tmp, [".*"], [], [], workers=1, progress=progress, token=token)))
+        thread.start()
+
+        time.sleep(0.3)
+        assert thread.is_alive() and progress.files_found == 0
+        token.resume()
+        thread.join(10)
+
+        assert not thread.is_alive()
+        assert len(results[0][0]) == len(paths)
+        assert progress.stage == "done"
+        print("✓ Paused run resumed and completed")
+
+
+def test_run_statistics():
+    """Instrumented runs give the same results plus per-stage timings"""
+    print("\nTesting run statistics...")
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_tree(tmp, MIN_PARALLEL_FILES + 20)
+        plain = analyze_folder(tmp, [".*"], [], [], workers=1)
+
+        for workers in (1, 3):
+            stats = RunStats(slowest=5)
+            results = analyze_folder(tmp, [".*"], [], [], workers=workers, stats=stats)
+            assert results == plain
+
+            stages = stats.as_dict()['stages']
+            assert {"walk", "binary_sniff", "read_count", "count_wall", "aggregate"} <= set(stages)
+            assert stages['read_count']['calls'] == stages['walk']['calls'] == len(paths)
+            assert stages['read_count']['bytes'] == sum(p.stat().st_size for p in paths)
+            # Only the .bin files have unknown extensions and get sniffed
+            assert stages['binary_sniff']['calls'] == sum(1 for p in paths if p.suffix == ".bin")
+
+            slowest = stats.as_dict()['slowest_files']
+            assert len(slowest) == 5
+            assert [f['seconds'] for f in slowest] == sorted((f['seconds'] for f in slowest), reverse=True)
+            assert "Slowest 5 files" in format_stats(stats)
+
+        exported = json.loads(generate_json_data(*results, tmp, "all", run_stats=stats))
+        assert exported['analysis_summary']['run_statistics']['stages']['walk']['calls'] == len(paths)
+        assert 'run_statistics' not in json.loads(generate_json_data(*results, tmp, "all"))['analysis_summary']
+        print(f"✓ {len(stages)} stages recorded")
+
+
+def test_metrics_single_pass():
+    """One "metrics" run opens each file once and agrees with the three single-method runs"""
+    print("\nTesting multi-metric counting...")
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_tree(tmp, 40)
+        single = {method: CountingEngine(method, workers=1).count(tmp, paths)[0]
+                  for method in ("all", "non_empty", "code_only")}
+
+        opened = []
+        real_count = line_counter_core.count_file_lines
+
+        def tracking_count(path, method, *args):
+            opened.append(path)
+            return real_count(path, method, *args)
+
+        with mock.patch.object(line_counter_core, "count_file_lines", tracking_count):
+            file_results, extension_stats = CountingEngine("metrics", workers=1).count(tmp, paths)
+        assert len(opened) == len(paths)
+        assert file_results == CountingEngine("metrics", workers=4, batch_size=8).count(tmp, paths)[0]
+
+        for i, file_info in enumerate(file_results):
+            assert file_info['lines'] == single["all"][i]['lines']
+            if file_info['lines'] == "binary":
+                assert file_info['code'] is None
+                continue
+            assert file_info['code'] == single["code_only"][i]['lines']
+            assert file_info['lines'] - file_info['blank'] == single["non_empty"][i]['lines']
+            assert file_info['code'] + file_info['comment'] + file_info['blank'] == file_info['lines']
+
+        py = extension_stats['.py']
+        assert py['code'] + py['comment'] + py['blank'] == py['lines']
+        assert extension_stats['.bin']['code'] == 0
+
+        exported = json.loads(generate_json_data(file_results, extension_stats, tmp, "metrics"))
+        summary = exported['analysis_summary']
+        assert summary['total_code_lines'] == py['code'] and summary['total_blank_lines'] == py['blank']
+        assert {'code_lines', 'comment_lines', 'blank_lines'} <= set(exported['files'][0])
+        csv_data = generate_csv_data(file_results, extension_stats)
+        assert csv_data.splitlines()[0].endswith("Code Lines,Comment Lines,Blank Lines")
+        assert "Total Comment Lines" in csv_data
+        print(f"✓ {len(paths)} files read once: {py['code']} code, {py['comment']} comment, {py['blank']} blank")
+
+
+def test_batch_roots():
+    """Several roots share one engine run and keep per-root and combined totals"""
+    print("\nTesting batch analysis...")
+    with tempfile.TemporaryDirectory() as tmp:
+        roots = []
+        for r, count in enumerate((30, 45, 12)):
+            root = os.path.join(tmp, f"service{r}")
+            os.mkdir(root)
+            make_tree(root, count)
+            roots.append(root)
+
+        runs = []
+        real_count_paths = CountingEngine._count_paths
+
+        def count_paths(engine, paths, sizes, *args):
+            runs.append(len(paths))
+            return real_count_paths(engine, paths, sizes, *args)
+
+        with mock.patch.object(CountingEngine, "_count_paths", count_paths):
+            file_results, extension_stats, root_stats = analyze_roots(roots + [roots[0]], [".py", ".bin"], [], [],
+                                                                      "metrics", workers=2)
+        assert runs == [len(file_results)], "one pool run for the whole batch"
+        assert list(root_stats) == roots
+
+        for root in roots:
+            single_results, single_stats = analyze_folder(root, [".py", ".bin"], [], [], "metrics", workers=1)
+            assert root_stats[root] == single_stats
+            rows = [{k: v for k, v in info.items() if k != 'root'} for info in file_results if info['root'] == root]
+            assert rows == list(single_results)
+        for ext, stats in extension_stats.items():
+            assert stats['lines'] == sum(per_root[ext]['lines'] for per_root in root_stats.values() if ext in per_root)
+
+        exported = json.loads(generate_json_data(file_results, extension_stats, roots, "metrics",
+                                                 root_stats=root_stats))
+        assert all(entry['root'] in roots for entry in exported['files'])
+        assert [entry['root'] for entry in exported['root_summary']] == roots
+        total_lines = exported['analysis_summary']['total_lines']
+        assert sum(entry['total_lines'] for entry in exported['root_summary']) == total_lines
+        csv_data = generate_csv_data(file_results, extension_stats, root_stats=root_stats)
+        assert csv_data.splitlines()[0].endswith(",Root") and "=== BY ROOT ===" in csv_data
+        print(f"✓ {len(roots)} roots, {len(file_results)} files counted in one run")
+
+
+if __name__ == "__main__":
+    print("Testing Counting Engine")
+    print("=" * 40)
+    test_parallel_matches_serial()
+    test_extension_stats()
+    test_progress_reporting()
+    test_cancel_returns_partial_results()
+    test_pause_and_resume()
+    test_run_statistics()
+    test_metrics_single_pass()
+    test_batch_roots()
+    print("\nTest complete!")
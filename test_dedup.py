@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Test finding identical files: size buckets, content hashes and unique totals
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from unittest import mock
+
+import line_counter_core
+from line_counter_cache import ResultCache
+from line_counter_core import CountingEngine, analyze_folder, analyze_roots, unique_totals
+from line_counter_export import generate_csv_data, generate_json_data
+from line_counter_git import analyze_repository
+
+ORIGINAL = "def main():\n    return 1\n\n# end\n"
+FILES = {
+    "src/main.py": ORIGINAL,
+    "vendor/a/main.py": ORIGINAL,
+    "vendor/b/main.py": ORIGINAL,
+    "copy.txt": ORIGINAL,                    # same content, other extension; walked first
+    "src/same_size.py": ORIGINAL.upper(),    # same size, other content
+    "src/unique.py": "x = 1\n" * 9,          # a size nobody else has
+    "src/empty.py": "",
+    "src/empty2.py": "",
+}
+FILTERS = ([".py", ".txt"], [], [])
+
+
+def make_tree(root):
+    for rel, text in FILES.items():
+        path = os.path.join(root, *rel.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+
+
+def tracking(opened):
+    """count_file_lines that records (file name, whether it was hashed)"""
+    real_count = line_counter_core.count_file_lines
+
+    def count(path, method, *args):
+        hasher = args[3] if len(args) > 3 else None
+        opened.append((os.path.relpath(path).replace(os.sep, "/"), hasher is not None))
+        return real_count(path, method, *args)
+
+    return mock.patch.object(line_counter_core, "count_file_lines", count)
+
+
+def test_unique_totals():
+    """Copies count once in the unique totals; the raw totals are unchanged"""
+    print("Testing unique totals...")
+    with tempfile.TemporaryDirectory() as tmp:
+        make_tree(tmp)
+        plain_results, plain_stats = analyze_folder(tmp, *FILTERS, workers=1)
+        file_results, extension_stats = analyze_folder(tmp, *FILTERS, workers=1, dedup=True)
+        assert unique_totals(plain_stats) is None and 'duplicate_of' not in plain_results[0]
+
+        py, txt = extension_stats[".py"], extension_stats[".txt"]
+        assert (py['files'], py['lines']) == (plain_stats[".py"]['files'], plain_stats[".py"]['lines'])
+        assert (py['unique_files'], py['unique_lines']) == (py['files'] - 3, py['lines'] - 12)
+        assert (txt['unique_files'], txt['unique_lines']) == (1, 4)
+        assert unique_totals(extension_stats) == {'files': file_results.unique_files,
+                                                  'lines': py['unique_lines'] + txt['unique_lines']}
+
+        groups = file_results.duplicate_groups()
+        assert len(groups) == 1
+        paths = [info['path'].replace(os.sep, "/") for info in groups[0]]
+        assert paths[0] == "copy.txt" and sorted(paths[1:]) == ["src/main.py", "vendor/a/main.py", "vendor/b/main.py"]
+        rows = {info['path'].replace(os.sep, "/"): info['duplicate_of'] for info in file_results}
+        assert rows["src/main.py"] == "copy.txt" and rows["src/same_size.py"] is None
+        assert rows["src/empty2.py"] is None  # empty files are never grouped
+
+        # Process workers find the same copies
+        engine = CountingEngine("metrics", workers=4, batch_size=2, dedup=True)
+        paths = [os.path.join(tmp, *rel.split("/")) for rel in FILES if not rel.endswith(".txt")] * 40
+        metrics_results, metrics_stats = engine.count(tmp, paths)
+        assert len(metrics_results.duplicate_groups()) == 3
+        assert metrics_stats[".py"]['unique_files'] == 3 + 2 * 40  # the empty files are never grouped
+    print(f"✓ {py['lines']} lines, {py['unique_lines']} unique")
+
+
+def test_only_shared_sizes_hashed():
+    """Files whose size is unique, empty files and cache hits with a known digest are never hashed"""
+    print("\nTesting which files are hashed...")
+    with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory() as cache_dir:
+        make_tree(tmp)
+        cache_file = os.path.join(cache_dir, "cache.sqlite")
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            opened = []
+            with tracking(opened), ResultCache(cache_file) as cache:
+                analyze_folder(".", *FILTERS, workers=1, cache=cache)
+            assert not any(hashed for _, hashed in opened)
+
+            # Counts are cached, but the files to hash are read once more for their digests
+            opened = []
+            with tracking(opened), ResultCache(cache_file) as cache:
+                first, _ = analyze_folder(".", *FILTERS, workers=1, cache=cache, dedup=True)
+            assert sorted(opened) == sorted((rel, True) for rel in FILES if len(FILES[rel]) == len(ORIGINAL))
+
+            opened = []
+            with tracking(opened), ResultCache(cache_file) as cache:
+                second, stats = analyze_folder(".", *FILTERS, workers=1, cache=cache, dedup=True)
+            assert opened == [] and second.duplicate_of == first.duplicate_of
+            assert stats[".py"]['unique_lines'] == first.extension_stats()[".py"]['unique_lines']
+        finally:
+            os.chdir(cwd)
+    print("✓ Only same-size files hashed")
+
+
+def test_exports_and_batches():
+    """Exports carry the unique totals and groups; copies are found across batch roots"""
+    print("\nTesting exports and batches...")
+    with tempfile.TemporaryDirectory() as tmp:
+        roots = [os.path.join(tmp, name) for name in ("one", "two")]
+        for root in roots:
+            make_tree(root)
+        file_results, extension_stats, root_stats = analyze_roots(roots, *FILTERS, workers=1, dedup=True)
+        assert root_stats[roots[0]] == root_stats[roots[1]]
+        # Across roots everything of the second one is a copy, except its empty files
+        assert extension_stats[".py"]['unique_files'] == root_stats[roots[0]][".py"]['unique_files'] + 2
+        assert extension_stats[".py"]['unique_lines'] == root_stats[roots[0]][".py"]['unique_lines']
+
+        exported = json.loads(generate_json_data(file_results, extension_stats, roots, "all", root_stats=root_stats))
+        summary = exported['analysis_summary']
+        assert summary['unique_lines'] == unique_totals(extension_stats)['lines'] < summary['total_lines']
+        assert summary['duplicate_groups'] == len(exported['duplicate_groups']) == 3
+        group = exported['duplicate_groups'][0]
+        assert len(group['files']) == 8 and group['repeated_lines'] == 4 * 7
+
+        csv_data = generate_csv_data(file_results, extension_stats, root_stats=root_stats)
+        assert "Unique Lines" in csv_data and "=== DUPLICATE GROUPS ===" in csv_data
+        assert f",{group['files'][0]}\r\n" in csv_data  # the copies name the counted file
+    print("✓ Unique totals exported")
+
+
+def test_commit_snapshot():
+    """Commit snapshots group files by blob id and agree with the working tree"""
+    print("\nTesting commit snapshots...")
+    if shutil.which("git") is None:
+        print("git is not installed, skipped")
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        make_tree(tmp)
+        for args in (["init", "-q"], ["add", "."],
+                     ["-c", "user.email=t@example.com", "-c", "user.name=T", "commit", "-q", "-m", "copies"]):
+            subprocess.run(["git", *args], cwd=tmp, check=True, capture_output=True)
+        tree_results, tree_stats = analyze_folder(tmp, *FILTERS, workers=1, dedup=True)
+        commit_results, commit_stats = analyze_repository(tmp, *FILTERS, commit="HEAD", dedup=True)
+        assert commit_stats == tree_stats
+        assert commit_results.duplicate_of == tree_results.duplicate_of
+    print("✓ Same copies as the working tree")
+
+
+if __name__ == "__main__":
+    print("Testing Duplicate Detection")
+    print("=" * 40)
+    test_unique_totals()
+    test_only_shared_sizes_hashed()
+    test_exports_and_batches()
+    test_commit_snapshot()
+    print("\nTest complete!")
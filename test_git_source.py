@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test enumerating and counting files from a git repository
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+
+from line_counter_core import FileFilter, analyze_folder
+from line_counter_git import analyze_repository, list_tracked_files, read_index, scan_git_files
+
+FILES = {
+    "main.py": "import os\n\n# comment\nprint(os.name)\n",
+    "src/app.js": "// header\nlet x = 1;\n",
+    "src/deep/util.py": "x = 1\n" * 7,
+    "node_modules/dep.js": "module.exports = 1;\n",
+    "docs/readme.md": "# Docs\n",
+}
+
+
+def git(root, *args):
+    """Run git in root and return its output"""
+    return subprocess.run(["git", *args], cwd=root, check=True, capture_output=True).stdout
+
+
+def make_repo(root):
+    """A committed repository with one untracked file"""
+    git(root, "init", "-q")
+    git(root, "config", "user.email", "test@example.com")
+    git(root, "config", "user.name", "Test")
+    for rel, text in FILES.items():
+        path = os.path.join(root, *rel.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    git(root, "add", ".")
+    git(root, "commit", "-q", "-m", "initial")
+    with open(os.path.join(root, "untracked.py"), "w", encoding="utf-8") as f:
+        f.write("print('not tracked')\n")
+
+
+def counts(results):
+    file_results, _ = results
+    return {info['path']: info['lines'] for info in file_results}
+
+
+def test_index_matches_ls_files():
+    """The parsed index lists what git ls-files lists, for index versions 2 to 4"""
+    print("Testing the index parser...")
+    with tempfile.TemporaryDirectory() as tmp:
+        make_repo(tmp)
+        for version in ("2", "3", "4"):
+            git(tmp, "update-index", "--index-version", version)
+            expected = git(tmp, "ls-files", "-z").decode().split("\0")[:-1]
+            entries = read_index(os.path.join(tmp, ".git"))
+            assert [entry.path for entry in entries] == expected, version
+            assert entries[0].size == len(FILES[entries[0].path])
+        # Listing a subfolder gives paths relative to it
+        assert list_tracked_files(os.path.join(tmp, "src")) == ["app.js", "deep/util.py"]
+    print("✓ Index versions 2-4 parsed")
+
+
+def test_tracked_files_only():
+    """Untracked files are skipped and the usual filters still apply"""
+    print("\nTesting tracked-file enumeration...")
+    with tempfile.TemporaryDirectory() as tmp:
+        make_repo(tmp)
+        file_filter = FileFilter([".py", ".js"], [], ["node_modules"])
+        paths = [entry.rel_path for entry in scan_git_files(tmp, file_filter)]
+        assert paths == ["main.py", os.path.join("src", "app.js"), os.path.join("src", "deep", "util.py")]
+
+        tracked = counts(analyze_repository(tmp, [".py", ".js"], [], ["node_modules"], workers=1))
+        walked = counts(analyze_folder(tmp, [".py", ".js"], [], ["node_modules"], workers=1))
+        assert "untracked.py" in walked
+        del walked["untracked.py"]
+        assert tracked == walked
+    print(f"✓ {len(tracked)} tracked files counted")
+
+
+def test_commit_snapshot():
+    """A commit is counted from its blobs, whatever the working tree holds now"""
+    print("\nTesting commit snapshots...")
+    with tempfile.TemporaryDirectory() as tmp:
+        make_repo(tmp)
+        filters = ([".py", ".js"], [], ["node_modules"])
+        before = analyze_repository(tmp, *filters, workers=1)
+        for method in ("all", "code_only", "metrics"):
+            expected = counts(analyze_repository(tmp, *filters, method, workers=1))
+            assert counts(analyze_repository(tmp, *filters, method, commit="HEAD")) == expected, method
+
+        # Change the working tree and commit; the old snapshot still counts as before
+        with open(os.path.join(tmp, "main.py"), "a", encoding="utf-8") as f:
+            f.write("print(1)\n" * 10)
+        os.remove(os.path.join(tmp, "src", "app.js"))
+        git(tmp, "commit", "-q", "-a", "-m", "change")
+        assert counts(analyze_repository(tmp, *filters, commit="HEAD~1")) == counts(before)
+        now = counts(analyze_repository(tmp, *filters, commit="HEAD"))
+        assert now["main.py"] == 14 and os.path.join("src", "app.js") not in now
+
+        # A subfolder counts just its part of the tree
+        assert counts(analyze_repository(os.path.join(tmp, "src"), *filters, commit="HEAD~1")) == {
+            "app.js": 2, os.path.join("deep", "util.py"): 7
+        }
+    print("✓ Commit snapshots counted without a checkout")
+
+
+if __name__ == "__main__":
+    print("Testing Git Sources")
+    print("=" * 40)
+    if shutil.which("git") is None:
+        print("git is not installed, skipped")
+    else:
+        test_index_matches_ls_files()
+        test_tracked_files_only()
+        test_commit_snapshot()
+    print("\nTest complete!")
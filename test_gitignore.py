@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test .gitignore handling in the walker
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from unittest import mock
+
+import line_counter_core
+from line_counter_core import FileFilter, scan_files
+from line_counter_ignore import IgnoreRules
+
+FILES = [
+    "main.py", "debug.log", "keep.log", "notes.tmp", "build/out.js", "src/build/gen.py", "src/app.js",
+    "src/app.min.js", "src/lib/vendor/x.js", "src/lib/own.js", "docs/a/b/c.md", "docs/keep/c.md",
+    "venv/lib/site.py", "logs/today.txt", "logs/keep/readme.txt", "root_only.txt", "src/root_only.txt",
+    "space .txt", "#hash.txt", "!bang.txt", "src/data/tmp", "src/data/tmp2/x.py", "deep/a/b/trace.out",
+]
+
+GITIGNORE = """\
+# comment line
+*.log
+!keep.log
+*.tmp
+/build/
+venv/
+logs/*
+!logs/keep/
+/root_only.txt
+docs/**/c.md
+!docs/keep/c.md
+**/vendor
+space\\ .txt
+\\#hash.txt
+\\!bang.txt
+deep/**/*.out
+"""
+
+NESTED = {
+    "src/.gitignore": "*.min.js\n/root_only.txt\ndata/tmp/\n",
+    "src/lib/.gitignore": "!vendor\n",
+}
+
+
+def make_tree(root, exclude=""):
+    for rel in FILES:
+        path = os.path.join(root, *rel.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("x\n")
+    with open(os.path.join(root, ".gitignore"), "w", encoding="utf-8") as f:
+        f.write(GITIGNORE)
+    for rel, text in NESTED.items():
+        with open(os.path.join(root, *rel.split("/")), "w", encoding="utf-8") as f:
+            f.write(text)
+    if exclude:
+        with open(os.path.join(root, ".git", "info", "exclude"), "a", encoding="utf-8") as f:
+            f.write(exclude)
+
+
+def walked(folder):
+    file_filter = FileFilter([".*"], [], [])
+    return sorted(entry.rel_path.replace(os.sep, "/") for entry in scan_files(folder, file_filter, gitignore=True))
+
+
+def git_untracked(folder):
+    """What git reports as untracked and not ignored, relative to folder"""
+    output = subprocess.run(["git", "-c", "core.excludesFile=", "ls-files", "-z", "-o", "--exclude-standard"],
+                            cwd=folder, check=True, capture_output=True).stdout
+    return sorted(path for path in output.decode().split("\0") if path)
+
+
+def test_rules():
+    """Known answers for single rules"""
+    print("Testing ignore rules...")
+    cases = [
+        ("*.py", "a.py", "src/a.py", False, True),
+        ("/a.py", "a.py", "src/a.py", False, None),
+        ("build/", "build", "build", False, None),
+        ("build/", "build", "build", True, True),
+        ("a/**/b", "b", "a/x/y/b", False, True),
+        ("a/**/b", "b", "a/b", False, True),
+        ("**/foo", "foo", "x/foo", True, True),
+        ("foo/**", "x", "foo/x", False, True),
+        ("f[!o]o", "foo", "foo", False, None),
+        ("f[!o]o", "fxo", "fxo", False, True),
+        ("a?c", "a/c", "a/c", False, None),
+        ("!*.py", "a.py", "a.py", False, False),
+    ]
+    for pattern, name, path, is_dir, expected in cases:
+        assert IgnoreRules([pattern]).match(name, path, is_dir) == expected, (pattern, path)
+    rules = IgnoreRules(["*.py", "!keep.py", "# comment", "", "trailing   "])
+    assert rules.match("keep.py", "keep.py", False) is False
+    assert rules.match("trailing", "trailing", False) is True
+    print(f"✓ {len(cases)} rules correct")
+
+
+def test_matches_git():
+    """The walk lists exactly what git does not ignore"""
+    print("\nTesting the walk against git...")
+    with tempfile.TemporaryDirectory() as tmp:
+        subprocess.run(["git", "init", "-q"], cwd=tmp, check=True)
+        make_tree(tmp, exclude="*.txt\n!logs/keep/readme.txt\n")
+        expected = git_untracked(tmp)
+        assert walked(tmp) == expected, (walked(tmp), expected)
+        assert "main.py" in expected and "debug.log" not in expected
+
+        # A subfolder still gets the rules of the folders above it
+        sub = os.path.join(tmp, "src")
+        assert walked(sub) == git_untracked(sub)
+    print(f"✓ {len(expected)} files, same as git ls-files")
+
+
+def test_pruned_before_descent():
+    """Ignored folders are never opened; outside a repository the ignore files still apply"""
+    print("\nTesting pruning...")
+    with tempfile.TemporaryDirectory() as tmp:
+        make_tree(tmp)
+        opened = []
+        real_scandir = os.scandir
+
+        def scandir(path):
+            opened.append(os.path.relpath(path, tmp).replace(os.sep, "/"))
+            return real_scandir(path)
+
+        with mock.patch.object(line_counter_core.os, "scandir", side_effect=scandir):
+            paths = walked(tmp)
+        for folder in ("build", "venv", "venv/lib", "src/data/tmp"):
+            assert folder not in opened, folder
+        assert "logs/keep" in opened and "src/lib/vendor" in opened  # re-included by src/lib/.gitignore
+        assert "main.py" in paths and "venv/lib/site.py" not in paths
+    print(f"✓ {len(opened)} folders opened")
+
+
+if __name__ == "__main__":
+    print("Testing .gitignore Handling")
+    print("=" * 40)
+    test_rules()
+    if shutil.which("git") is None:
+        print("git is not installed, comparison skipped")
+    else:
+        test_matches_git()
+    test_pruned_before_descent()
+    print("\nTest complete!")
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Test that byte-level line counting matches the original text-mode counting
+"""
+
+import os
+import random
+import tempfile
+import tracemalloc
+from unittest import mock
+
+import line_counter_core
+
+from line_counter_core import (
+    LineCounter, count_file_lines, count_lines_in_bytes, is_binary_chunk, is_binary_file, is_comment_line
+)
+
+# Size of the synthetic huge file: small by default so the suite stays fast;
+# set LINE_COUNTER_BIG_FILE_MB (e.g. 2048) for the multi-GB run
+BIG_FILE_MB = int(os.environ.get("LINE_COUNTER_BIG_FILE_MB", "16"))
+
+SAMPLES = [
+    b"",
+    b"one line no newline",
+    b"a\nb\nc\n",
+    b"a\n\n\nb",
+    b"windows\r\nline\r\n\r\nendings",
+    b"old\rmac\r\rstyle\r",
+    b"mixed\r\n\rendings\n\r",
+    b"   \n\t\n  x  \n",
+    b"# comment\n  # indented comment\ncode = 1  # trailing\n\n",
+    b"// c comment\n/* block\n * middle\n */\nint x;\n",
+    b"<!-- html -->\n<p>text</p>\n",
+    b"-- sql\nSELECT 1;\n",
+    b"unicode \xc3\xa9\xc3\xa0\n\xc2\xa0\n\xe3\x80\x80\nreal\n",
+    b"\xef\xbb\xbfbom first line\n# second\n",
+    b"file sep\x1c\n\x1d\x1e\n\x1f\n",
+    b"latin-1 bytes \xe9\xe8\n\xff\n",
+    b"invalid between\r\xff\nline ends\r\xc3\xa9\n",
+    b"only invalid after the last line\n\xff\xfe",
+    b"\x0b\x0c\nvertical tab\n",
+    b"int a; /* open\n  still comment\n\n*/ int b;\n/* one */ /* two */\n",
+    b'x = 1\n"""Docstring\n\nmore\n"""\ns = """\nstring body\n"""\ny = "/*" + "#"\n',
+    b"<!--\n<p>hidden</p>\n-->\n<p>shown</p> <!-- note\n-->\n",
+]
+
+
+def reference_count(path, method):
+    """The original readlines()-based implementation of the "all" and "non_empty" methods"""
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        lines = f.readlines()
+    if method == "non_empty":
+        return sum(1 for line in lines if line.strip())
+    return len(lines)
+
+
+def test_matches_reference():
+    """Byte-level counts match the text-mode implementation; metrics agree with every method"""
+    print("Testing byte-level counting against text-mode counting...")
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, sample in enumerate(SAMPLES):
+            for ext in (".py", ".c", ".html", ".sql", ".txt"):
+                path = os.path.join(tmp, f"sample{i}{ext}")
+                with open(path, 'wb') as f:
+                    f.write(sample)
+                for method in ("all", "non_empty"):
+                    expected = reference_count(path, method)
+                    actual = count_file_lines(path, method)
+                    assert actual == expected, f"{sample!r} {ext} {method}: {actual} != {expected}"
+
+                # One pass gives all of them: code + comment + blank == total
+                metrics = count_file_lines(path, "metrics")
+                assert metrics.total == reference_count(path, "all")
+                assert metrics.total - metrics.blank == reference_count(path, "non_empty")
+                assert metrics.code == count_file_lines(path, "code_only")
+                assert metrics.code + metrics.comment + metrics.blank == metrics.total
+    print(f"✓ {len(SAMPLES)} samples match")
+
+
+def test_block_comments():
+    """Block comments, docstrings and strings are classified across lines"""
+    print("\nTesting block comments...")
+    cases = [
+        (".c", b"int a; /* open\n  still comment\n*/ int b;\n/* c */\n*ptr = 1;\n", 3),
+        (".c", b"/*\n * doc\n */\nint x; // tail\n// only\n", 1),
+        (".js", b"const glob = 'src/**/*.js';\nrun();\n", 2),
+        (".py", b'def f():\n    """Docstring\n\n    more\n    """\n    return 1\n', 2),
+        (".py", b"x = '''\n# inside a string\n'''\ny = 2\n", 4),
+        (".py", b'"""One-line docstring"""\nprint("# not a comment")\n', 1),
+        (".html", b"<!--\n<p>hidden</p>\n-->\n<p>shown</p>\n", 1),
+        (".sql", b"/* header\n   SELECT 0; */\nSELECT 1; -- done\n", 1),
+        (".txt", b"/* not a comment here\n", 1),
+    ]
+    for ext, data, expected in cases:
+        assert count_lines_in_bytes(data, "code_only", ext) == expected, (ext, data)
+    assert is_comment_line("/* one */", ".c") and not is_comment_line("/* one */ x;", ".c")
+    assert is_comment_line("# note", ".py") and not is_comment_line("* middle", ".c")
+    print(f"✓ {len(cases)} block comment cases correct")
+
+
+# Small files per language with their code_only count worked out by hand;
+# the comment after each line says how it is classified
+CODE_ONLY_FIXTURES = [
+    (".py", [
+        '#!/usr/bin/env python3',      # comment
+        '"""Module docstring',         # comment
+        'spanning lines',              # comment
+        '"""',                         # comment
+        'import os',                   # code
+        '',                            # blank
+        'def f():',                    # code
+        "    '''Doc'''",               # comment
+        '    s = "# not a comment"',   # code
+        '    t = """',                 # code: a string after code is not a docstring
+        '# inside a string',           # code
+        '"""',                         # code
+        '    return s  # trailing',    # code
+    ], 7),
+    (".sh", [
+        '#!/bin/sh',                   # comment
+        '# comment',                   # comment
+        'echo "# not a comment"',      # code
+        '  # indented',                # comment
+        "x='#'  # trailing",           # code
+        '"$cmd" "#arg"',               # code
+    ], 3),
+    (".ps1", [
+        '<# block',                    # comment
+        '   comment #>',               # comment
+        'Write-Host "<# not a block"', # code
+        '$x = 1 # trailing',           # code
+        '# line',                      # comment
+    ], 2),
+    (".c", [
+        '/* header',                   # comment
+        ' * spanning',                 # comment
+        ' */',                         # comment
+        'int a = 1; /* open',          # code
+        '   still comment',            # comment
+        '*/ int b;',                   # code
+        'char *s = "/* not a comment";',  # code
+        "char c = '/'; int d; /* x */",   # code
+        'int e;',                      # code
+        '// line',                     # comment
+        'x = 1; // tail',              # code
+        '/* one */ /* two */',         # comment
+    ], 6),
+    (".js", [
+        'const t = `/* template`;',    # code
+        "const u = '//';",             # code
+        'run();',                      # code
+    ], 3),
+    (".html", [
+        '<!-- one -->',                # comment
+        '<p>text</p>',                 # code
+        '<!-- outer <!-- inner -->',   # comment: the first --> closes it
+        '<p>after</p>',                # code
+        '<!--',                        # comment
+        '<!-- nested opener',          # comment
+        '-->',                         # comment
+        '<!-- a <!-- b --> tail -->',  # code: " tail -->" is outside the comment
+        '<p>shown</p> <!-- note',      # code
+        '-->',                         # comment
+    ], 4),
+    (".css", [
+        '/* theme',                    # comment
+        '   colors */',                # comment
+        'body { color: red; } /* tail */',  # code
+        'a::after { content: "/*"; }', # code
+        'p { margin: 0; }',            # code
+    ], 3),
+    (".sql", [
+        '-- header',                   # comment
+        '/* block',                    # comment
+        '   SELECT 0; */',             # comment
+        "SELECT '-- not a comment', '/*' FROM t;",  # code
+        'SELECT 1; -- done',           # code
+    ], 2),
+    (".txt", [
+        '# not a comment',             # code: no comment syntax
+        '/* nor this',                 # code
+        '',                            # blank
+    ], 2),
+]
+
+
+def test_code_only_expected():
+    """code_only matches hand-counted fixtures, through the byte and the text classifier"""
+    print("\nTesting code_only against hand-counted fixtures...")
+    with tempfile.TemporaryDirectory() as tmp:
+        for ext, lines, expected in CODE_ONLY_FIXTURES:
+            data = "\n".join(lines).encode('utf-8') + b"\n"
+            # A leading non-ASCII code line sends the file through the decoded-text classifier
+            for prefix, extra in ((b"", 0), ("é\n".encode('utf-8'), 1)):
+                path = os.path.join(tmp, f"fixture{ext}")
+                with open(path, 'wb') as f:
+                    f.write(prefix + data)
+                actual = count_file_lines(path, "code_only")
+                assert actual == expected + extra, f"{ext} prefix={prefix!r}: {actual} != {expected + extra}"
+                assert count_file_lines(path, "metrics").code == expected + extra
+                assert count_lines_in_bytes(prefix + data, "code_only", ext) == expected + extra
+    print(f"✓ {len(CODE_ONLY_FIXTURES)} languages counted as expected")
+
+
+def test_binary_detection():
+    """Unknown extensions are sniffed from the same read"""
+    print("\nTesting binary detection...")
+    with tempfile.TemporaryDirectory() as tmp:
+        blob = os.path.join(tmp, "data.bin")
+        with open(blob, 'wb') as f:
+            f.write(b"text\n" + b"\x00" * 100)
+        assert is_binary_file(blob)
+        assert count_file_lines(blob, "all") == "binary"
+
+        # Known text extensions are never binary
+        text = os.path.join(tmp, "data.py")
+        with open(text, 'wb') as f:
+            f.write(b"text\n" + b"\x00" * 100)
+        assert count_file_lines(text, "all") == 2
+
+        missing = os.path.join(tmp, "missing.bin")
+        assert count_file_lines(missing, "all") == "binary"
+        assert count_file_lines(os.path.join(tmp, "missing.py"), "all") == 0
+    print("✓ Binary detection correct")
+
+
+def reference_is_binary_chunk(chunk):
+    """The original per-byte generator heuristic"""
+    if len(chunk) == 0:
+        return False
+    if b'\x00' in chunk:
+        return True
+    text_chars = sum(1 for byte in chunk if (32 <= byte <= 126) or byte in (9, 10, 13) or (128 <= byte <= 255))
+    return text_chars / len(chunk) < 0.50
+
+
+def test_binary_heuristic_matches_reference():
+    """The table-driven classifier gives the same verdicts as the per-byte one"""
+    print("\nTesting binary heuristic verdicts...")
+    rng = random.Random(1234)
+    control = bytes(b for b in range(1, 32) if b not in (9, 10, 13)) + b"\x7f"
+    chunks = [b"", b"\x00", bytes(range(256)), control * 10, b"a" * 8192]
+    for _ in range(500):
+        size = rng.randint(1, 8192)
+        # Mix text and control bytes around the 50% threshold
+        ratio = rng.random()
+        chunks.append(bytes(rng.choice(control) if rng.random() < ratio else rng.randint(32, 255)
+                            for _ in range(size)))
+    # Exactly on the threshold
+    chunks.append(b"a" * 50 + control[:1] * 50)
+    chunks.append(b"a" * 49 + control[:1] * 51)
+
+    for chunk in chunks:
+        assert is_binary_chunk(chunk) == reference_is_binary_chunk(chunk), chunk[:40]
+    print(f"✓ {len(chunks)} chunks classified identically")
+
+
+def test_mmap_path():
+    """Memory-mapped counting matches read() counting and falls back cleanly"""
+    print("\nTesting the mmap path...")
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, sample in enumerate(SAMPLES):
+            path = os.path.join(tmp, f"sample{i}.py")
+            with open(path, 'wb') as f:
+                f.write(sample)
+            for method in ("all", "non_empty", "code_only", "metrics"):
+                expected = count_file_lines(path, method, mmap_threshold=0)
+                assert count_file_lines(path, method, mmap_threshold=1) == expected
+
+        blob = os.path.join(tmp, "blob.bin")
+        with open(blob, 'wb') as f:
+            f.write(b"\x00" * 100)
+        assert count_file_lines(blob, "all", mmap_threshold=1) == "binary"
+
+        # Mapping failures fall back to plain reads
+        with mock.patch.object(line_counter_core.mmap, "mmap", side_effect=OSError("no mmap")):
+            assert count_file_lines(os.path.join(tmp, "sample2.py"), "all", mmap_threshold=1) == 3
+    print("✓ mmap counts match")
+
+
+class TinyCarryCounter(LineCounter):
+    """Compacts partial lines almost immediately"""
+    MAX_CARRY = 4
+
+
+def test_chunk_boundaries():
+    """Feeding a file in tiny pieces gives the same counts as one buffer"""
+    print("\nTesting chunk boundaries...")
+    long_lines = [b" " * 50 + b"# long comment" + b"x" * 50 + b"\n", b"\xe3\x80\x80" * 20 + b"\xc3\xa9tail\n",
+                  b" " * 40 + b"\r\n" + b" " * 40,
+                  b"/* a long block comment " + b"y" * 60 + b" */ int x;\n" + b"z" * 80 + b" /* open\nend */\n",
+                  b'"""' + b"d" * 70 + b'\nstill docstring """ x = 1\n']
+    for sample in SAMPLES + long_lines:
+        for ext in (".py", ".c"):
+            for method in ("all", "non_empty", "code_only", "metrics"):
+                expected = count_lines_in_bytes(sample, method, ext)
+                for size in (1, 2, 3, 7):
+                    for counter in (LineCounter(method, ext), TinyCarryCounter(method, ext)):
+                        for i in range(0, len(sample), size):
+                            counter.feed(sample[i:i + size])
+                        assert counter.finish() == expected, f"{sample!r} {ext} {method} size={size}"
+    print("✓ Chunked counts match")
+
+
+def test_huge_file_constant_memory():
+    """A big file is counted with bounded memory, through read() and through mmap"""
+    print(f"\nTesting a {BIG_FILE_MB} MB file under a memory cap...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "dump.sql")
+        line = b"INSERT INTO t VALUES (1, 'abc');\n-- comment\n\n"
+        block = line * (1024 * 1024 // len(line))
+        text_mb = min(16, BIG_FILE_MB // 8)
+        with open(path, 'wb') as f:
+            for _ in range(text_mb):
+                f.write(block)
+            # The rest is one enormous unterminated line (sparse where the file system allows it)
+            f.truncate(BIG_FILE_MB * 1024 * 1024)
+
+        lines_per_block = block.count(b"\n")
+        expected = {
+            "all": text_mb * lines_per_block + 1,
+            "non_empty": text_mb * lines_per_block * 2 // 3 + 1,
+            "code_only": text_mb * lines_per_block // 3 + 1,
+        }
+
+        # Well below the file size, so memory use cannot be growing with it
+        cap = min(16, BIG_FILE_MB // 2) * 1024 * 1024
+        for method, count in expected.items():
+            for mmap_threshold in (0, 1):
+                tracemalloc.start()
+                try:
+                    assert count_file_lines(path, method, mmap_threshold) == count
+                    _, peak = tracemalloc.get_traced_memory()
+                finally:
+                    tracemalloc.stop()
+                assert peak < cap, f"{method} peak {peak} bytes"
+            print(f"✓ {method}: {count:,} lines, peak {peak / (1024 * 1024):.1f} MB")
+
+
+if __name__ == "__main__":
+    print("Testing Line Counting")
+    print("=" * 40)
+    test_matches_reference()
+    test_block_comments()
+    test_code_only_expected()
+    test_binary_detection()
+    test_binary_heuristic_matches_reference()
+    test_mmap_path()
+    test_chunk_boundaries()
+    test_huge_file_constant_memory()
+    print("\nTest complete!")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test the persistent result cache
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import line_counter_core
+from line_counter_cache import ResultCache
+from line_counter_core import CountingEngine
+
+
+def count_with_cache(cache_file, folder, paths, method="all", force_rescan=False):
+    """Run the engine with a cache and report which files were actually opened"""
+    opened = []
+    real_count = line_counter_core.count_file_lines
+
+    def tracking_count(path, method, *args):
+        opened.append(Path(path).name)
+        return real_count(path, method, *args)
+
+    with ResultCache(cache_file) as cache, mock.patch.object(line_counter_core, "count_file_lines", tracking_count):
+        results = CountingEngine(method, workers=1, cache=cache, force_rescan=force_rescan).count(folder, paths)
+    return results, sorted(opened)
+
+
+def test_only_changed_files_are_recounted():
+    """Unchanged files come from the cache, changed ones are reopened"""
+    print("Testing incremental recount...")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, "cache.sqlite")
+        src = Path(tmp) / "src"
+        src.mkdir()
+        a = src / "a.py"
+        b = src / "b.py"
+        blob = src / "c.bin"
+        a.write_text("1\n2\n3\n", encoding="utf-8")
+        b.write_text("1\n", encoding="utf-8")
+        blob.write_bytes(b"\x00\x01")
+        paths = [a, b, blob]
+
+        first, opened = count_with_cache(cache_file, src, paths)
+        assert opened == ["a.py", "b.py", "c.bin"]
+
+        second, opened = count_with_cache(cache_file, src, paths)
+        assert opened == []
+        assert second == first
+        assert second[0][2]['lines'] == "binary"
+
+        b.write_text("1\n2\n", encoding="utf-8")
+        os.utime(b, ns=(0, 1_000_000_000))
+        third, opened = count_with_cache(cache_file, src, paths)
+        assert opened == ["b.py"]
+        assert third[0][1]['lines'] == 2
+
+        # A different count method has its own entries
+        _, opened = count_with_cache(cache_file, src, paths, method="non_empty")
+        assert opened == ["a.py", "b.py", "c.bin"]
+
+        _, opened = count_with_cache(cache_file, src, paths, force_rescan=True)
+        assert opened == ["a.py", "b.py", "c.bin"]
+        print("✓ Only changed files were reopened")
+
+
+def test_metrics_share_entries():
+    """A "metrics" run is cached as the all / non_empty / code_only entries it is made of"""
+    print("\nTesting metrics cache entries...")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, "cache.sqlite")
+        src = Path(tmp) / "src"
+        src.mkdir()
+        a = src / "a.py"
+        blob = src / "b.bin"
+        a.write_text("# c\n\nx = 1\n", encoding="utf-8")
+        blob.write_bytes(b"\x00\x01")
+        paths = [a, blob]
+
+        first, opened = count_with_cache(cache_file, src, paths, method="metrics")
+        assert opened == ["a.py", "b.bin"]
+        assert first[0][0]['code'] == 1 and first[0][0]['comment'] == 1 and first[0][0]['blank'] == 1
+
+        second, opened = count_with_cache(cache_file, src, paths, method="metrics")
+        assert opened == [] and second == first
+
+        # The single-method runs reuse what the metrics run stored
+        for method, lines in (("all", 3), ("non_empty", 2), ("code_only", 1)):
+            results, opened = count_with_cache(cache_file, src, paths, method=method)
+            assert opened == [] and results[0][0]['lines'] == lines, method
+        print("✓ Metrics entries reused both ways")
+
+
+def test_eviction():
+    """The cache never holds more than max_entries rows"""
+    print("\nTesting eviction...")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(os.path.join(tmp, "cache.sqlite"), max_entries=3)
+        cache.update("all", [(os.path.join(tmp, f"f{i}.py"), 1, i, 1, ".py") for i in range(5)])
+        assert len(cache.lookup(tmp, "all")) == 3
+
+        cache.clear()
+        assert cache.lookup(tmp, "all") == {}
+        cache.close()
+        print("✓ Eviction and clear work")
+
+
+if __name__ == "__main__":
+    print("Testing Result Cache")
+    print("=" * 40)
+    test_only_changed_files_are_recounted()
+    test_metrics_share_entries()
+    test_eviction()
+    print("\nTest complete!")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test the columnar result store against the list-of-dicts results
+"""
+
+import random
+import tracemalloc
+
+from line_counter_core import group_by_extension, summarize
+from line_counter_export import file_sort_key, generate_csv_data, generate_json_data, sort_files
+from line_counter_results import LineMetrics, ResultStore
+
+
+def make_dicts(file_count, seed=7):
+    """File dicts with duplicate line counts, binary files and empty extensions"""
+    rng = random.Random(seed)
+    results = []
+    for i in range(file_count):
+        ext = rng.choice(["", ".py", ".js", ".bin", ".PY"])
+        lines = "binary" if ext == ".bin" else rng.randint(0, 50)
+        results.append({'path': f"src/d{rng.randint(0, 9)}/f{i}{ext}", 'lines': lines,
+                        'size': rng.randint(0, 10 ** 6), 'extension': ext})
+    return results
+
+
+def reference_stats(file_results):
+    """extension_stats as the engine used to build it"""
+    stats = {}
+    for f in file_results:
+        ext = stats.setdefault(f['extension'], {'files': 0, 'lines': 0, 'size': 0})
+        ext['files'] += 1
+        ext['size'] += f['size']
+        if f['lines'] != "binary":
+            ext['lines'] += f['lines']
+    return stats
+
+
+def test_store_matches_dicts():
+    """Rows, totals, stats, sort order and groups match the dict implementation"""
+    print("Testing ResultStore against file dicts...")
+    dicts = make_dicts(5000)
+    store = ResultStore.from_results(dicts)
+
+    assert len(store) == len(dicts)
+    assert list(store) == dicts and store == dicts
+    assert store[3] == dicts[3] and store[-1] == dicts[-1]
+    assert list(store[10:20]) == dicts[10:20]
+    assert summarize(store) == summarize(dicts)
+    assert store.extension_stats() == reference_stats(dicts)
+
+    expected_order = sorted(dicts, key=file_sort_key, reverse=True)
+    assert list(sort_files(store)) == expected_order
+
+    groups = group_by_extension(store)
+    for ext, files in group_by_extension(dicts).items():
+        assert list(groups[ext]) == files
+        assert list(sort_files(groups[ext])) == sorted(files, key=file_sort_key, reverse=True)
+    print(f"✓ {len(store)} files, {len(store.extensions)} interned extensions")
+
+
+def test_exports_accept_store():
+    """CSV and JSON exports of a store equal the exports of the dicts"""
+    print("\nTesting exports from a store...")
+    dicts = make_dicts(1500)
+    store = ResultStore.from_results(dicts)
+    stats = store.extension_stats()
+    assert generate_csv_data(store, stats) == generate_csv_data(dicts, stats)
+    assert generate_json_data(store, stats, "x", "all") == generate_json_data(dicts, stats, "x", "all")
+    print("✓ Exports identical")
+
+
+def test_incremental_totals():
+    """Totals are kept up to date on every append"""
+    print("\nTesting incremental totals...")
+    store = ResultStore()
+    assert store.totals() == (0, 0, 0)
+    store.append("a.py", 10, 100, ".py")
+    store.append("b.bin", "binary", 50, ".bin")
+    assert store.totals() == (2, 10, 150)
+    assert list(sort_files(store))[-1]['lines'] == "binary"
+    store.append("c.py", 5, 1, ".py")
+    assert store.totals() == (3, 15, 151)
+    assert store.extension_stats()['.py'] == {'files': 2, 'lines': 15, 'size': 101}
+    assert [f['path'] for f in sort_files(store)] == ["a.py", "c.py", "b.bin"]
+    print("✓ Totals follow appends")
+
+
+def test_metric_columns():
+    """LineMetrics rows add code / comment / blank columns, per file and per extension"""
+    print("\nTesting metric columns...")
+    store = ResultStore()
+    store.append("a.py", LineMetrics(10, 6, 3, 1), 100, ".py")
+    store.append("b.bin", "binary", 50, ".bin")
+    store.append("c.py", LineMetrics(4, 2, 0, 2), 40, ".py")
+
+    assert store.totals() == (3, 14, 190)
+    assert store.metric_totals == (8, 3, 3)
+    assert store[0] == {'path': "a.py", 'lines': 10, 'size': 100, 'extension': ".py",
+                        'code': 6, 'comment': 3, 'blank': 1}
+    assert store[1]['code'] is None
+    assert store.extension_stats()['.py'] == {'files': 2, 'lines': 14, 'size': 140,
+                                              'code': 8, 'comment': 3, 'blank': 3}
+    assert ResultStore.from_results(list(store)) == store
+    assert 'code' not in ResultStore.from_results(make_dicts(10))[0]
+    print("✓ Metric columns follow appends")
+
+
+def measure(build):
+    tracemalloc.start()
+    try:
+        result = build()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current
+
+
+def test_memory_footprint():
+    """The store needs far less memory per file than a dict per file"""
+    print("\nTesting memory footprint...")
+    count = 200_000
+    # Paths are shared by both layouts, so only the per-file overhead is compared
+    paths = [f"src/module_{i}/file_{i}.py" for i in range(count)]
+
+    dicts, dict_bytes = measure(lambda: [
+        {'path': p, 'lines': 1000 + i, 'size': 100_000 + i, 'extension': '.py'} for i, p in enumerate(paths)
+    ])
+
+    def build_store():
+        store = ResultStore()
+        for i, p in enumerate(paths):
+            store.append(p, 1000 + i, 100_000 + i, '.py')
+        return store
+
+    store, store_bytes = measure(build_store)
+    assert store == dicts
+    assert store_bytes * 3 < dict_bytes, (store_bytes, dict_bytes)
+    print(f"✓ {dict_bytes / count:.0f} bytes/file as dicts, {store_bytes / count:.0f} bytes/file in the store")
+
+
+if __name__ == "__main__":
+    print("Testing Result Store")
+    print("=" * 40)
+    test_store_matches_dicts()
+    test_exports_accept_store()
+    test_incremental_totals()
+    test_metric_columns()
+    test_memory_footprint()
+    print("\nTest complete!")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test comparing two analyses: the hash join, JSON exports and cached snapshots
+"""
+
+import json
+import os
+import tempfile
+
+from line_counter_cache import SNAPSHOTS_KEPT, ResultCache
+from line_counter_diff import ADDED, CHANGED, REMOVED, check_count_method, diff_results, load_json_export
+from line_counter_export import generate_diff_csv_data, generate_diff_json_data, generate_json_data
+from line_counter_results import LineMetrics, ResultStore
+
+
+def store_of(rows, root=None):
+    store = ResultStore()
+    for path, lines, size in rows:
+        store.append(path, lines, size, os.path.splitext(path)[1], root)
+    return store
+
+
+OLD = [("a.py", 10, 100), ("b.py", 5, 50), ("c.js", 3, 30), ("gone.js", 7, 70), ("logo.png", "binary", 900)]
+NEW = [("a.py", 10, 100), ("b.py", 8, 80), ("c.js", 3, 31), ("new.md", 4, 40), ("logo.png", "binary", 950)]
+
+
+def test_deltas():
+    """Added, removed and changed files, and the per-extension sums"""
+    print("Testing deltas...")
+    diff = diff_results(store_of(OLD), store_of(NEW), "last week", "today")
+    status = {delta.path: delta.status for delta in diff.files}
+    assert status == {"b.py": CHANGED, "c.js": CHANGED, "new.md": ADDED, "gone.js": REMOVED,
+                      "logo.png": CHANGED}, status
+
+    py, js, md = (diff.extension_deltas[ext] for ext in (".py", ".js", ".md"))
+    assert (py['files_changed'], py['files_unchanged'], py['lines_added'], py['lines_delta']) == (1, 1, 3, 3)
+    assert (js['files_removed'], js['files_changed'], js['lines_removed'], js['lines_delta']) == (1, 1, 7, -7)
+    assert (md['old_files'], md['new_files'], md['files_added'], md['lines_added']) == (0, 1, 1, 4)
+    assert diff.summary['lines_delta'] == diff.summary['lines_added'] - diff.summary['lines_removed'] == 0
+    assert diff.summary['size_delta'] == 51
+
+    # Largest line change first; the binary file changed size only
+    assert [delta.path for delta in diff.sorted_files()][:2] == ["gone.js", "new.md"]
+    csv_data = generate_diff_csv_data(diff)
+    assert "removed,gone.js,.js,7,,-7,70,,-70" in csv_data and "=== BY EXTENSION ===" in csv_data
+    exported = json.loads(generate_diff_json_data(diff))
+    assert exported['diff_summary']['baseline'] == "last week"
+    assert exported['diff_summary']['files_added'] == 1 and len(exported['files']) == 5
+
+    # Batch results are matched on (root, path)
+    batch = diff_results(store_of(OLD, "svc1"), store_of(OLD, "svc2"))
+    assert batch.summary['files_added'] == batch.summary['files_removed'] == len(OLD)
+    print(f"✓ {len(diff.files)} file deltas")
+
+
+def test_json_export_baseline():
+    """A JSON export reads back into the same results, so comparing with it finds no changes"""
+    print("\nTesting JSON export baselines...")
+    store = ResultStore()
+    store.append("src/a.py", LineMetrics(12, 8, 2, 2), 120, ".py")
+    store.append("README", 3, 30, "")
+    store.append("blob.bin", "binary", 64, ".bin")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "results.json")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(generate_json_data(store, store.extension_stats(), tmp, "metrics"))
+        loaded, summary = load_json_export(path)
+        assert summary['count_method'] == "metrics"
+        diff = diff_results(loaded, store)
+        assert diff.files == [] and diff.summary['files_unchanged'] == 3
+
+        # The baseline must count the same lines: metrics totals are all lines, code_only ones are not
+        check_count_method(summary, "all")
+        check_count_method({}, "code_only")
+        try:
+            check_count_method(summary, "code_only")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("code_only compared with metrics")
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('{"something": "else"}')
+        try:
+            load_json_export(path)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("not an export")
+    print("✓ JSON export round trip")
+
+
+def test_batch_mismatch():
+    """A batch is not compared with a single folder, whose keys have no root"""
+    print("\nTesting batch / single folder comparisons...")
+    batch = store_of(NEW, root="project")
+    assert diff_results(store_of(OLD, root="project"), batch).summary['files_changed'] == 3
+    for old, new in ((store_of(OLD), batch), (batch, store_of(NEW))):
+        try:
+            diff_results(old, new)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("batch compared with a single folder")
+    print("✓ Mismatched comparisons refused")
+
+
+def test_cached_snapshots():
+    """Snapshots round trip through the cache and only the newest are kept"""
+    print("\nTesting cached snapshots...")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = store_of(NEW)
+        store.append("m.py", LineMetrics(6, 3, 2, 1), 60, ".py", "root")
+        with ResultCache(os.path.join(tmp, "cache.sqlite")) as cache:
+            assert cache.load_snapshot(tmp, "all") is None
+            for _ in range(SNAPSHOTS_KEPT + 2):
+                cache.save_snapshot(tmp, "all", store)
+            snapshots = cache.list_snapshots(tmp, "all")
+            assert len(snapshots) == SNAPSHOTS_KEPT and snapshots[0][1] == len(store)
+            loaded = cache.load_snapshot(tmp, "all", snapshots[-1][0])
+            assert loaded == store and loaded.extension_stats() == store.extension_stats()
+            assert loaded.totals() == store.totals() and loaded.metric_totals == store.metric_totals
+            assert cache.list_snapshots(tmp, "code_only") == []
+            cache.clear()
+            assert cache.list_snapshots(tmp, "all") == []
+
+        # Snapshots of every folder share the size budget; the oldest go first, the newest always stays
+        size = len(store.to_bytes())
+        with ResultCache(os.path.join(tmp, "small.sqlite"), max_snapshot_bytes=size * 3) as cache:
+            for name in ("a", "b", "c", "d"):
+                cache.save_snapshot(os.path.join(tmp, name), "all", store)
+            assert [len(cache.list_snapshots(os.path.join(tmp, name), "all")) for name in "abcd"] == [0, 1, 1, 1]
+        with ResultCache(os.path.join(tmp, "tiny.sqlite"), max_snapshot_bytes=1) as cache:
+            cache.save_snapshot(tmp, "all", store)
+            cache.save_snapshot(tmp, "all", store)
+            assert len(cache.list_snapshots(tmp, "all")) == 1
+    print(f"✓ {SNAPSHOTS_KEPT} snapshots kept, within the size budget")
+
+
+if __name__ == "__main__":
+    print("Testing Snapshot Diff")
+    print("=" * 40)
+    test_deltas()
+    test_json_export_baseline()
+    test_batch_mismatch()
+    test_cached_snapshots()
+    print("\nTest complete!")
@@ -3,48 +3,49 @@
 Test the special extension patterns .** and .*
 """
 
+# Test data
+TEST_FILES = [
+    "main.py", "script.js", "README.md", "config.json",
+    "compiled.pyc", "binary.exe", "library.dll", "data.log"
+]
+
+# Different pattern combinations
+TEST_CASES = [
+    {
+        "name": "Normal extensions (.py,.js)",
+        "include_exts": [".py", ".js"],
+        "exclude_patterns": ["*.pyc", "*.exe", "*.dll"],
+        "expected_included": ["main.py", "script.js"]
+    },
+    {
+        "name": "All except excluded (.** pattern)",
+        "include_exts": [".**"],
+        "exclude_patterns": ["*.pyc", "*.exe", "*.dll"],
+        "expected_included": ["main.py", "script.js", "README.md", "config.json", "data.log"]
+    },
+    {
+        "name": "Everything including excluded (.* pattern)",
+        "include_exts": [".*"],
+        "exclude_patterns": ["*.pyc", "*.exe", "*.dll"],
+        "expected_included": ["main.py", "script.js", "README.md", "config.json", "compiled.pyc", "binary.exe", "library.dll", "data.log"]
+    },
+    {
+        "name": "Mixed patterns (.**, .py)",
+        "include_exts": [".**", ".py"],
+        "exclude_patterns": ["*.pyc", "*.exe", "*.dll"],
+        "expected_included": ["main.py", "script.js", "README.md", "config.json", "data.log"]
+    }
+]
+
+
 def test_pattern_logic():
     """Test the logic for special patterns"""
     print("Testing special extension pattern logic...")
     
-    # Test data
-    test_files = [
-        "main.py", "script.js", "README.md", "config.json",
-        "compiled.pyc", "binary.exe", "library.dll", "data.log"
-    ]
-    
-    # Test different pattern combinations
-    test_cases = [
-        {
-            "name": "Normal extensions (.py,.js)",
-            "include_exts": [".py", ".js"],
-            "exclude_patterns": ["*.pyc", "*.exe", "*.dll"],
-            "expected_included": ["main.py", "script.js"]
-        },
-        {
-            "name": "All except excluded (.** pattern)",
-            "include_exts": [".**"],
-            "exclude_patterns": ["*.pyc", "*.exe", "*.dll"],
-            "expected_included": ["main.py", "script.js", "README.md", "config.json", "data.log"]
-        },
-        {
-            "name": "Everything including excluded (.* pattern)",
-            "include_exts": [".*"],
-            "exclude_patterns": ["*.pyc", "*.exe", "*.dll"],
-            "expected_included": ["main.py", "script.js", "README.md", "config.json", "compiled.pyc", "binary.exe", "library.dll", "data.log"]
-        },
-        {
-            "name": "Mixed patterns (.**, .py)",
-            "include_exts": [".**", ".py"],
-            "exclude_patterns": ["*.pyc", "*.exe", "*.dll"],
-            "expected_included": ["main.py", "script.js", "README.md", "config.json", "data.log"]
-        }
-    ]
-    
     import fnmatch
     from pathlib import Path
     
-    for test_case in test_cases:
+    for test_case in TEST_CASES:
         print(f"\n--- {test_case['name']} ---")
         
         include_exts = test_case["include_exts"]
@@ -62,7 +63,7 @@ def test_pattern_logic():
         
         included_files = []
         
-        for file in test_files:
+        for file in TEST_FILES:
             file_path = Path(file)
             
             # Check exclude patterns (unless .* is used)
@@ -103,8 +104,32 @@ def test_pattern_logic():
             if extra:
                 print(f"  Extra: {extra}")
 
+def test_file_filter():
+    """The compiled FileFilter used by the counting core gives the same answers"""
+    print("\nTesting FileFilter against the expected results...")
+    from line_counter_core import FileFilter
+
+    for test_case in TEST_CASES:
+        file_filter = FileFilter(test_case["include_exts"], test_case["exclude_patterns"], [])
+        included_files = [file for file in TEST_FILES if file_filter.include_file(file)]
+        assert set(included_files) == set(test_case["expected_included"]), test_case["name"]
+        print(f"✓ {test_case['name']}")
+
+    # Folder exclusion and literal/wildcard mixes
+    file_filter = FileFilter([".py"], ["setup.py", "test_*.py"], [".git", "node_*"])
+    assert file_filter.include_file("main.py")
+    assert not file_filter.include_file("setup.py")
+    assert not file_filter.include_file("test_main.py")
+    assert not file_filter.include_file("README")
+    assert not file_filter.include_folder(".git")
+    assert not file_filter.include_folder("node_modules")
+    assert file_filter.include_folder("src")
+    print("✓ Folder and literal patterns")
+
+
 if __name__ == "__main__":
     print("Testing Special Extension Patterns")
     print("=" * 40)
     test_pattern_logic()
+    test_file_filter()
     print("\nTest complete!") 
\ No newline at end of file
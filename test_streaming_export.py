@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test that the streaming exporters produce exactly the documents the
+in-memory exporters used to build
+"""
+
+import csv
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+import line_counter_export
+from line_counter_core import summarize
+from line_counter_export import (
+    EXPORT_CHUNK_ROWS, file_sort_key, generate_csv_data, generate_json_data, iter_csv_chunks, iter_json_chunks,
+    sort_files, write_csv, write_json
+)
+
+
+def make_results(file_count):
+    """Results with text, binary, empty and extension-less files"""
+    file_results = []
+    extension_stats = {}
+    for i in range(file_count):
+        ext = ("", ".py", ".js", ".bin")[i % 4]
+        lines = "binary" if ext == ".bin" else i % 37
+        file_results.append({'path': f"dir{i % 5}/file_{i}{ext}", 'lines': lines, 'size': i * 13, 'extension': ext})
+        stats = extension_stats.setdefault(ext, {'files': 0, 'lines': 0, 'size': 0})
+        stats['files'] += 1
+        stats['size'] += i * 13
+        if lines != "binary":
+            stats['lines'] += lines
+    return file_results, extension_stats
+
+
+def reference_csv(file_results, extension_stats):
+    """The previous StringIO implementation"""
+    total_files, total_lines, total_size = summarize(file_results)
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['File Path', 'Extension', 'Lines of Code', 'File Size (bytes)', 'File Size (KB)'])
+    for file_info in sorted(file_results, key=file_sort_key, reverse=True):
+        writer.writerow([file_info['path'], file_info['extension'] or '(no extension)', file_info['lines'],
+                         file_info['size'], f"{file_info['size'] / 1024:.2f}"])
+    writer.writerow([])
+    writer.writerow(['=== SUMMARY ==='])
+    writer.writerow(['Total Files', '', total_files, '', ''])
+    writer.writerow(['Total Lines', '', total_lines, '', ''])
+    writer.writerow(['Total Size (MB)', '', '', '', f"{total_size / (1024*1024):.2f}"])
+    writer.writerow([])
+    writer.writerow(['=== BY EXTENSION ==='])
+    writer.writerow(['Extension', 'Files', 'Lines', 'Size (KB)', ''])
+    for ext, stats in sorted(extension_stats.items(), key=lambda x: x[1]['lines'], reverse=True):
+        writer.writerow([ext if ext else '(no extension)', stats['files'], stats['lines'],
+                         f"{stats['size'] / 1024:.2f}", ''])
+    return output.getvalue()
+
+
+def reference_json(file_results, extension_stats, analyzed_folder, count_method):
+    """The previous build-a-dict-then-dumps implementation"""
+    total_files, total_lines, total_size = summarize(file_results)
+    return json.dumps({
+        'analysis_summary': {
+            'total_files': total_files,
+            'total_lines': total_lines,
+            'total_size_bytes': total_size,
+            'analyzed_folder': analyzed_folder,
+            'count_method': count_method
+        },
+        'files': [
+            {
+                'path': f['path'],
+                'extension': f['extension'] or None,
+                'lines_of_code': f['lines'],
+                'file_size_bytes': f['size'],
+                'file_size_kb': round(f['size'] / 1024, 2)
+            }
+            for f in sorted(file_results, key=file_sort_key, reverse=True)
+        ],
+        'extension_summary': [
+            {
+                'extension': ext if ext else None,
+                'file_count': stats['files'],
+                'total_lines': stats['lines'],
+                'total_size_bytes': stats['size'],
+                'total_size_kb': round(stats['size'] / 1024, 2)
+            }
+            for ext, stats in sorted(extension_stats.items(), key=lambda x: x[1]['lines'], reverse=True)
+        ]
+    }, indent=2, ensure_ascii=False)
+
+
+def test_documents_match_reference():
+    """Streamed output is byte-for-byte the old output"""
+    print("Testing streamed exports against the in-memory exports...")
+    for count in (0, 1, 3, EXPORT_CHUNK_ROWS, EXPORT_CHUNK_ROWS * 2 + 7):
+        file_results, extension_stats = make_results(count)
+        expected_csv = reference_csv(file_results, extension_stats)
+        expected_json = reference_json(file_results, extension_stats, "/tmp/projekt é", "code_only")
+
+        assert generate_csv_data(file_results, extension_stats) == expected_csv
+        assert generate_json_data(file_results, extension_stats, "/tmp/projekt é", "code_only") == expected_json
+        json.loads(expected_json)
+        print(f"✓ {count} files match")
+
+
+def test_chunks_are_bounded():
+    """No chunk holds much more than EXPORT_CHUNK_ROWS rows"""
+    print("\nTesting chunk sizes...")
+    file_results, extension_stats = make_results(EXPORT_CHUNK_ROWS * 5)
+    for chunks in (iter_csv_chunks(file_results, extension_stats),
+                   iter_json_chunks(file_results, extension_stats, "x", "all")):
+        chunks = list(chunks)
+        assert len(chunks) > 5
+        assert max(chunk.count("\n") for chunk in chunks) <= EXPORT_CHUNK_ROWS * 8
+    print("✓ Chunks stay bounded")
+
+
+def test_write_to_file_sorts_once():
+    """Writers stream to a file and reuse a shared sorted list"""
+    print("\nTesting file writers...")
+    file_results, extension_stats = make_results(2500)
+    sorted_files = sort_files(file_results)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "out.csv")
+        json_path = os.path.join(tmp, "out.json")
+        # Given the sorted list, the writers must not sort again
+        with mock.patch.object(line_counter_export, "sort_files", side_effect=AssertionError("sorted twice")):
+            with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+                write_csv(f, file_results, extension_stats, sorted_files)
+            with open(json_path, 'w', encoding='utf-8') as f:
+                write_json(f, file_results, extension_stats, "x", "all", sorted_files)
+
+        with open(csv_path, encoding='utf-8', newline='') as f:
+            assert f.read() == reference_csv(file_results, extension_stats)
+        with open(json_path, encoding='utf-8') as f:
+            assert f.read() == reference_json(file_results, extension_stats, "x", "all")
+    print("✓ Files written from one shared sort")
+
+
+if __name__ == "__main__":
+    print("Testing Streaming Export")
+    print("=" * 40)
+    test_documents_match_reference()
+    test_chunks_are_bounded()
+    test_write_to_file_sorts_once()
+    print("\nTest complete!")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test the scandir-based walker
+"""
+
+import os
+import tempfile
+from unittest import mock
+
+import line_counter_core
+from line_counter_core import FileFilter, scan_files
+
+
+def make_tree(root):
+    """Create nested folders, an excluded folder and an excluded file type"""
+    for rel in ("b/z.py", "b/a.py", "a.py", "a/deep/x.py", "a/y.js", "node_modules/dep.js", "c/skip.pyc"):
+        path = os.path.join(root, *rel.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("x = 1\n" * len(rel))
+
+
+def reference_walk(root, file_filter):
+    """What os.walk with sorted names gives"""
+    result = []
+    for dir_path, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if file_filter.include_folder(d))
+        for name in sorted(files):
+            if file_filter.include_file(name):
+                result.append(os.path.relpath(os.path.join(dir_path, name), root))
+    return result
+
+
+def test_matches_os_walk():
+    """Same files, same order, with sizes from the walk"""
+    print("Testing walker order against os.walk...")
+    with tempfile.TemporaryDirectory() as tmp:
+        make_tree(tmp)
+        file_filter = FileFilter([".py", ".js"], ["*.pyc"], ["node_modules"])
+
+        entries = list(scan_files(tmp, file_filter))
+        assert [e.rel_path for e in entries] == reference_walk(tmp, file_filter)
+        for entry in entries:
+            assert entry.size == os.path.getsize(entry.path)
+            assert entry.path == os.path.join(tmp, entry.rel_path)
+            assert entry.extension in (".py", ".js")
+        print(f"✓ {len(entries)} files in os.walk order")
+
+
+def test_symlink_loop():
+    """Following symlinks visits each real folder once"""
+    print("\nTesting symlink loops...")
+    with tempfile.TemporaryDirectory() as tmp:
+        make_tree(tmp)
+        try:
+            os.symlink(tmp, os.path.join(tmp, "a", "loop"), target_is_directory=True)
+        except (OSError, NotImplementedError):
+            print("- symlinks not supported here, skipped")
+            return
+        file_filter = FileFilter([".py"], [], [])
+
+        plain = [e.rel_path for e in scan_files(tmp, file_filter)]
+        followed = [e.rel_path for e in scan_files(tmp, file_filter, follow_symlinks=True)]
+        assert plain == followed
+        print("✓ Loop terminated")
+
+
+def test_unreadable_folder():
+    """A folder that cannot be listed is skipped, not fatal"""
+    print("\nTesting unreadable folders...")
+    with tempfile.TemporaryDirectory() as tmp:
+        make_tree(tmp)
+        blocked = os.path.join(tmp, "a")
+        real_scandir = os.scandir
+
+        def scandir(path):
+            if path == blocked:
+                raise PermissionError(13, "Permission denied", path)
+            return real_scandir(path)
+
+        with mock.patch.object(line_counter_core.os, "scandir", scandir):
+            rel_paths = [e.rel_path for e in scan_files(tmp, FileFilter([".py", ".js"], [], []))]
+        assert not any(p.startswith("a" + os.sep) for p in rel_paths)
+        assert os.path.join("b", "a.py") in rel_paths
+        print("✓ Walk continued past the unreadable folder")
+
+
+if __name__ == "__main__":
+    print("Testing Walker")
+    print("=" * 40)
+    test_matches_os_walk()
+    test_symlink_loop()
+    test_unreadable_folder()
+    print("\nTest complete!")
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Test watch mode: recounting changed files and applying them in place
+"""
+
+import errno
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import time
+
+from unittest import mock
+
+import line_counter_watch
+from line_counter_core import analyze_folder
+from line_counter_watch import FolderWatcher, InotifyBackend, LiveResults, PollingBackend
+
+FILTERS = ([".py", ".md"], [], ["node_modules"])
+
+
+def write(root, rel, text):
+    path = os.path.join(root, *rel.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+def make_tree(root):
+    write(root, "main.py", "# main\nimport os\n\nprint(os.name)\n")
+    write(root, "pkg/util.py", "x = 1\n" * 5)
+    write(root, "pkg/deep/mod.py", "y = 2\n" * 3)
+    write(root, "docs/readme.md", "# Docs\n")
+    write(root, "node_modules/dep.py", "z = 3\n")
+
+
+def change_tree(root):
+    """Modify, create, delete and move files and folders"""
+    time.sleep(0.01)  # a new mtime even on coarse clocks
+    write(root, "main.py", "print(1)\n" * 9)
+    write(root, "new.py", "a = 1\nb = 2\n")
+    write(root, "fresh/sub/more.py", "c = 3\n")
+    os.remove(os.path.join(root, "docs", "readme.md"))
+    shutil.rmtree(os.path.join(root, "pkg", "deep"))
+    write(root, "node_modules/other.py", "ignored\n")
+
+
+def rows(file_results):
+    return sorted((info['path'], info['lines'], info['size'], info['extension']) for info in file_results)
+
+
+def wait_for(results_queue, live, root, method, timeout=10):
+    """Apply batches from the watcher until the results match a fresh analysis"""
+    expected = rows(analyze_folder(root, *FILTERS, method, workers=1)[0])
+    deadline = time.monotonic() + timeout
+    batches = 0
+    while rows(live.file_results) != expected:
+        remaining = deadline - time.monotonic()
+        assert remaining > 0, (rows(live.file_results), expected)
+        try:
+            live.apply(results_queue.get(timeout=remaining))
+            batches += 1
+        except queue.Empty:
+            pass
+    return batches
+
+
+def test_changes_applied_in_place():
+    """Recounted and removed files give the same results as a full analysis"""
+    print("Testing in-place updates...")
+    for method in ("all", "metrics"):
+        with tempfile.TemporaryDirectory() as tmp:
+            make_tree(tmp)
+            watcher = FolderWatcher(tmp, *FILTERS, method, workers=1)
+            file_results, _ = watcher.analyze()
+            live = LiveResults(file_results)
+            batches = []
+            watcher.on_change = batches.append
+            watcher.backend = PollingBackend(watcher.file_filter)
+
+            change_tree(tmp)
+            watcher._apply([os.path.join(tmp, rel) for rel in
+                            ("main.py", "new.py", "fresh", "docs/readme.md", "pkg/deep", "node_modules/other.py")])
+            assert len(batches) == 1
+            changes = batches[0]
+            assert sorted(changes.updated.paths) == sorted(
+                ["main.py", "new.py", os.path.join("fresh", "sub", "more.py")])
+            assert sorted(changes.removed) == sorted([os.path.join("docs", "readme.md"),
+                                                      os.path.join("pkg", "deep", "mod.py")])
+
+            extension_stats = live.apply(changes)
+            fresh_results, fresh_stats = analyze_folder(tmp, *FILTERS, method, workers=1)
+            assert rows(file_results) == rows(fresh_results)
+            assert extension_stats == fresh_stats  # ".md" is gone from the stats
+            assert file_results.totals() == fresh_results.totals()
+            watcher.backend.close()
+    print("✓ Totals match a fresh analysis")
+
+
+def test_gitignore_and_names():
+    """Changed files follow every .gitignore above them; names starting with ".." are inside the folder"""
+    print("\nTesting .gitignore rules and odd names...")
+    with tempfile.TemporaryDirectory() as tmp:
+        make_tree(tmp)
+        write(tmp, ".gitignore", "generated.py\n")
+        write(tmp, "pkg/.gitignore", "local.py\n")
+        watcher = FolderWatcher(tmp, *FILTERS, workers=1, gitignore=True)
+        file_results, _ = watcher.analyze()
+        live = LiveResults(file_results)
+        batches = []
+        watcher.on_change = batches.append
+        watcher.backend = PollingBackend(watcher.file_filter)
+        watcher._watch_tree(tmp)
+
+        changed = [write(tmp, rel, "x = 1\n") for rel in
+                   ("generated.py", "pkg/deep/generated.py", "pkg/deep/local.py", "pkg/deep/kept.py",
+                    "..cache/x.py", "...md")]
+        watcher._apply(changed)
+        assert sorted(batches[0].updated.paths) == sorted(
+            ["...md", os.path.join("..cache", "x.py"), os.path.join("pkg", "deep", "kept.py")])
+        live.apply(batches[0])
+        assert rows(file_results) == rows(analyze_folder(tmp, *FILTERS, workers=1, gitignore=True)[0])
+
+        # Without the kept matchers the rules are rebuilt down from the watched folder
+        watcher.matchers = {}
+        assert watcher._ignored(os.path.join(tmp, "pkg", "deep", "local.py"), False)
+        assert not watcher._ignored(os.path.join(tmp, "pkg", "deep", "kept.py"), False)
+        watcher.backend.close()
+    print("✓ Ignored files stay out, odd names are counted")
+
+
+def run_backend(backend):
+    with tempfile.TemporaryDirectory() as tmp:
+        make_tree(tmp)
+        results_queue = queue.Queue()
+        watcher = FolderWatcher(tmp, *FILTERS, on_change=results_queue.put, workers=1, backend=backend)
+        live = LiveResults(watcher.analyze()[0])
+        watcher.start()
+        try:
+            start = time.monotonic()
+            change_tree(tmp)
+            batches = wait_for(results_queue, live, tmp, "all")
+            elapsed = time.monotonic() - start
+
+            # Changes inside a folder created while watching are picked up too
+            write(tmp, "fresh/sub/more.py", "c = 3\n" * 4)
+            wait_for(results_queue, live, tmp, "all")
+        finally:
+            watcher.stop()
+    return batches, elapsed
+
+
+def test_polling_backend():
+    """The polling fallback notices every kind of change"""
+    print("\nTesting the polling backend...")
+    batches, elapsed = run_backend(PollingBackend(FolderWatcher(".", *FILTERS).file_filter, interval=0.05))
+    print(f"✓ Up to date after {batches} batch(es), {elapsed:.2f}s")
+
+
+def test_inotify_backend():
+    """inotify events are debounced into a few batches"""
+    print("\nTesting the inotify backend...")
+    if not sys.platform.startswith("linux"):
+        print("inotify is Linux only, skipped")
+        return
+    batches, elapsed = run_backend(InotifyBackend())
+    assert batches <= 3, batches
+    print(f"✓ Up to date after {batches} batch(es), {elapsed:.2f}s")
+
+
+class LimitedBackend:
+    """Polls, but runs out of watches after `limit` folders like inotify at its per-user limit"""
+
+    def __init__(self, file_filter, limit):
+        self.polling = PollingBackend(file_filter, interval=0.05)
+        self.limit = limit
+
+    def add(self, dir_path):
+        if len(self.polling.snapshots) >= self.limit:
+            raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC), dir_path)
+        self.polling.add(dir_path)
+
+    def remove(self, dir_path):
+        self.polling.remove(dir_path)
+
+    def read(self, timeout):
+        return self.polling.read(timeout)
+
+    def close(self):
+        self.polling.close()
+
+
+def test_watch_errors():
+    """Running out of watches mid-run switches to polling; other errors end the watch and are reported"""
+    print("\nTesting errors while watching...")
+    with tempfile.TemporaryDirectory() as tmp, mock.patch.object(line_counter_watch, "POLL_INTERVAL", 0.05):
+        make_tree(tmp)
+        results_queue = queue.Queue()
+        file_filter = FolderWatcher(".", *FILTERS).file_filter
+        backend = LimitedBackend(file_filter, limit=4)  # the four folders of make_tree
+        watcher = FolderWatcher(tmp, *FILTERS, on_change=results_queue.put, workers=1, backend=backend)
+        live = LiveResults(watcher.analyze()[0])
+        watcher.start()
+        try:
+            change_tree(tmp)  # the new fresh/sub folders need more watches
+            wait_for(results_queue, live, tmp, "all")
+            assert isinstance(watcher.backend, PollingBackend)
+            write(tmp, "fresh/sub/later.py", "d = 4\n" * 2)
+            wait_for(results_queue, live, tmp, "all")
+        finally:
+            watcher.stop()
+
+        def broken_read(timeout):
+            raise RuntimeError("backend failed")
+
+        watcher = FolderWatcher(tmp, *FILTERS, on_change=results_queue.put, workers=1,
+                                backend=PollingBackend(file_filter))
+        watcher.analyze()
+        watcher.backend.read = broken_read
+        watcher.start()
+        changes = results_queue.get(timeout=5)
+        assert isinstance(changes.error, RuntimeError) and changes.updated is None
+        watcher._thread.join(timeout=5)
+        assert not watcher._thread.is_alive()
+        watcher.stop()
+    print("✓ Fell back to polling, errors reported")
+
+
+if __name__ == "__main__":
+    print("Testing Watch Mode")
+    print("=" * 40)
+    test_changes_applied_in_place()
+    test_gitignore_and_names()
+    test_polling_backend()
+    test_inotify_backend()
+    test_watch_errors()
+    print("\nTest complete!")